@@ -0,0 +1,184 @@
+"""
+Django settings for study_buddy project.
+
+Generated by 'django-admin startproject' using Django 4.1.7.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/4.1/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/4.1/ref/settings/
+"""
+
+import os
+from pathlib import Path
+
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/4.1/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = "django-insecure-)&s22o%@^je3n7_hdk8cue=07&x=2lx(+_x7b%_(zi=^q5ecvt"
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = True
+
+ALLOWED_HOSTS = []
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    "django.contrib.admin",
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "django.contrib.sessions",
+    "django.contrib.messages",
+    "django.contrib.staticfiles",
+    "study_buddy",
+]
+
+MIDDLEWARE = [
+    "django.middleware.security.SecurityMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "study_buddy.middleware.ReplicaRoutingMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "study_buddy.middleware.ProfileMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "study_buddy.middleware.AsyncViewsMiddleware",
+]
+
+ROOT_URLCONF = "study_buddy.urls"
+
+TEMPLATES = [
+    {
+        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "DIRS": [],
+        "APP_DIRS": True,
+        "OPTIONS": {
+            "context_processors": [
+                "django.template.context_processors.debug",
+                "django.template.context_processors.request",
+                "django.contrib.auth.context_processors.auth",
+                "django.contrib.messages.context_processors.messages",
+                "study_buddy.context_processors.notifications",
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = "app.wsgi.application"
+
+
+# Database
+# https://docs.djangoproject.com/en/4.1/ref/settings/#databases
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db.sqlite3",
+    }
+}
+
+# Профиль базы данных: "development" или "production".
+# В боевом профиле соединения переиспользуются между запросами, а SQLite работает в режиме WAL:
+# чтение не блокирует запись, а одновременные записи ждут друг друга вместо ошибки "database is locked".
+DATABASE_PROFILE = os.environ.get("STUDY_BUDDY_DATABASE_PROFILE", "development")
+
+if DATABASE_PROFILE == "production":
+    DATABASES["default"].update(CONN_MAX_AGE=600, CONN_HEALTH_CHECKS=True)
+    # Выполняются при открытии каждого соединения (см. study_buddy.db.apply_sqlite_pragmas)
+    STUDY_BUDDY_SQLITE_PRAGMAS = {
+        "busy_timeout": 5000,  # мс
+        "journal_mode": "wal",
+        "synchronous": "normal",
+        "cache_size": -64000,  # отрицательное значение задаёт размер в КиБ, т. е. 64 МБ на соединение
+        "mmap_size": 256 * 1024 * 1024,
+    }
+    # Транзакции сразу занимают базу на запись и ждут её освобождения, а не падают при первой записи
+    STUDY_BUDDY_SQLITE_TRANSACTION_MODE = "IMMEDIATE"
+
+# Реплика для чтения. Для проверки на одном компьютере укажите путь к копии базы
+# в STUDY_BUDDY_REPLICA_DATABASE и обновляйте её командой refresh_replica.
+if os.environ.get("STUDY_BUDDY_REPLICA_DATABASE"):
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.environ["STUDY_BUDDY_REPLICA_DATABASE"],
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["study_buddy.routers.ReplicaRouter"]
+
+# Псевдонимы из DATABASES, из которых читают представления
+STUDY_BUDDY_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+
+# Сколько секунд после записи запросы той же сессии читают из основной базы
+STUDY_BUDDY_REPLICA_STICKY_SECONDS = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# Для нескольких процессов сервера нужен общий кэш, например
+# "django.core.cache.backends.redis.RedisCache" с LOCATION "redis://127.0.0.1:6379"
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "study-buddy",
+    }
+}
+
+# Псевдоним из CACHES для кэша фрагментов страниц курса
+STUDY_BUDDY_FRAGMENT_CACHE = "default"
+
+
+# Пользователь загружается вместе с профилем одним запросом
+AUTHENTICATION_BACKENDS = ["study_buddy.backends.ProfileModelBackend"]
+
+
+# Password validation
+# https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.MinimumLengthValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.CommonPasswordValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.NumericPasswordValidator",
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/4.1/topics/i18n/
+
+LANGUAGE_CODE = "ru"
+
+TIME_ZONE = "Europe/Moscow"
+
+USE_I18N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/4.1/howto/static-files/
+
+STATIC_URL = "static/"
+
+# Default primary key field type
+# https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
+
+DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
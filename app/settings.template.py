@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,11 +44,14 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
+    "study_buddy.middleware.ReplicaRoutingMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "study_buddy.middleware.ProfileMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "study_buddy.middleware.AsyncViewsMiddleware",
 ]
 
 ROOT_URLCONF = "study_buddy.urls"
@@ -63,6 +67,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "study_buddy.context_processors.notifications",
             ],
         },
     },
@@ -81,6 +86,61 @@ DATABASES = {
     }
 }
 
+# Профиль базы данных: "development" или "production".
+# В боевом профиле соединения переиспользуются между запросами, а SQLite работает в режиме WAL:
+# чтение не блокирует запись, а одновременные записи ждут друг друга вместо ошибки "database is locked".
+DATABASE_PROFILE = os.environ.get("STUDY_BUDDY_DATABASE_PROFILE", "development")
+
+if DATABASE_PROFILE == "production":
+    DATABASES["default"].update(CONN_MAX_AGE=600, CONN_HEALTH_CHECKS=True)
+    # Выполняются при открытии каждого соединения (см. study_buddy.db.apply_sqlite_pragmas)
+    STUDY_BUDDY_SQLITE_PRAGMAS = {
+        "busy_timeout": 5000,  # мс
+        "journal_mode": "wal",
+        "synchronous": "normal",
+        "cache_size": -64000,  # отрицательное значение задаёт размер в КиБ, т. е. 64 МБ на соединение
+        "mmap_size": 256 * 1024 * 1024,
+    }
+    # Транзакции сразу занимают базу на запись и ждут её освобождения, а не падают при первой записи
+    STUDY_BUDDY_SQLITE_TRANSACTION_MODE = "IMMEDIATE"
+
+# Реплика для чтения. Для проверки на одном компьютере укажите путь к копии базы
+# в STUDY_BUDDY_REPLICA_DATABASE и обновляйте её командой refresh_replica.
+if os.environ.get("STUDY_BUDDY_REPLICA_DATABASE"):
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.environ["STUDY_BUDDY_REPLICA_DATABASE"],
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["study_buddy.routers.ReplicaRouter"]
+
+# Псевдонимы из DATABASES, из которых читают представления
+STUDY_BUDDY_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+
+# Сколько секунд после записи запросы той же сессии читают из основной базы
+STUDY_BUDDY_REPLICA_STICKY_SECONDS = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# Для нескольких процессов сервера нужен общий кэш, например
+# "django.core.cache.backends.redis.RedisCache" с LOCATION "redis://127.0.0.1:6379"
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "study-buddy",
+    }
+}
+
+# Псевдоним из CACHES для кэша фрагментов страниц курса
+STUDY_BUDDY_FRAGMENT_CACHE = "default"
+
+
+# Пользователь загружается вместе с профилем одним запросом
+AUTHENTICATION_BACKENDS = ["study_buddy.backends.ProfileModelBackend"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -0,0 +1,68 @@
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import Course
+
+# Время жизни закэшированных id курсов пользователя. Записи на курс меняют и команды, и обработчик
+# очереди в своих процессах; при кэше в памяти процесса их сброс сервер не видит, поэтому доступ
+# к курсу может устареть не больше чем на это время
+COURSE_ACCESS_TIMEOUT = 30
+
+
+class CourseAccess:
+    """
+    Id курсов, на которые пользователь записан и которые он преподаёт.
+    """
+
+    def __init__(self, enrolled=frozenset(), taught=frozenset()):
+        self.enrolled = enrolled
+        self.taught = taught
+
+
+def _course_access_key(profile_id):
+    return f"study_buddy:access:{profile_id}"
+
+
+def course_access(profile_id):
+    """
+    Курсы пользователя из кэша; при промахе они выбираются двумя запросами по id.
+    Кэш сбрасывается сигналами при записи на курс, исключении из него и создании или удалении курса.
+    """
+    key = _course_access_key(profile_id)
+    value = cache.get(key)
+    if value is None:
+        # Кэш заполняется из основной базы: отставание реплики не должно остаться в нём на весь срок
+        enrolled = (
+            Course.students.through.objects.using(DEFAULT_DB_ALIAS)
+            .filter(userprofile_id=profile_id)
+            .values_list("course_id", flat=True)
+        )
+        taught = (
+            Course.objects.using(DEFAULT_DB_ALIAS).filter(teacher_id=profile_id).values_list("pk", flat=True)
+        )
+        value = (frozenset(enrolled), frozenset(taught))
+        cache.set(key, value, COURSE_ACCESS_TIMEOUT)
+    return CourseAccess(*value)
+
+
+def invalidate_course_access(*profile_ids):
+    """
+    Сбрасывает закэшированные курсы пользователей. Внутри транзакции кэш сбрасывается ещё раз
+    после фиксации: параллельный запрос мог успеть закэшировать данные, которые она меняет.
+    """
+    keys = [_course_access_key(profile_id) for profile_id in set(profile_ids)]
+    cache.delete_many(keys)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def can_view_course(request, course_id):
+    """
+    Преподаватели видят все курсы, студенты — только те, на которые записаны.
+    Курсы пользователя берутся из ``request.course_access`` (см. ``ProfileMiddleware``).
+    """
+    profile = request.user.userprofile
+    if profile.role != "student":
+        return True
+    access = getattr(request, "course_access", None) or course_access(profile.pk)
+    return course_id in access.enrolled
@@ -1,14 +1,30 @@
 from django.contrib import admin
 
 from .models import (
+    ArchivedCourse,
     Assignment,
     Course,
     Forum,
     ForumPost,
+    Job,
     Lesson,
     Notification,
     UserProfile,
 )
+from .search import fts_matches, search_enabled, search_terms
+
+
+class FullTextSearchMixin:
+    """
+    Дополняет поиск по ``search_fields`` совпадениями из полнотекстового индекса.
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        # Запрос без букв и цифр даёт пустое выражение MATCH, на котором FTS5 выдаёт синтаксическую ошибку
+        if search_terms(search_term) and search_enabled():
+            results |= queryset.filter(pk__in=fts_matches(self.model, search_term))
+        return results, may_have_duplicates
 
 
 class UserProfileAdmin(admin.ModelAdmin):
@@ -20,12 +36,17 @@ class CourseAdmin(admin.ModelAdmin):
     search_fields = ("title", "teacher__user__username")
 
 
-class LessonAdmin(admin.ModelAdmin):
+class ArchivedCourseAdmin(admin.ModelAdmin):
+    list_display = ("title", "teacher", "start_date", "end_date", "archived_at")
+    search_fields = ("title", "teacher__user__username")
+
+
+class LessonAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ("title", "course", "date_time")
     search_fields = ("title", "course__title")
 
 
-class AssignmentAdmin(admin.ModelAdmin):
+class AssignmentAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ("title", "course", "due_date")
     search_fields = ("title", "course__title")
 
@@ -35,7 +56,7 @@ class ForumAdmin(admin.ModelAdmin):
     search_fields = ("title", "course__title")
 
 
-class ForumPostAdmin(admin.ModelAdmin):
+class ForumPostAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ("title", "author", "forum", "created_at", "updated_at")
     search_fields = ("title", "author__user__username", "forum__title")
 
@@ -45,10 +66,18 @@ class NotificationAdmin(admin.ModelAdmin):
     search_fields = ("title", "user__user__username")
 
 
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("name", "status", "attempts", "run_after", "created_at")
+    list_filter = ("status",)
+    search_fields = ("name",)
+
+
 admin.site.register(UserProfile, UserProfileAdmin)
 admin.site.register(Course, CourseAdmin)
+admin.site.register(ArchivedCourse, ArchivedCourseAdmin)
 admin.site.register(Lesson, LessonAdmin)
 admin.site.register(Assignment, AssignmentAdmin)
 admin.site.register(Forum, ForumAdmin)
 admin.site.register(ForumPost, ForumPostAdmin)
 admin.site.register(Notification, NotificationAdmin)
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,342 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Exists, OuterRef, Prefetch
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+
+from .models import Assignment, Course, Lesson, Notification, UserProfile
+from .pagination import id_page, keyset_page
+
+API_VERSION = "v1"
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class Serializer:
+    """
+    Набор полей объекта для ответа API.
+
+    ``fields`` сопоставляет имя поля функции, которая достаёт значение из объекта; клиент может
+    запросить только часть полей параметром ``fields`` (или ``fields[<связь>]`` для связанных объектов).
+    """
+
+    fields = {}
+
+    def __init__(self, names=None):
+        if names:
+            unknown = [name for name in names if name not in self.fields]
+            if unknown:
+                raise ApiError(f"Неизвестные поля: {', '.join(unknown)}")
+            self.names = names
+        else:
+            self.names = list(self.fields)
+
+    def serialize(self, obj):
+        return {name: self.fields[name](obj) for name in self.names}
+
+
+class UserSerializer(Serializer):
+    fields = {
+        "id": lambda profile: profile.pk,
+        "username": lambda profile: profile.user.username,
+        "first_name": lambda profile: profile.user.first_name,
+        "last_name": lambda profile: profile.user.last_name,
+        "role": lambda profile: profile.role,
+    }
+
+
+class CourseSerializer(Serializer):
+    fields = {
+        "id": lambda course: course.pk,
+        "title": lambda course: course.title,
+        "teacher": lambda course: course.teacher_id,
+        "start_date": lambda course: course.start_date,
+        "end_date": lambda course: course.end_date,
+        "students_count": lambda course: course.students_count,
+        "updated_at": lambda course: course.updated_at,
+    }
+
+
+class LessonSerializer(Serializer):
+    fields = {
+        "id": lambda lesson: lesson.pk,
+        "course": lambda lesson: lesson.course_id,
+        "title": lambda lesson: lesson.title,
+        "description": lambda lesson: lesson.description,
+        "date_time": lambda lesson: lesson.date_time,
+        "updated_at": lambda lesson: lesson.updated_at,
+    }
+
+
+class AssignmentSerializer(Serializer):
+    fields = {
+        "id": lambda assignment: assignment.pk,
+        "course": lambda assignment: assignment.course_id,
+        "title": lambda assignment: assignment.title,
+        "description": lambda assignment: assignment.description,
+        "due_date": lambda assignment: assignment.due_date,
+        "completed_count": lambda assignment: assignment.completed_count,
+        # Выполнено ли задание текущим пользователем, см. ``_with_completion``
+        "completed": lambda assignment: assignment.is_completed,
+        "updated_at": lambda assignment: assignment.updated_at,
+    }
+
+
+class CompletionSerializer(Serializer):
+    fields = {
+        "id": lambda completion: completion.pk,
+        "student": lambda completion: completion.userprofile_id,
+        "assignment": lambda completion: completion.assignment_id,
+    }
+
+
+class NotificationSerializer(Serializer):
+    fields = {
+        "id": lambda notification: notification.pk,
+        "title": lambda notification: notification.title,
+        "content": lambda notification: notification.content,
+        "created_at": lambda notification: notification.created_at,
+        "read": lambda notification: notification.read,
+    }
+
+
+def _with_completion(assignments, profile):
+    completed = Assignment.students_completed.through.objects.filter(
+        assignment_id=OuterRef("pk"), userprofile_id=profile.pk
+    )
+    return assignments.annotate(is_completed=Exists(completed))
+
+
+class Include:
+    """
+    Связанные объекты, которые можно добавить в ответ параметром ``include``.
+
+    ``prepare`` добавляет к выборке нужный ``select_related`` или ``prefetch_related``,
+    поэтому связь стоит не больше одного запроса на всю страницу.
+    """
+
+    def __init__(self, serializer_class, prepare, get, many=False):
+        self.serializer_class = serializer_class
+        self.prepare = prepare
+        self.get = get
+        self.many = many
+
+    def serialize(self, obj, serializer):
+        if self.many:
+            return [serializer.serialize(item) for item in self.get(obj)]
+        return serializer.serialize(self.get(obj))
+
+
+class ApiView(View):
+    """
+    Базовое представление ресурса API только для чтения.
+
+    Список отдаётся страницами с курсорной пагинацией (``after`` или ``before`` и ``limit``)
+    и выводится в ответ потоком, по одному объекту. Число запросов не зависит от размера страницы.
+    Связь из ``include`` заменяет в ответе id связанного объекта (или добавляет список объектов).
+    """
+
+    http_method_names = ["get", "head", "options"]
+    serializer_class = None
+    includes = {}
+    # Поле курсора: None — по возрастанию id, иначе от новых к старым по этому полю
+    cursor_field = None
+
+    def get_queryset(self, profile):
+        raise NotImplementedError
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({"error": "Требуется вход в систему"}, status=401)
+        try:
+            self.profile = request.user.userprofile
+        except UserProfile.DoesNotExist:
+            return JsonResponse({"error": "Профиль пользователя не найден"}, status=403)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse({"error": error.message}, status=error.status)
+
+    def _names(self, parameter):
+        value = self.request.GET.get(parameter, "")
+        return [name.strip() for name in value.split(",") if name.strip()]
+
+    def _prepare(self):
+        include_names = self._names("include")
+        unknown = [name for name in include_names if name not in self.includes]
+        if unknown:
+            raise ApiError(f"Неизвестные связи: {', '.join(unknown)}")
+        queryset = self.get_queryset(self.profile)
+        includes = []
+        for name in include_names:
+            include = self.includes[name]
+            queryset = include.prepare(queryset, self.profile)
+            includes.append((name, include, include.serializer_class(self._names(f"fields[{name}]"))))
+        serializer = self.serializer_class(self._names("fields"))
+
+        def serialize(obj):
+            data = serializer.serialize(obj)
+            for name, include, include_serializer in includes:
+                data[name] = include.serialize(obj, include_serializer)
+            return data
+
+        return queryset, serialize
+
+    def _page_size(self):
+        try:
+            limit = int(self.request.GET.get("limit", DEFAULT_PAGE_SIZE))
+        except ValueError:
+            raise ApiError("Параметр limit должен быть числом")
+        return min(max(limit, 1), MAX_PAGE_SIZE)
+
+    def get(self, request, *args, **kwargs):
+        queryset, serialize = self._prepare()
+        if "pk" in self.kwargs:
+            obj = queryset.filter(pk=self.kwargs["pk"]).first()
+            if obj is None:
+                raise ApiError("Объект не найден", status=404)
+            return JsonResponse(serialize(obj))
+        if self.cursor_field is None:
+            page, next_cursor = id_page(queryset, request.GET.get("after"), self._page_size())
+        else:
+            page, next_cursor = keyset_page(
+                queryset, request.GET.get("before"), self._page_size(), field=self.cursor_field
+            )
+        return StreamingHttpResponse(
+            _stream_page(page, serialize, next_cursor), content_type="application/json"
+        )
+
+
+def _stream_page(page, serialize, next_cursor):
+    encoder = DjangoJSONEncoder()
+    yield '{"results": ['
+    for index, obj in enumerate(page):
+        yield ("," if index else "") + encoder.encode(serialize(obj))
+    yield f'], "next": {encoder.encode(next_cursor)}}}'
+
+
+def _course_filter(request, queryset, lookup="course_id"):
+    course = request.GET.get("course")
+    if course is None:
+        return queryset
+    if not course.isdigit():
+        raise ApiError("Параметр course должен быть числом")
+    return queryset.filter(**{lookup: int(course)})
+
+
+class CourseApiView(ApiView):
+    serializer_class = CourseSerializer
+    includes = {
+        "teacher": Include(
+            UserSerializer,
+            lambda queryset, profile: queryset.select_related("teacher__user"),
+            lambda course: course.teacher,
+        ),
+        "lessons": Include(
+            LessonSerializer,
+            lambda queryset, profile: queryset.prefetch_related(
+                Prefetch("lessons", queryset=Lesson.objects.order_by("date_time", "pk"))
+            ),
+            lambda course: course.lessons.all(),
+            many=True,
+        ),
+        "assignments": Include(
+            AssignmentSerializer,
+            lambda queryset, profile: queryset.prefetch_related(
+                Prefetch(
+                    "assignments",
+                    queryset=_with_completion(Assignment.objects.order_by("due_date", "pk"), profile),
+                )
+            ),
+            lambda course: course.assignments.all(),
+            many=True,
+        ),
+    }
+
+    def get_queryset(self, profile):
+        return Course.objects.visible_to(profile)
+
+
+class LessonApiView(ApiView):
+    serializer_class = LessonSerializer
+    includes = {
+        "course": Include(
+            CourseSerializer,
+            lambda queryset, profile: queryset.select_related("course"),
+            lambda lesson: lesson.course,
+        ),
+    }
+
+    def get_queryset(self, profile):
+        lessons = Lesson.objects.filter(course__in=Course.objects.visible_to(profile))
+        return _course_filter(self.request, lessons)
+
+
+class AssignmentApiView(ApiView):
+    serializer_class = AssignmentSerializer
+    includes = {
+        "course": Include(
+            CourseSerializer,
+            lambda queryset, profile: queryset.select_related("course"),
+            lambda assignment: assignment.course,
+        ),
+    }
+
+    def get_queryset(self, profile):
+        assignments = Assignment.objects.filter(course__in=Course.objects.visible_to(profile))
+        return _with_completion(_course_filter(self.request, assignments), profile)
+
+
+class CompletionApiView(ApiView):
+    """
+    Отметки о выполнении заданий: преподаватель видит отметки всех студентов своих курсов,
+    студент — только свои.
+    """
+
+    serializer_class = CompletionSerializer
+    includes = {
+        "student": Include(
+            UserSerializer,
+            lambda queryset, profile: queryset.select_related("userprofile__user"),
+            lambda completion: completion.userprofile,
+        ),
+        "assignment": Include(
+            AssignmentSerializer,
+            lambda queryset, profile: queryset.select_related("assignment").annotate(
+                is_completed=Exists(
+                    Assignment.students_completed.through.objects.filter(
+                        assignment_id=OuterRef("assignment_id"), userprofile_id=profile.pk
+                    )
+                )
+            ),
+            lambda completion: _completion_assignment(completion),
+        ),
+    }
+
+    def get_queryset(self, profile):
+        completions = Assignment.students_completed.through.objects.filter(
+            assignment__course__in=Course.objects.visible_to(profile)
+        )
+        if profile.role == "student":
+            completions = completions.filter(userprofile=profile)
+        return _course_filter(self.request, completions, "assignment__course_id")
+
+
+def _completion_assignment(completion):
+    assignment = completion.assignment
+    assignment.is_completed = completion.is_completed
+    return assignment
+
+
+class NotificationApiView(ApiView):
+    serializer_class = NotificationSerializer
+    cursor_field = "created_at"
+
+    def get_queryset(self, profile):
+        return Notification.objects.filter(user=profile)
@@ -1,6 +1,30 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+
+
+def ensure_search_index(sender, using, **kwargs):
+    """
+    При пересоздании таблицы в ходе миграции SQLite теряет её триггеры,
+    поэтому после каждого ``migrate`` недостающие объекты индекса создаются заново.
+    Если миграция с индексом ещё не применена (или отменена), ничего не делается.
+    """
+    from django.db import connections
+
+    from .search import install_search_index, search_enabled
+
+    connection = connections[using]
+    if search_enabled(connection):
+        install_search_index(connection)
 
 
 class StudyBuddyConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "study_buddy"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .db import apply_sqlite_pragmas
+
+        connection_created.connect(apply_sqlite_pragmas)
+        post_migrate.connect(ensure_search_index, sender=self)
@@ -0,0 +1,181 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .access import invalidate_course_access
+from .db import chunks
+from .fragment_cache import bump_course_version
+from .models import (
+    ArchivedAssignment,
+    ArchivedCompletion,
+    ArchivedCourse,
+    ArchivedEnrollment,
+    ArchivedForum,
+    ArchivedForumPost,
+    ArchivedLesson,
+    Assignment,
+    Course,
+    Forum,
+    ForumPost,
+    Lesson,
+)
+
+# Через сколько после окончания курс переносится в архив
+ARCHIVE_AFTER = timedelta(days=180)
+# Сколько курсов переносится за один проход
+ARCHIVE_BATCH_SIZE = 20
+# Сколько строк копируется или удаляется в одной транзакции
+ARCHIVE_CHUNK_SIZE = 500
+
+# Пары (рабочая таблица, архивная таблица) от родительских к дочерним и путь от строки к id курса.
+# Пути совпадают в обеих таблицах пары, поэтому одни и те же пары используются в обе стороны.
+ARCHIVE_TABLES = (
+    (Course, ArchivedCourse, "pk"),
+    (Course.students.through, ArchivedEnrollment, "course_id"),
+    (Lesson, ArchivedLesson, "course_id"),
+    (Assignment, ArchivedAssignment, "course_id"),
+    (Assignment.students_completed.through, ArchivedCompletion, "assignment__course_id"),
+    (Forum, ArchivedForum, "course_id"),
+    (ForumPost, ArchivedForumPost, "forum__course_id"),
+)
+
+
+def _copy_rows(source, target, lookup, course_ids, **values):
+    """
+    Копирует строки курсов ``course_ids`` из ``source`` в ``target`` с теми же id; ``values``
+    задают значения полей, которых нет в ``source``.
+
+    Строки читаются потоком и вставляются транзакциями по ``ARCHIVE_CHUNK_SIZE``, поэтому память
+    не растёт с размером курса, а база не занята на запись надолго. Уже скопированные строки
+    пропускаются: прерванный перенос можно запустить снова. Копируются общие для двух таблиц поля.
+    Даты с ``auto_now`` и ``auto_now_add`` при вставке заменяются текущим временем, поэтому после
+    вставки исходные значения записываются повторно.
+    """
+    target_fields = {field.attname: field for field in target._meta.concrete_fields}
+    fields = [field.attname for field in source._meta.concrete_fields if field.attname in target_fields]
+    auto_dates = [
+        name
+        for name, field in target_fields.items()
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    rows = (
+        source._base_manager.filter(**{f"{lookup}__in": course_ids})
+        .order_by("pk")
+        .values(*fields)
+        .iterator(chunk_size=ARCHIVE_CHUNK_SIZE)
+    )
+    for chunk in chunks(rows, ARCHIVE_CHUNK_SIZE):
+        objs = [target(**row, **values) for row in chunk]
+        with transaction.atomic():
+            target._base_manager.bulk_create(objs, ignore_conflicts=True)
+            if auto_dates:
+                for obj, row in zip(objs, chunk):
+                    for name in auto_dates:
+                        setattr(obj, name, row[name])
+                target._base_manager.bulk_update(objs, auto_dates)
+
+
+def _delete_rows(model, lookup, course_ids):
+    """
+    Удаляет строки курсов ``course_ids`` запросами DELETE по id, по ``ARCHIVE_CHUNK_SIZE`` строк
+    в транзакции, без сбора объектов и сигналов; поисковый индекс SQLite обновляют триггеры базы.
+    """
+    rows = model._base_manager.filter(**{f"{lookup}__in": course_ids}).order_by().values_list("pk", flat=True)
+    while True:
+        with transaction.atomic():
+            ids = list(rows[:ARCHIVE_CHUNK_SIZE])
+            if not ids:
+                return
+            model._base_manager.filter(pk__in=ids)._raw_delete(model._base_manager.db)
+
+
+def _move_courses(course_ids, to_archive):
+    """
+    Переносит курсы со всеми зависимыми строками короткими транзакциями так, что читатели видят
+    курс либо в рабочих таблицах, либо в архиве целиком.
+
+    Архивная страница открывается, только когда курса нет среди действующих (см. ``CourseDetailView``).
+    Поэтому сначала строки копируются, пока видна старая копия курса; затем одним UPDATE меняется
+    видимость курса (``deleted_at`` в рабочей таблице); в конце удаляются строки старой копии.
+    При переносе в архив изменения, сделанные во время копирования, не попадут в архив, но
+    в архив переносятся курсы, закончившиеся полгода назад (``ARCHIVE_AFTER``).
+    """
+    now = timezone.now()
+    for hot, archived, lookup in ARCHIVE_TABLES:
+        if to_archive:
+            _copy_rows(hot, archived, lookup, course_ids)
+        elif hot is Course:
+            # Возвращённый курс скрыт, пока не скопированы все его строки
+            _copy_rows(archived, hot, lookup, course_ids, deleted_at=now)
+        else:
+            _copy_rows(archived, hot, lookup, course_ids)
+    Course.all_objects.filter(pk__in=course_ids).update(deleted_at=now if to_archive else None)
+    for hot, archived, lookup in reversed(ARCHIVE_TABLES):
+        _delete_rows(hot if to_archive else archived, lookup, course_ids)
+
+
+def _reset_caches(course_ids, teacher_ids, student_ids):
+    bump_course_version(*course_ids)
+    invalidate_course_access(*teacher_ids, *student_ids)
+
+
+def courses_to_archive(ended_before=None):
+    """
+    Курсы, закончившиеся раньше ``ended_before`` (по умолчанию — ``ARCHIVE_AFTER`` назад).
+    Удалённые курсы, ожидающие очистки, не архивируются.
+    """
+    if ended_before is None:
+        ended_before = timezone.localdate() - ARCHIVE_AFTER
+    return Course.objects.filter(end_date__lt=ended_before)
+
+
+def archive_courses(courses, batch_size=ARCHIVE_BATCH_SIZE, progress=None):
+    """
+    Переносит курсы выборки в архивные таблицы пачками по ``batch_size`` курсов; строки пачки
+    копируются и удаляются транзакциями по ``ARCHIVE_CHUNK_SIZE`` строк (см. ``_move_courses``).
+    После каждой пачки вызывается ``progress(перенесено курсов)``.
+    Возвращает число перенесённых курсов.
+    """
+    archived = 0
+    while True:
+        batch = list(courses.order_by("pk").values_list("pk", "teacher_id")[:batch_size])
+        if not batch:
+            return archived
+        course_ids = [pk for pk, _ in batch]
+        _move_courses(course_ids, to_archive=True)
+        student_ids = ArchivedEnrollment.objects.filter(course_id__in=course_ids).values_list(
+            "userprofile_id", flat=True
+        )
+        _reset_caches(course_ids, [teacher_id for _, teacher_id in batch], list(student_ids))
+        archived += len(course_ids)
+        if progress is not None:
+            progress(archived)
+
+
+def restore_courses(course_ids):
+    """
+    Возвращает курсы из архива в рабочие таблицы с прежними id. Возвращает число возвращённых курсов.
+    """
+    course_ids = list(ArchivedCourse.objects.filter(pk__in=course_ids).values_list("pk", flat=True))
+    if not course_ids:
+        return 0
+    _move_courses(course_ids, to_archive=False)
+    # Счётчики могли разойтись, если за время в архиве удалялись профили студентов
+    restored = Course.objects.filter(pk__in=course_ids)
+    restored.refresh_students_count()
+    Assignment.objects.filter(course_id__in=course_ids).refresh_completed_count()
+    student_ids = Course.students.through.objects.filter(course_id__in=course_ids).values_list(
+        "userprofile_id", flat=True
+    )
+    _reset_caches(course_ids, restored.values_list("teacher_id", flat=True), list(student_ids))
+    return len(course_ids)
+
+
+def can_view_archived_course(profile, course_id):
+    """
+    Архивный курс видят преподаватели и записанные на него студенты.
+    """
+    if profile.role != "student":
+        return True
+    return ArchivedEnrollment.objects.filter(course_id=course_id, userprofile=profile).exists()
@@ -0,0 +1,21 @@
+"""
+Маршруты для работы под ASGI: те же, что в ``study_buddy.urls``, но главная страница, страница курса
+и страница домашнего задания обслуживаются асинхронными представлениями.
+"""
+from django.urls import URLPattern
+
+from .async_views import AsyncAssignmentDetailView, AsyncCourseDetailView, AsyncHomeView
+from .urls import urlpatterns as sync_urlpatterns
+
+ASYNC_VIEWS = {
+    "home": AsyncHomeView.as_view(),
+    "course_detail": AsyncCourseDetailView.as_view(),
+    "assignment_detail": AsyncAssignmentDetailView.as_view(),
+}
+
+urlpatterns = [
+    URLPattern(pattern.pattern, ASYNC_VIEWS[pattern.name], pattern.default_args, pattern.name)
+    if getattr(pattern, "name", None) in ASYNC_VIEWS
+    else pattern
+    for pattern in sync_urlpatterns
+]
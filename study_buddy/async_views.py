@@ -0,0 +1,199 @@
+"""
+Асинхронные версии самых посещаемых страниц: главной, курса и домашнего задания.
+
+Подключаются через ``study_buddy.async_urls`` только при работе под ASGI (см. ``AsyncViewsMiddleware``),
+под WSGI используются обычные представления из ``views``. Шаблоны общие.
+
+В Django 4.1 асинхронные методы ORM (``aget``, ``aexists``, ``async for``) выполняют запрос
+в общем синхронном потоке, поэтому запросы из ``asyncio.gather`` идут по очереди; параллельными
+они станут без изменений в коде, когда у бэкенда базы данных появится асинхронный драйвер.
+Выигрыш уже сейчас в том, что запрос не держит поток пула, пока ждёт базу или кэш.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.contrib.messages import get_messages
+from django.db import DEFAULT_DB_ALIAS
+from django.http import Http404, HttpResponseForbidden, HttpResponseRedirect
+from django.shortcuts import render
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views import View
+
+from .access import can_view_course
+from .conditional import page_validators
+from .db import retry_on_lock
+from .fragment_cache import aprefetch_fragments
+from .ical import calendar_token
+from .models import ArchivedCourse, Assignment, Course, UserProfile
+from .notifications import unread_count
+from .views import archived_course_view
+
+COURSE_FRAGMENTS = ("students", "lessons", "assignments")
+
+
+def _resolve_viewer(request, course_pk=None, conditional=True):
+    """
+    Всё, что страница берёт из сессии и профиля, за один переход в синхронный поток: пользователь
+    (``request.user`` читает сессию), профиль, сообщения, счётчик уведомлений и валидаторы страницы.
+
+    После этого шаблон можно отрисовывать в цикле событий: ленивых обращений к базе в нём не остаётся.
+    """
+    user = request.user
+    len(get_messages(request))
+    if not user.is_authenticated:
+        return None, 0, (None, None)
+    try:
+        profile = user.userprofile
+    except UserProfile.DoesNotExist:
+        profile = None
+    validators = page_validators(request, course_pk) if conditional else (None, None)
+    return profile, unread_count(profile.pk) if profile else 0, validators
+
+
+class AsyncPageView(View):
+    """
+    Общая часть асинхронных страниц: определение пользователя и условные GET-запросы,
+    как у декоратора ``condition`` в синхронных представлениях.
+    """
+
+    conditional = True
+
+    async def resolve_viewer(self, course_pk=None):
+        self.profile, self.unread_count, validators = await sync_to_async(_resolve_viewer)(
+            self.request, course_pk, self.conditional
+        )
+        etag, last_modified = validators
+        self.etag = quote_etag(etag) if etag else None
+        self.last_modified = int(last_modified.timestamp()) if last_modified else None
+
+    def not_modified(self):
+        return get_conditional_response(self.request, etag=self.etag, last_modified=self.last_modified)
+
+    def render(self, template_name, context):
+        context["unread_notifications_count"] = self.unread_count
+        response = render(self.request, template_name, context)
+        if self.request.method in ("GET", "HEAD"):
+            if self.last_modified:
+                response.headers["Last-Modified"] = http_date(self.last_modified)
+            if self.etag:
+                response.headers["ETag"] = self.etag
+        return response
+
+
+class AsyncHomeView(AsyncPageView):
+    """
+    Асинхронная версия ``HomeView``.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        await self.resolve_viewer()
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        response = self.not_modified()
+        if response is not None:
+            return response
+        context = {"courses": []}
+        if self.profile:
+            context["courses"] = [
+                course async for course in Course.objects.for_dashboard(self.profile).with_post_count()
+            ]
+            context["calendar_url"] = request.build_absolute_uri(
+                reverse("calendar_feed", kwargs={"token": calendar_token(self.profile)})
+            )
+        return self.render("home.html", context)
+
+
+class AsyncCourseDetailView(AsyncPageView):
+    """
+    Асинхронная версия ``CourseDetailView``.
+
+    Курс и проверка доступа запрашиваются одновременно, затем фрагменты читаются из кэша одним
+    запросом; загружаются только те списки, фрагментов которых не оказалось в кэше.
+    """
+
+    async def get(self, request, pk, *args, **kwargs):
+        await self.resolve_viewer(pk)
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        if self.profile is None:
+            return HttpResponseForbidden()
+        role = self.profile.role
+        course, enrolled = await asyncio.gather(
+            Course.objects.with_post_count().select_related("teacher__user").filter(pk=pk).afirst(),
+            self.is_enrolled(pk),
+        )
+        if course is None or not enrolled:
+            # Курс мог быть перенесён в архив: архивная страница синхронная и открывается редко
+            if await ArchivedCourse.objects.filter(pk=pk).aexists():
+                return await sync_to_async(archived_course_view)(request, pk=pk)
+            if course is None:
+                raise Http404("Курс не найден")
+            return HttpResponseForbidden()
+        response = self.not_modified()
+        if response is not None:
+            return response
+
+        # Версия фрагментов — время изменения курса, поэтому кэш читается после загрузки курса
+        fragments = await aprefetch_fragments(course, COURSE_FRAGMENTS, role)
+        loaders = {
+            "students": course.students.select_related("user"),
+            "lessons": course.lessons.all(),
+            "assignments": course.assignments.with_progress(),
+        }
+        if role != "teacher":
+            # Список студентов показывается только преподавателю
+            del loaders["students"]
+        names = [name for name in loaders if fragments.missing(name)]
+        # Загруженные списки попадут в кэш фрагментов, поэтому читаются из основной базы
+        results = await asyncio.gather(*(self.fetch(loaders[name].using(DEFAULT_DB_ALIAS)) for name in names))
+        context = {
+            "course": course,
+            "object": course,
+            "course_fragments": fragments,
+            **dict(zip(names, results)),
+        }
+        response = self.render("course_detail.html", context)
+        await fragments.asave()
+        return response
+
+    async def is_enrolled(self, course_pk):
+        return await sync_to_async(can_view_course)(self.request, course_pk)
+
+    @staticmethod
+    async def fetch(queryset):
+        return [obj async for obj in queryset]
+
+
+class AsyncAssignmentDetailView(AsyncPageView):
+    """
+    Асинхронная версия ``AssignmentDetailView``.
+    """
+
+    conditional = False
+
+    async def get_assignment(self, pk):
+        assignment = await Assignment.objects.select_related("course").filter(pk=pk).afirst()
+        if assignment is None:
+            raise Http404("Домашнее задание не найдено")
+        return assignment
+
+    async def get(self, request, pk, *args, **kwargs):
+        await self.resolve_viewer()
+        assignment = await self.get_assignment(pk)
+        is_completed = False
+        if self.profile is not None:
+            is_completed = await assignment.students_completed.filter(pk=self.profile.pk).aexists()
+        return self.render("assignment_detail.html", {"assignment": assignment, "is_completed": is_completed})
+
+    async def post(self, request, pk, *args, **kwargs):
+        await self.resolve_viewer()
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        assignment = await self.get_assignment(pk)
+        if self.profile is not None and self.profile.role == "student":
+            # Счётчик completed_count обновляется сигналом в той же транзакции, что и add()
+            await sync_to_async(retry_on_lock(assignment.students_completed.add))(self.profile)
+        return HttpResponseRedirect(reverse("assignment_detail", kwargs={"pk": assignment.pk}))
@@ -0,0 +1,64 @@
+import uuid
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .access import invalidate_course_access
+from .models import Assignment, Course, Lesson
+
+
+def shift_local(value, offset):
+    """
+    Сдвигает дату и время на ``offset`` по местным часам: занятие в 10:00 остаётся в 10:00,
+    даже если между семестрами сменилось смещение часового пояса.
+    """
+    local = timezone.localtime(value)
+    return timezone.make_aware(local.replace(tzinfo=None) + offset, local.tzinfo)
+
+
+@transaction.atomic
+def clone_course(course, teacher, title, start_date, copy_students=False):
+    """
+    Копирует курс с занятиями и заданиями для нового семестра: даты сдвигаются на разницу между
+    ``start_date`` и датой начала исходного курса. С ``copy_students`` на копию записываются
+    студенты исходного курса. Форум и отметки о выполнении не копируются.
+
+    Занятия, задания и записи на курс вставляются через ``bulk_create``, поэтому число запросов
+    не зависит от размера курса. Возвращает новый курс.
+    """
+    offset = start_date - course.start_date
+    clone = Course.objects.create(
+        title=title, teacher=teacher, start_date=start_date, end_date=course.end_date + offset
+    )
+    lessons = Lesson.objects.filter(course=course).values("title", "description", "date_time", "series")
+    # Серии занятий копии не должны совпадать с сериями исходного курса
+    series = defaultdict(uuid.uuid4)
+    Lesson.objects.bulk_create(
+        Lesson(
+            course=clone,
+            **{
+                **row,
+                "date_time": shift_local(row["date_time"], offset),
+                "series": row["series"] and series[row["series"]],
+            },
+        )
+        for row in lessons
+    )
+    assignments = Assignment.objects.filter(course=course).values("title", "description", "due_date")
+    Assignment.objects.bulk_create(
+        Assignment(course=clone, **{**row, "due_date": shift_local(row["due_date"], offset)})
+        for row in assignments
+    )
+    if copy_students:
+        student_ids = list(
+            Course.students.through.objects.filter(course=course).values_list("userprofile_id", flat=True)
+        )
+        Course.students.through.objects.bulk_create(
+            Course.students.through(course=clone, userprofile_id=student_id) for student_id in student_ids
+        )
+        # bulk_create не отправляет m2m_changed, поэтому счётчик и кэш доступа обновляются явно
+        Course.objects.filter(pk=clone.pk).refresh_students_count()
+        invalidate_course_access(*student_ids)
+        clone.refresh_from_db(fields=["students_count"])
+    return clone
@@ -0,0 +1,127 @@
+import csv
+
+from django.db import transaction
+
+from .db import chunks
+from .gradebook import HEADER, gradebook_assignments
+from .models import Assignment, Course
+from .signals import completions_changed
+
+# Сколько отметок сравнивается и применяется за один проход
+COMPLETION_BATCH_SIZE = 1000
+
+
+class CompletionReport:
+    """
+    Итоги массовой отметки о выполнении заданий.
+    """
+
+    def __init__(self):
+        self.processed = 0
+        self.added = 0
+        self.removed = 0
+        self.errors = []
+
+    def add_error(self, line, identifier, message):
+        self.errors.append((line, identifier, message))
+
+
+def _apply_batch(batch):
+    """
+    Сравнивает желаемые отметки с таблицей связей и применяет только разницу:
+    один ``bulk_create`` для новых отметок и один DELETE для снятых.
+    """
+    Completion = Assignment.students_completed.through
+    desired = {(student_id, assignment_id): completed for student_id, assignment_id, completed in batch}
+    existing = {
+        (student_id, assignment_id): pk
+        for pk, student_id, assignment_id in Completion.objects.filter(
+            userprofile_id__in={student_id for student_id, _ in desired},
+            assignment_id__in={assignment_id for _, assignment_id in desired},
+        ).values_list("pk", "userprofile_id", "assignment_id")
+    }
+    added = [key for key, completed in desired.items() if completed and key not in existing]
+    removed = [key for key, completed in desired.items() if not completed and key in existing]
+    Completion.objects.bulk_create(
+        [
+            Completion(userprofile_id=student_id, assignment_id=assignment_id)
+            for student_id, assignment_id in added
+        ],
+        ignore_conflicts=True,
+    )
+    Completion.objects.filter(pk__in=[existing[key] for key in removed]).delete()
+    return added, removed
+
+
+def set_completions(course, marks, report=None):
+    """
+    Отмечает или снимает выполнение заданий курса по тройкам (id студента, id задания, выполнено ли).
+
+    Отметки для студентов, не записанных на курс, и для заданий других курсов пропускаются.
+    Всё применяется в одной транзакции, после чего отправляется один сигнал ``completions_changed``
+    со всеми изменениями вместо ``m2m_changed`` на каждую отметку.
+    """
+    report = report or CompletionReport()
+    assignment_ids = set(course.assignments.values_list("pk", flat=True))
+    added, removed = [], []
+    with transaction.atomic():
+        for batch in chunks(marks, COMPLETION_BATCH_SIZE):
+            enrolled = set(
+                Course.students.through.objects.filter(
+                    course=course, userprofile_id__in={student_id for student_id, _, _ in batch}
+                ).values_list("userprofile_id", flat=True)
+            )
+            batch_added, batch_removed = _apply_batch(
+                [mark for mark in batch if mark[0] in enrolled and mark[1] in assignment_ids]
+            )
+            added += batch_added
+            removed += batch_removed
+        if added or removed:
+            completions_changed.send(sender=Assignment, course=course, added=added, removed=removed)
+    report.added += len(added)
+    report.removed += len(removed)
+    return report
+
+
+def _read_marks(course, lines, report):
+    """
+    Читает ведомость в формате выгрузки (см. ``gradebook.py``) и возвращает отметки из её ячеек.
+
+    1 отмечает задание выполненным, 0 снимает отметку, пустая ячейка оставляет всё как есть.
+    Столбцы заданий должны совпадать с текущими заданиями курса.
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    assignments = gradebook_assignments(course)
+    titles = [title for _, title in assignments]
+    if header is None or [cell.strip() for cell in header[len(HEADER) :]] != titles:
+        report.add_error(1, "", "Столбцы заданий не совпадают с заданиями курса, выгрузите ведомость заново")
+        return
+    rows = ((reader.line_num, row) for row in reader if row and row[0].strip())
+    for chunk in chunks(rows, COMPLETION_BATCH_SIZE):
+        students = dict(
+            course.students.filter(user__username__in=[row[0].strip() for _, row in chunk]).values_list(
+                "user__username", "pk"
+            )
+        )
+        for line, row in chunk:
+            username = row[0].strip()
+            report.processed += 1
+            student_id = students.get(username)
+            if student_id is None:
+                report.add_error(line, username, "Студент не записан на курс")
+                continue
+            for (assignment_id, title), value in zip(assignments, row[len(HEADER) :]):
+                value = value.strip()
+                if value in ("1", "0"):
+                    yield student_id, assignment_id, value == "1"
+                elif value:
+                    report.add_error(line, username, f"Недопустимое значение «{value}» в столбце «{title}»")
+
+
+def import_completions(course, lines):
+    """
+    Применяет отметки о выполнении из загруженной ведомости курса.
+    """
+    report = CompletionReport()
+    return set_completions(course, _read_marks(course, lines, report), report)
@@ -0,0 +1,154 @@
+import hashlib
+
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db.models import Count, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .ical import CALENDAR_CACHE_TIMEOUT, profile_id_from_token
+from .models import Assignment, Course, Lesson, UserProfile
+from .notifications import unread_count
+
+
+def _per_course(model, aggregate):
+    return Subquery(
+        model.objects.filter(course_id=OuterRef("pk"))
+        .order_by()
+        .values("course_id")
+        .annotate(value=aggregate)
+        .values("value")
+    )
+
+
+def _max_updated_at(model):
+    return _per_course(model, Max("updated_at"))
+
+
+def _course_state(course_pk):
+    state = (
+        Course.objects.filter(pk=course_pk)
+        .with_post_count()
+        .annotate(
+            lessons_updated_at=_max_updated_at(Lesson), assignments_updated_at=_max_updated_at(Assignment)
+        )
+        .values("updated_at", "lessons_updated_at", "assignments_updated_at", "post_count")
+        .first()
+    )
+    if state is None:
+        return None
+    timestamps = [state["updated_at"], state["lessons_updated_at"], state["assignments_updated_at"]]
+    return state, max(timestamp for timestamp in timestamps if timestamp)
+
+
+def _courses_state(courses, *models, **extra_aggregates):
+    """
+    Сводка по выборке курсов и их занятиям или заданиям: количество и время последнего изменения.
+    Значения по каждому курсу считаются подзапросами, чтобы соединения не перемножали строки.
+    """
+    annotations = {}
+    aggregates = {"total_courses": Count("pk"), "last_course_update": Max("updated_at"), **extra_aggregates}
+    for model in models:
+        name = model._meta.model_name
+        annotations[f"{name}_updated_at"] = _max_updated_at(model)
+        annotations[f"{name}_count"] = Coalesce(_per_course(model, Count("*")), Value(0))
+        aggregates[f"total_{name}s"] = Sum(f"{name}_count")
+        aggregates[f"last_{name}_update"] = Max(f"{name}_updated_at")
+    state = courses.annotate(**annotations).aggregate(**aggregates)
+    timestamps = [
+        state["last_course_update"],
+        *(state[f"last_{model._meta.model_name}_update"] for model in models),
+    ]
+    return state, max((timestamp for timestamp in timestamps if timestamp), default=None)
+
+
+def _dashboard_state(profile):
+    if profile.role == "student":
+        courses = Course.objects.filter(students=profile)
+    else:
+        courses = Course.objects.filter(teacher=profile)
+    return _courses_state(courses.with_post_count(), Assignment, total_posts=Sum("post_count"))
+
+
+def page_validators(request, course_pk=None):
+    """
+    ETag и Last-Modified страницы одним агрегирующим запросом; результат запоминается в запросе,
+    так как декоратор ``condition`` запрашивает их по отдельности.
+
+    Кроме данных курсов, ETag учитывает то, что страница показывает о самом пользователе:
+    профиль, имя, счётчик непрочитанных уведомлений и CSRF-токен форм. Если у пользователя есть
+    непоказанные сообщения (``django.contrib.messages``), страница всегда отрисовывается заново.
+    """
+    cache_name = f"_study_buddy_validators_{course_pk}"
+    if not hasattr(request, cache_name):
+        validators = (None, None)
+        try:
+            profile = request.user.userprofile if request.user.is_authenticated else None
+        except UserProfile.DoesNotExist:
+            profile = None
+        if profile is not None and not len(get_messages(request)):
+            result = _course_state(course_pk) if course_pk is not None else _dashboard_state(profile)
+            if result is not None:
+                state, last_modified = result
+                fingerprint = repr(
+                    (
+                        sorted(state.items()),
+                        profile.pk,
+                        profile.role,
+                        request.user.get_full_name(),
+                        unread_count(profile.pk),
+                        request.META.get("CSRF_COOKIE"),
+                    )
+                )
+                validators = (hashlib.md5(fingerprint.encode()).hexdigest(), last_modified)
+        setattr(request, cache_name, validators)
+    return getattr(request, cache_name)
+
+
+def dashboard_etag(request, *args, **kwargs):
+    return page_validators(request)[0]
+
+
+def dashboard_last_modified(request, *args, **kwargs):
+    return page_validators(request)[1]
+
+
+def course_etag(request, pk, *args, **kwargs):
+    return page_validators(request, pk)[0]
+
+
+def course_last_modified(request, pk, *args, **kwargs):
+    return page_validators(request, pk)[1]
+
+
+def _calendar_validators_key(profile_id):
+    return f"study_buddy:calendar:{profile_id}:validators"
+
+
+def calendar_validators(profile_id):
+    """
+    ETag и Last-Modified календаря пользователя.
+
+    Календарные приложения опрашивают ссылку каждые несколько минут, поэтому значения кэшируются
+    на ``CALENDAR_CACHE_TIMEOUT``: повторный опрос в этот промежуток не обращается к базе.
+    """
+    key = _calendar_validators_key(profile_id)
+    validators = cache.get(key)
+    if validators is None:
+        state, last_modified = _courses_state(Course.objects.visible_to(profile_id), Lesson, Assignment)
+        etag = hashlib.md5(repr((profile_id, sorted(state.items()))).encode()).hexdigest()
+        validators = (etag, last_modified)
+        cache.set(key, validators, CALENDAR_CACHE_TIMEOUT)
+    return validators
+
+
+def _calendar_profile_validators(token):
+    profile_id = profile_id_from_token(token)
+    return calendar_validators(profile_id) if profile_id is not None else (None, None)
+
+
+def calendar_etag(request, token, *args, **kwargs):
+    return _calendar_profile_validators(token)[0]
+
+
+def calendar_last_modified(request, token, *args, **kwargs):
+    return _calendar_profile_validators(token)[1]
@@ -0,0 +1,21 @@
+from .models import UserProfile
+from .notifications import unread_count
+
+
+def notifications(request):
+    """
+    Добавляет в контекст шаблонов количество непрочитанных уведомлений.
+
+    Значение передаётся функцией, поэтому вычисляется, только если шаблон его выводит,
+    и берётся из кэша, а не считается COUNT(*) на каждой странице.
+    """
+
+    def unread_notifications_count():
+        if not request.user.is_authenticated:
+            return 0
+        try:
+            return unread_count(request.user.userprofile.pk)
+        except UserProfile.DoesNotExist:
+            return 0
+
+    return {"unread_notifications_count": unread_notifications_count}
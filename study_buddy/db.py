@@ -0,0 +1,109 @@
+import random
+import sqlite3
+import time
+from functools import partial, wraps
+from itertools import islice
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+
+# Сколько страниц базы копируется за один шаг при обновлении реплики
+BACKUP_STEP_PAGES = 1024
+
+# Сколько раз повторять операцию, упавшую из-за блокировки базы, и базовая пауза между попытками (секунды)
+LOCK_RETRY_ATTEMPTS = 5
+LOCK_RETRY_DELAY = 0.05
+
+
+def chunks(iterable, size):
+    """
+    Делит любой итерируемый объект на списки не длиннее ``size``, читая его лениво: так строки
+    файла или id записываются и выбираются пачками с условием IN фиксированного размера.
+    """
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    Выполняет PRAGMA из настройки ``STUDY_BUDDY_SQLITE_PRAGMAS`` при открытии каждого соединения с SQLite.
+
+    Настройки применяются в порядке словаря, поэтому ``busy_timeout`` стоит указывать первым:
+    тогда переключение в режим WAL подождёт, пока другой процесс освободит базу.
+
+    Настройка ``STUDY_BUDDY_SQLITE_TRANSACTION_MODE`` (например, ``"IMMEDIATE"``) задаёт, как начинаются
+    транзакции ``atomic``, — то же, что ``OPTIONS["transaction_mode"]`` в Django 5.1. Транзакция
+    ``BEGIN IMMEDIATE`` сразу занимает базу на запись и при занятой базе ждёт ``busy_timeout``;
+    обычная ``BEGIN`` сначала читает, а при первой записи после чужой фиксации сразу получает
+    "database is locked".
+    """
+    if connection.vendor != "sqlite":
+        return
+    pragmas = getattr(settings, "STUDY_BUDDY_SQLITE_PRAGMAS", {})
+    if pragmas:
+        with connection.cursor() as cursor:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+    mode = getattr(settings, "STUDY_BUDDY_SQLITE_TRANSACTION_MODE", None)
+    if mode:
+        connection._start_transaction_under_autocommit = partial(_begin_transaction, connection, mode)
+
+
+def _begin_transaction(connection, mode):
+    connection.cursor().execute(f"BEGIN {mode}")
+
+
+def is_database_locked(error):
+    return isinstance(error, OperationalError) and "locked" in str(error)
+
+
+def retry_on_lock(func=None, *, attempts=LOCK_RETRY_ATTEMPTS, delay=LOCK_RETRY_DELAY):
+    """
+    Повторяет функцию, если SQLite ответил "database is locked".
+
+    ``busy_timeout`` заставляет ждать освобождения базы не всегда: если транзакция начала с чтения,
+    а другая успела записать, SQLite сразу возвращает ошибку, и помочь может только повтор
+    транзакции целиком. Поэтому внутри открытой транзакции ошибка не перехватывается —
+    повторить её может только внешний код. Паузы растут экспоненциально со случайной добавкой,
+    чтобы конкурирующие процессы не повторяли попытки одновременно.
+    """
+    if func is None:
+        return lambda func: retry_on_lock(func, attempts=attempts, delay=delay)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(attempts):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as error:
+                last_attempt = attempt == attempts - 1
+                if (
+                    last_attempt
+                    or not is_database_locked(error)
+                    or transaction.get_connection().in_atomic_block
+                ):
+                    raise
+                time.sleep(delay * 2**attempt * (1 + random.random()))
+
+    return wrapper
+
+
+def copy_sqlite_database(source, target_path, pages=BACKUP_STEP_PAGES):
+    """
+    Копирует базу SQLite соединения ``source`` в файл ``target_path`` через backup API.
+
+    Копия пишется прямо в целевой файл в одной транзакции: читатели реплики, в том числе
+    с постоянными соединениями, видят либо старую, либо новую копию целиком. Копирование идёт
+    шагами по ``pages`` страниц, чтобы не задерживать запись в основную базу.
+
+    Внутри транзакции на ``source`` копировать нельзя: SQLite не отдаёт страницы базы,
+    в которую пишет это же соединение.
+    """
+    source.validate_no_atomic_block()
+    source.ensure_connection()
+    target = sqlite3.connect(target_path)
+    try:
+        source.connection.backup(target, pages=pages)
+    finally:
+        target.close()
@@ -0,0 +1,104 @@
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from .access import invalidate_course_access
+from .db import retry_on_lock
+from .fragment_cache import bump_course_version
+from .jobs import enqueue
+from .models import Assignment, Course, Forum, ForumPost, Lesson
+
+logger = logging.getLogger(__name__)
+
+# Сколько строк удаляется одним запросом DELETE при очистке курса
+PURGE_CHUNK_SIZE = 1000
+
+
+def delete_course(course):
+    """
+    Удаляет курс: одним запросом UPDATE помечает его удалённым и ставит в очередь очистку.
+
+    Помеченный курс сразу пропадает из ``Course.objects``, а его занятия и задания — из менеджеров
+    по умолчанию, поэтому страницы не видят курс, удалённый наполовину. Сами строки удаляет
+    ``purge_course`` порциями, не занимая базу на запись надолго.
+    """
+    with transaction.atomic():
+        now = timezone.now()
+        Course.all_objects.filter(pk=course.pk, deleted_at__isnull=True).update(
+            deleted_at=now, updated_at=now
+        )
+        student_ids = list(
+            Course.students.through.objects.filter(course=course).values_list("userprofile_id", flat=True)
+        )
+        enqueue(purge_course_job, course_id=course.pk)
+    course.deleted_at = now
+    # Сигналы удаления не отправляются, поэтому кэши сбрасываются явно
+    bump_course_version(course.pk)
+    invalidate_course_access(course.teacher_id, *student_ids)
+
+
+def _purge_steps(course_id):
+    """
+    Зависимые строки курса в порядке удаления: сначала те, на которые никто не ссылается.
+    Менеджеры ``_base_manager`` не скрывают объекты удалённых курсов.
+    """
+    return (
+        (
+            "отметки о выполнении",
+            Assignment.students_completed.through.objects.filter(assignment__course_id=course_id),
+        ),
+        ("задания", Assignment._base_manager.filter(course_id=course_id)),
+        ("занятия", Lesson._base_manager.filter(course_id=course_id)),
+        ("сообщения форума", ForumPost._base_manager.filter(forum__course_id=course_id)),
+        ("форум", Forum._base_manager.filter(course_id=course_id)),
+        ("записи на курс", Course.students.through.objects.filter(course_id=course_id)),
+        ("курс", Course.all_objects.filter(pk=course_id)),
+    )
+
+
+@retry_on_lock
+def _delete_chunk(queryset, chunk_size):
+    with transaction.atomic():
+        pks = list(queryset.order_by("pk").values_list("pk", flat=True)[:chunk_size])
+        if not pks:
+            return 0
+        # Удаление без сбора объектов и сигналов: зависимые строки уже удалены предыдущими шагами,
+        # а поисковый индекс SQLite очищают триггеры базы
+        return queryset.model._base_manager.filter(pk__in=pks)._raw_delete(queryset.db)
+
+
+def purge_course(course_id, chunk_size=PURGE_CHUNK_SIZE, progress=None):
+    """
+    Удаляет помеченный удалённым курс со всеми зависимыми строками порциями по ``chunk_size``,
+    каждая порция — в отдельной короткой транзакции. После каждой порции вызывается
+    ``progress(название шага, удалено на этом шаге)``. Возвращает число удалённых строк.
+
+    Прерванная очистка безопасно продолжается повторным вызовом. Курс, не помеченный удалённым,
+    не трогается.
+    """
+    if not Course.all_objects.filter(pk=course_id, deleted_at__isnull=False).exists():
+        return 0
+    total = 0
+    for label, queryset in _purge_steps(course_id):
+        deleted = 0
+        while True:
+            count = _delete_chunk(queryset, chunk_size)
+            if not count:
+                break
+            deleted += count
+            if progress is not None:
+                progress(label, deleted)
+        total += deleted
+    return total
+
+
+def purge_course_job(job, course_id):
+    """
+    Обработчик очереди для ``purge_course``; ход очистки записывается в журнал.
+    """
+
+    def log_progress(label, deleted):
+        logger.info("Очистка курса %s: %s — удалено %s", course_id, label, deleted)
+
+    purge_course(course_id, progress=log_progress)
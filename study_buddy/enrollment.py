@@ -0,0 +1,104 @@
+import csv
+
+from django.db import transaction
+
+from .access import invalidate_course_access
+from .db import chunks
+from .fragment_cache import bump_course_version
+from .models import Course, UserProfile
+
+HEADER_NAMES = {"username", "email", "логин", "имя пользователя"}
+
+
+class EnrollmentReport:
+    """
+    Итоги массовой записи студентов на курс.
+    """
+
+    def __init__(self):
+        self.processed = 0
+        self.enrolled = 0
+        self.errors = []
+
+    def add_error(self, line, identifier, message):
+        self.errors.append((line, identifier, message))
+
+
+def _read_identifiers(lines):
+    """
+    Построчно читает CSV и возвращает пары (номер строки, логин или email) из первого столбца.
+    Пустые строки и строка заголовка пропускаются.
+    """
+    reader = csv.reader(lines)
+    for row in reader:
+        identifier = row[0].strip() if row else ""
+        if not identifier or identifier.lower() in HEADER_NAMES:
+            continue
+        yield reader.line_num, identifier
+
+
+def _resolve_profiles(identifiers):
+    """
+    Находит профили по логинам и email запросами с условием IN.
+    Возвращает словари {логин: (id, роль)} и {email: [(id, роль), ...]}.
+    """
+    usernames = [identifier for identifier in identifiers if "@" not in identifier]
+    emails = [identifier for identifier in identifiers if "@" in identifier]
+    by_username, by_email = {}, {}
+    if usernames:
+        rows = UserProfile.objects.filter(user__username__in=usernames).values_list(
+            "pk", "role", "user__username"
+        )
+        by_username = {username: (pk, role) for pk, role, username in rows}
+    if emails:
+        rows = UserProfile.objects.filter(user__email__in=emails).values_list("pk", "role", "user__email")
+        for pk, role, email in rows:
+            by_email.setdefault(email, []).append((pk, role))
+    return by_username, by_email
+
+
+def _enroll_chunk(course, chunk, report):
+    by_username, by_email = _resolve_profiles({identifier for _, identifier in chunk})
+    Enrollment = Course.students.through
+    enrollments = {}
+    for line, identifier in chunk:
+        report.processed += 1
+        if "@" in identifier:
+            matches = by_email.get(identifier, [])
+            if len(matches) > 1:
+                report.add_error(line, identifier, "Найдено несколько пользователей с таким email")
+                continue
+            profile = matches[0] if matches else None
+        else:
+            profile = by_username.get(identifier)
+        if profile is None:
+            report.add_error(line, identifier, "Пользователь не найден")
+        elif profile[1] != "student":
+            report.add_error(line, identifier, "Пользователь не является студентом")
+        else:
+            enrollments[profile[0]] = Enrollment(course_id=course.pk, userprofile_id=profile[0])
+
+    with transaction.atomic():
+        Enrollment.objects.bulk_create(enrollments.values(), ignore_conflicts=True)
+        # bulk_create не отправляет m2m_changed, поэтому счётчик пересчитывается явно
+        Course.objects.filter(pk=course.pk).refresh_students_count()
+    bump_course_version(course.pk)
+    invalidate_course_access(*enrollments)
+
+
+def import_enrollments(course, lines, chunk_size=500):
+    """
+    Записывает на курс студентов из CSV, где в первом столбце указан логин или email.
+
+    ``lines`` — любой итерируемый объект строк (открытый файл, загруженный файл, обёрнутый
+    в TextIOWrapper), он читается потоково. Пользователи ищутся пачками по ``chunk_size``,
+    а строки связей вставляются через ``bulk_create(ignore_conflicts=True)``, поэтому
+    повторная загрузка того же файла безопасна. Ошибочные строки попадают в отчёт и не
+    прерывают загрузку.
+    """
+    report = EnrollmentReport()
+    enrolled_before = course.students.count()
+    for chunk in chunks(_read_identifiers(lines), chunk_size):
+        _enroll_chunk(course, chunk, report)
+    report.enrolled = course.students.count() - enrolled_before
+    return report
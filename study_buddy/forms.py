@@ -1,8 +1,11 @@
+import codecs
+
 from django import forms
 from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
 from django.contrib.auth.models import User
 
-from .models import Assignment, Course, ForumPost, UserProfile
+from .models import Assignment, Course, ForumPost, Lesson, UserProfile
+from .recurrence import WEEKDAYS, RecurrenceRule
 
 
 class UserLoginForm(AuthenticationForm):
@@ -44,6 +47,71 @@ class AssignmentForm(forms.ModelForm):
         fields = ["title", "description", "due_date", "course"]
 
 
+class LessonForm(forms.ModelForm):
+    """
+    Форма занятия. У занятия из серии можно изменить и все следующие занятия серии.
+    """
+
+    scope = forms.ChoiceField(
+        label="Изменить",
+        choices=(("this", "Только это занятие"), ("following", "Это и следующие занятия серии")),
+        initial="this",
+        widget=forms.RadioSelect(attrs={"class": "form-check-input"}),
+    )
+
+    class Meta:
+        model = Lesson
+        fields = ["title", "description", "date_time"]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.series is None:
+            del self.fields["scope"]
+
+
+class LessonSeriesForm(forms.Form):
+    """
+    Форма расписания: занятия по выбранным дням недели в одно время на несколько недель подряд.
+    """
+
+    title = forms.CharField(label="Название", max_length=255)
+    description = forms.CharField(label="Описание", widget=forms.Textarea(attrs={"rows": 3}))
+    weekdays = forms.TypedMultipleChoiceField(
+        label="Дни недели",
+        choices=WEEKDAYS,
+        coerce=int,
+        widget=forms.CheckboxSelectMultiple(attrs={"class": "form-check-input"}),
+    )
+    time = forms.TimeField(label="Время", widget=forms.TimeInput(attrs={"type": "time"}, format="%H:%M"))
+    start_date = forms.DateField(
+        label="Первая неделя с", widget=forms.DateInput(attrs={"type": "date"}, format="%Y-%m-%d")
+    )
+    weeks = forms.IntegerField(label="Число недель", min_value=1, max_value=52, initial=16)
+    skip_dates = forms.CharField(
+        label="Пропустить даты",
+        required=False,
+        widget=forms.Textarea(attrs={"rows": 2}),
+        help_text="Праздники и каникулы через запятую или с новой строки, например 23.02.2027.",
+    )
+
+    def clean_skip_dates(self):
+        field = forms.DateField(input_formats=["%d.%m.%Y", "%Y-%m-%d"])
+        values = self.cleaned_data["skip_dates"].replace(",", " ").split()
+        dates = set()
+        for value in values:
+            try:
+                dates.add(field.clean(value))
+            except forms.ValidationError:
+                raise forms.ValidationError(f"Неверная дата: {value}")
+        return dates
+
+    def rule(self):
+        data = self.cleaned_data
+        return RecurrenceRule(
+            data["weekdays"], data["time"], data["start_date"], data["weeks"], data["skip_dates"]
+        )
+
+
 class ForumPostForm(forms.ModelForm):
     """
     Форма для создания нового сообщения на форуме.
@@ -68,3 +136,66 @@ class CourseForm(forms.ModelForm):
     class Meta:
         model = Course
         fields = ["title", "teacher", "start_date", "end_date", "students"]
+
+
+class CourseCloneForm(forms.Form):
+    """
+    Форма копирования курса на новый семестр.
+    """
+
+    title = forms.CharField(label="Название", max_length=255)
+    start_date = forms.DateField(
+        label="Дата начала",
+        widget=forms.DateInput(attrs={"type": "date"}, format="%Y-%m-%d"),
+        help_text="Даты занятий и сроки заданий сдвигаются на столько же дней, что и начало курса.",
+    )
+    copy_students = forms.BooleanField(label="Записать на копию студентов этого курса", required=False)
+
+
+class CsvUploadForm(forms.Form):
+    """
+    Базовая форма загрузки CSV-файла. Файл заранее проверяется на кодировку UTF-8, чтобы
+    импорт не прерывался на середине файла; файл читается частями, без загрузки в память целиком.
+    """
+
+    def clean_file(self):
+        upload = self.cleaned_data["file"]
+        decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        line = 1
+        try:
+            for chunk in upload.chunks():
+                decoder.decode(chunk)
+                line += chunk.count(b"\n")
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError as error:
+            # Перевод строки в UTF-8 не встречается внутри многобайтовых символов
+            line += error.object[: error.start].count(b"\n")
+            raise forms.ValidationError(
+                f"Файл должен быть в кодировке UTF-8, недопустимые символы в строке {line}. "
+                "Сохраните файл в UTF-8 и загрузите заново."
+            )
+        upload.seek(0)
+        return upload
+
+
+class EnrollmentImportForm(CsvUploadForm):
+    """
+    Форма загрузки CSV-файла со списком студентов для записи на курс.
+    """
+
+    file = forms.FileField(
+        label="CSV-файл",
+        help_text="В первом столбце каждой строки — логин или email студента.",
+    )
+
+
+class CompletionImportForm(CsvUploadForm):
+    """
+    Форма загрузки ведомости курса с отметками о выполнении заданий.
+    """
+
+    file = forms.FileField(
+        label="CSV-файл",
+        help_text="Ведомость в формате выгрузки: 1 — задание выполнено, 0 — не выполнено, "
+        "пустая ячейка — без изменений.",
+    )
@@ -0,0 +1,141 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from .models import Course
+
+# Время жизни фрагмента; ограничивает устаревание данных, не отслеживаемых версией (например, имён студентов)
+FRAGMENT_CACHE_TIMEOUT = 60 * 60
+
+HITS_KEY = "study_buddy:fragments:hits"
+MISSES_KEY = "study_buddy:fragments:misses"
+
+
+def fragment_cache():
+    """
+    Кэш для фрагментов страниц, задаётся настройкой ``STUDY_BUDDY_FRAGMENT_CACHE`` (псевдоним из ``CACHES``).
+    """
+    return caches[getattr(settings, "STUDY_BUDDY_FRAGMENT_CACHE", "default")]
+
+
+def is_shared_cache(cache):
+    """
+    Виден ли кэш всем процессам сервера. LocMemCache у каждого процесса свой, DummyCache ничего не хранит.
+    """
+    return not isinstance(cache, (LocMemCache, DummyCache))
+
+
+def _version(updated_at):
+    return int(updated_at.timestamp() * 1_000_000)
+
+
+def course_versions(course_ids):
+    """
+    Версии курсов одним запросом к основной базе: {id курса: версия}.
+    """
+    rows = (
+        Course._base_manager.using(DEFAULT_DB_ALIAS).filter(pk__in=course_ids).values_list("pk", "updated_at")
+    )
+    return {pk: _version(updated_at) for pk, updated_at in rows}
+
+
+def bump_course_version(*course_ids):
+    """
+    Делает устаревшими все закэшированные фрагменты курсов: старые ключи просто перестают читаться.
+
+    Версия фрагментов — ``Course.updated_at``, поэтому она хранится в базе и меняется вместе с данными
+    той же транзакцией: сброс из команды или обработчика задач сразу виден всем процессам сервера.
+    """
+    if course_ids:
+        Course._base_manager.filter(pk__in=set(course_ids)).update(updated_at=timezone.now())
+
+
+def _fragment_key(course_id, version, name, variant):
+    return f"study_buddy:course:{course_id}:v{version}:{name}:{variant}"
+
+
+def fragment_key(course, name, variant):
+    return _fragment_key(course.pk, _version(course.updated_at), name, variant)
+
+
+def _count(key):
+    cache = fragment_cache()
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+async def _acount(key, amount):
+    cache = fragment_cache()
+    if not await cache.aadd(key, amount, None):
+        try:
+            await cache.aincr(key, amount)
+        except ValueError:
+            await cache.aset(key, amount, None)
+
+
+def get_fragment(key):
+    content = fragment_cache().get(key)
+    _count(MISSES_KEY if content is None else HITS_KEY)
+    return content
+
+
+def set_fragment(key, content):
+    fragment_cache().set(key, content, FRAGMENT_CACHE_TIMEOUT)
+
+
+def fragment_cache_stats():
+    values = fragment_cache().get_many([HITS_KEY, MISSES_KEY])
+    return {"hits": values.get(HITS_KEY, 0), "misses": values.get(MISSES_KEY, 0)}
+
+
+def reset_fragment_cache_stats():
+    fragment_cache().delete_many([HITS_KEY, MISSES_KEY])
+
+
+class PrefetchedFragments:
+    """
+    Фрагменты курса, заранее прочитанные из кэша асинхронным представлением.
+
+    Тег ``coursecache`` берёт содержимое отсюда, а отрисованные при промахе фрагменты
+    откладывает, чтобы представление сохранило их в кэш одним запросом после отрисовки.
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.rendered = {}
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def __getitem__(self, name):
+        return self.entries[name]
+
+    def missing(self, name):
+        return self.entries[name][1] is None
+
+    def remember(self, key, content):
+        self.rendered[key] = content
+
+    async def asave(self):
+        if self.rendered:
+            await fragment_cache().aset_many(self.rendered, FRAGMENT_CACHE_TIMEOUT)
+
+
+async def aprefetch_fragments(course, names, variant):
+    """
+    Читает фрагменты курса одним запросом к кэшу (``get_many``) и учитывает попадания и промахи.
+    """
+    keys = {name: fragment_key(course, name, variant) for name in names}
+    contents = await fragment_cache().aget_many(keys.values())
+    hits = sum(key in contents for key in keys.values())
+    if hits:
+        await _acount(HITS_KEY, hits)
+    if len(keys) - hits:
+        await _acount(MISSES_KEY, len(keys) - hits)
+    return PrefetchedFragments({name: (key, contents.get(key)) for name, key in keys.items()})
@@ -0,0 +1,72 @@
+import csv
+
+from .models import Assignment, Course
+
+# Сколько строк читается из базы за одно обращение к курсору
+GRADEBOOK_CHUNK_SIZE = 2000
+HEADER = ["Логин", "Фамилия", "Имя"]
+
+
+def gradebook_assignments(course):
+    return list(
+        Assignment.objects.filter(course=course).order_by("due_date", "pk").values_list("pk", "title")
+    )
+
+
+def gradebook_rows(course):
+    """
+    Строки ведомости курса: заголовок, затем по строке на студента с 1/0 по каждому заданию.
+
+    Записи на курс и отметки о выполнении читаются двумя курсорами, упорядоченными по id студента,
+    и сливаются на ходу, поэтому число запросов не зависит от количества студентов и заданий,
+    а в памяти держится только строка текущего студента.
+    """
+    assignments = gradebook_assignments(course)
+    columns = {pk: index for index, (pk, _) in enumerate(assignments)}
+    yield HEADER + [title for _, title in assignments]
+
+    students = (
+        Course.students.through.objects.filter(course=course)
+        .order_by("userprofile_id")
+        .values_list(
+            "userprofile_id",
+            "userprofile__user__username",
+            "userprofile__user__last_name",
+            "userprofile__user__first_name",
+        )
+        .iterator(chunk_size=GRADEBOOK_CHUNK_SIZE)
+    )
+    completions = (
+        Assignment.students_completed.through.objects.filter(assignment__course=course)
+        .order_by("userprofile_id")
+        .values_list("userprofile_id", "assignment_id")
+        .iterator(chunk_size=GRADEBOOK_CHUNK_SIZE)
+    )
+    completion = next(completions, None)
+    for student_id, username, last_name, first_name in students:
+        marks = [0] * len(assignments)
+        # Отметки студентов, исключённых из курса, пропускаются
+        while completion is not None and completion[0] <= student_id:
+            if completion[0] == student_id:
+                marks[columns[completion[1]]] = 1
+            completion = next(completions, None)
+        yield [username, last_name, first_name, *marks]
+
+
+class Echo:
+    """
+    Объект с интерфейсом файла для ``csv.writer``, который возвращает записанную строку, а не сохраняет её.
+    """
+
+    def write(self, value):
+        return value
+
+
+def gradebook_csv(course):
+    """
+    Генератор строк CSV ведомости. Начинается с BOM, чтобы Excel распознал кодировку UTF-8.
+    """
+    writer = csv.writer(Echo())
+    yield "\ufeff"
+    for row in gradebook_rows(course):
+        yield writer.writerow(row)
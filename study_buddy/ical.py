@@ -0,0 +1,140 @@
+from datetime import timezone as dt_timezone
+
+from django.core import signing
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import CharField, F, Value
+from django.utils import timezone
+
+from .models import Assignment, Course, Lesson
+
+TOKEN_SALT = "study_buddy.calendar"
+# Сколько событий читается из базы за одно обращение к курсору
+FEED_CHUNK_SIZE = 500
+# Время жизни закэшированного календаря; столько же может запаздывать его обновление
+CALENDAR_CACHE_TIMEOUT = 60 * 5
+# Домен в UID событий; не зависит от адреса сайта, чтобы UID не менялись
+UID_DOMAIN = "study-buddy"
+
+
+def calendar_token(profile):
+    """
+    Токен ссылки на календарь пользователя. Ссылка открывается без входа в систему,
+    поэтому идентификатор профиля подписывается ``SECRET_KEY``.
+    """
+    return signing.Signer(salt=TOKEN_SALT).sign(str(profile.pk))
+
+
+def profile_id_from_token(token):
+    """
+    Возвращает id профиля из токена или None, если подпись неверна.
+    """
+    try:
+        return int(signing.Signer(salt=TOKEN_SALT).unsign(token))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def feed_events(profile_id):
+    """
+    Занятия и сроки сдачи заданий всех курсов пользователя одним запросом UNION ALL.
+    Строки читаются курсором через ``iterator()``, поэтому календарь не загружается в память целиком.
+    """
+    course_ids = Course.objects.visible_to(profile_id).values("pk")
+    columns = ("kind", "pk", "title", "description", "starts_at", "course_title", "updated_at")
+    lessons = (
+        Lesson.objects.filter(course_id__in=course_ids)
+        .annotate(kind=Value("lesson", output_field=CharField()), starts_at=F("date_time"))
+        .annotate(course_title=F("course__title"))
+        .values_list(*columns)
+        .order_by()
+    )
+    assignments = (
+        Assignment.objects.filter(course_id__in=course_ids)
+        .annotate(kind=Value("assignment", output_field=CharField()), starts_at=F("due_date"))
+        .annotate(course_title=F("course__title"))
+        .values_list(*columns)
+        .order_by()
+    )
+    # Календарь кэшируется, поэтому читается из основной базы
+    return (
+        lessons.union(assignments, all=True)
+        .order_by("starts_at")
+        .using(DEFAULT_DB_ALIAS)
+        .iterator(chunk_size=FEED_CHUNK_SIZE)
+    )
+
+
+def _escape(text):
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _format_datetime(value):
+    return value.astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _line(name, value):
+    """
+    Строка свойства iCalendar, разбитая на части не длиннее 75 байт (RFC 5545, раздел 3.1).
+    """
+    line = f"{name}:{value}"
+    parts, current = [], ""
+    for char in line:
+        if len((current + char).encode()) > (75 if not parts else 74):
+            parts.append(current)
+            current = ""
+        current += char
+    parts.append(current)
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def render_calendar(events):
+    """
+    Генератор частей файла ``.ics``: по одной на событие, чтобы ответ можно было отдавать потоком.
+    """
+    yield (
+        _line("BEGIN", "VCALENDAR")
+        + _line("VERSION", "2.0")
+        + _line("PRODID", "-//Study Buddy//RU")
+        + _line("CALSCALE", "GREGORIAN")
+        + _line("X-WR-CALNAME", "Study Buddy")
+    )
+    stamp = _format_datetime(timezone.now())
+    for kind, pk, title, description, starts_at, course_title, updated_at in events:
+        summary = title if kind == "lesson" else f"Срок сдачи: {title}"
+        yield (
+            _line("BEGIN", "VEVENT")
+            + _line("UID", f"{kind}-{pk}@{UID_DOMAIN}")
+            + _line("DTSTAMP", stamp)
+            + _line("LAST-MODIFIED", _format_datetime(updated_at))
+            + _line("DTSTART", _format_datetime(starts_at))
+            + _line("SUMMARY", _escape(f"{summary} ({course_title})"))
+            + _line("DESCRIPTION", _escape(description))
+            + _line("END", "VEVENT")
+        )
+    yield _line("END", "VCALENDAR")
+
+
+def _calendar_body_key(profile_id, etag):
+    return f"study_buddy:calendar:{profile_id}:{etag}"
+
+
+def cached_calendar(profile_id, etag):
+    return cache.get(_calendar_body_key(profile_id, etag))
+
+
+def stream_calendar(profile_id, etag):
+    """
+    Отдаёт календарь потоком и, когда он выдан целиком, кэширует его под текущим ETag.
+    """
+    chunks = []
+    for chunk in render_calendar(feed_events(profile_id)):
+        chunks.append(chunk)
+        yield chunk
+    cache.set(_calendar_body_key(profile_id, etag), "".join(chunks), CALENDAR_CACHE_TIMEOUT)
@@ -0,0 +1,93 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Сколько раз повторять упавшую задачу, прежде чем пометить её как ошибочную
+MAX_ATTEMPTS = 5
+# Через сколько задача в статусе «Выполняется» считается брошенной упавшим обработчиком
+STALE_AFTER = timedelta(minutes=15)
+
+
+def enqueue(handler, **payload):
+    """
+    Ставит задачу в очередь. ``handler`` — функция уровня модуля, которая будет вызвана
+    обработчиком очереди как ``handler(job, **payload)``; ``payload`` должен сериализоваться в JSON.
+
+    Задача сохраняется одной вставкой в текущей транзакции, поэтому она не потеряется,
+    если запрос откатится, и не будет выполнена раньше, чем зафиксируются данные запроса.
+    """
+    return Job.objects.create(name=f"{handler.__module__}.{handler.__qualname__}", payload=payload)
+
+
+def _retry_delay(attempts):
+    return timedelta(seconds=10 * 2**attempts)
+
+
+def release_stale_jobs():
+    """
+    Возвращает в очередь задачи, которые слишком долго числятся выполняемыми.
+    """
+    return Job.objects.filter(status=Job.STATUS_RUNNING, locked_at__lt=timezone.now() - STALE_AFTER).update(
+        status=Job.STATUS_PENDING
+    )
+
+
+def claim_jobs(limit):
+    """
+    Забирает до ``limit`` готовых к выполнению задач.
+
+    Задача захватывается условным UPDATE по статусу, поэтому несколько обработчиков
+    могут работать одновременно без SELECT ... FOR UPDATE, которого нет в SQLite.
+    """
+    now = timezone.now()
+    candidates = (
+        Job.objects.filter(status=Job.STATUS_PENDING, run_after__lte=now)
+        .order_by("run_after", "pk")
+        .values_list("pk", flat=True)[:limit]
+    )
+    claimed = []
+    for pk in list(candidates):
+        if Job.objects.filter(pk=pk, status=Job.STATUS_PENDING).update(
+            status=Job.STATUS_RUNNING, locked_at=now, attempts=F("attempts") + 1
+        ):
+            claimed.append(pk)
+    return list(Job.objects.filter(pk__in=claimed).order_by("run_after", "pk"))
+
+
+def run_job(job):
+    """
+    Выполняет задачу и записывает результат. Упавшая задача откладывается с экспоненциальной
+    задержкой, поэтому обработчики должны быть идемпотентными.
+    """
+    try:
+        import_string(job.name)(job, **job.payload)
+    except Exception:
+        logger.exception("Задача %s (%s) завершилась ошибкой", job.pk, job.name)
+        failed = job.attempts >= MAX_ATTEMPTS
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.STATUS_FAILED if failed else Job.STATUS_PENDING,
+            run_after=timezone.now() + _retry_delay(job.attempts),
+            last_error=traceback.format_exc(),
+        )
+        return False
+    Job.objects.filter(pk=job.pk).update(status=Job.STATUS_DONE, last_error="")
+    return True
+
+
+def run_pending(limit=10):
+    """
+    Выполняет одну порцию задач из очереди и возвращает количество выполненных.
+    """
+    release_stale_jobs()
+    jobs = claim_jobs(limit)
+    for job in jobs:
+        run_job(job)
+    return len(jobs)
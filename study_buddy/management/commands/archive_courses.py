@@ -0,0 +1,49 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from study_buddy.archive import (
+    ARCHIVE_AFTER,
+    ARCHIVE_BATCH_SIZE,
+    archive_courses,
+    courses_to_archive,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Переносит завершившиеся курсы вместе с занятиями, заданиями, отметками о выполнении и форумом "
+        "в архивные таблицы. Архивные курсы остаются доступны для просмотра по прежним адресам."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ended-before",
+            type=date.fromisoformat,
+            help=f"Дата в формате ГГГГ-ММ-ДД: архивировать курсы, закончившиеся раньше неё. "
+            f"По умолчанию — {ARCHIVE_AFTER.days} дней назад.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=ARCHIVE_BATCH_SIZE,
+            help="Сколько курсов переносить за один проход.",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Только показать, сколько курсов будет перенесено."
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("Размер пачки должен быть положительным")
+        courses = courses_to_archive(options["ended_before"])
+        total = courses.count()
+        self.stdout.write(f"Курсов для переноса в архив: {total}")
+        if options["dry_run"] or not total:
+            return
+
+        def report(archived):
+            self.stdout.write(f"  перенесено {archived} из {total}")
+
+        archived = archive_courses(courses, options["batch_size"], progress=report)
+        self.stdout.write(self.style.SUCCESS(f"Перенесено в архив курсов: {archived}"))
@@ -0,0 +1,246 @@
+import json
+import math
+import statistics
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from study_buddy.ical import calendar_token
+from study_buddy.models import Course
+from study_buddy.seeding import SEED_USERNAME_PREFIX
+
+DEFAULT_BASELINE = "benchmark_baseline.json"
+
+
+class Scenario:
+    """
+    Замеряемая страница: от чьего имени она открывается (``None`` — без входа) и как строится её адрес
+    по данным замера (см. ``BenchmarkData``).
+    """
+
+    def __init__(self, name, role, url):
+        self.name = name
+        self.role = role
+        self.url = url
+
+
+class BenchmarkData:
+    """
+    Объекты, на которых открываются страницы: курс преподавателя, его первый студент и первое задание курса.
+    """
+
+    def __init__(self, teacher):
+        self.teacher = teacher
+        self.course = Course.objects.filter(teacher=teacher, students_count__gt=0).order_by("pk").first()
+        if self.course is None:
+            raise CommandError(f"У преподавателя {teacher} нет курсов со студентами")
+        self.student = self.course.students.select_related("user").order_by("pk").first()
+        self.assignment = self.course.assignments.order_by("pk").first()
+        if self.assignment is None:
+            raise CommandError(f"В курсе «{self.course}» нет заданий")
+
+
+# Только чтение: повторные прогоны идут на одних и тех же данных и сравнимы между собой
+SCENARIOS = (
+    Scenario("home:student", "student", lambda data: reverse("home")),
+    Scenario("home:teacher", "teacher", lambda data: reverse("home")),
+    Scenario(
+        "course_detail:student", "student", lambda data: reverse("course_detail", args=[data.course.pk])
+    ),
+    Scenario(
+        "course_detail:teacher", "teacher", lambda data: reverse("course_detail", args=[data.course.pk])
+    ),
+    Scenario(
+        "assignment_detail:student",
+        "student",
+        lambda data: reverse("assignment_detail", args=[data.assignment.pk]),
+    ),
+    Scenario("forum_detail:student", "student", lambda data: reverse("forum_detail", args=[data.course.pk])),
+    Scenario(
+        "completion_grid:teacher", "teacher", lambda data: reverse("completion_grid", args=[data.course.pk])
+    ),
+    Scenario(
+        "gradebook_export:teacher", "teacher", lambda data: reverse("gradebook_export", args=[data.course.pk])
+    ),
+    Scenario(
+        "student_search:teacher",
+        "teacher",
+        lambda data: f"{reverse('student_search', args=[data.course.pk])}?q={SEED_USERNAME_PREFIX}student_1",
+    ),
+    Scenario("timetable:student", "student", lambda data: reverse("timetable")),
+    Scenario("timetable_month:teacher", "teacher", lambda data: f"{reverse('timetable')}?period=month"),
+    Scenario("search:student", "student", lambda data: f"{reverse('search')}?q=задач"),
+    Scenario("notification_list:student", "student", lambda data: reverse("notification_list")),
+    Scenario(
+        "calendar_feed", None, lambda data: reverse("calendar_feed", args=[calendar_token(data.student)])
+    ),
+    Scenario(
+        "api_course_list:student",
+        "student",
+        lambda data: f"{reverse('api_course_list')}?include=teacher,lessons,assignments",
+    ),
+    Scenario(
+        "api_lesson_list:student", "student", lambda data: f"{reverse('api_lesson_list')}?include=course"
+    ),
+    Scenario(
+        "api_assignment_list:student",
+        "student",
+        lambda data: f"{reverse('api_assignment_list')}?include=course",
+    ),
+    Scenario("api_completion_list:teacher", "teacher", lambda data: reverse("api_completion_list")),
+)
+
+
+def percentile(values, percent):
+    # Метод ближайшего ранга: значение всегда одно из измеренных
+    ordered = sorted(values)
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет основные страницы через тестовый клиент на сгенерированных командой seed данных: "
+        "задержки (медиана, 95-й и 99-й перцентили) и число запросов к базе. Результат сравнивается "
+        "с сохранённой базовой линией; при росте числа запросов или задержек команда завершается ошибкой."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--teacher",
+            default=f"{SEED_USERNAME_PREFIX}teacher_0",
+            help="Логин преподавателя, на курсе которого выполняются замеры.",
+        )
+        parser.add_argument("--requests", type=int, default=50, help="Число замеряемых запросов к странице.")
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            dest="scenarios",
+            help="Замерить только указанную страницу (можно указать несколько раз).",
+        )
+        parser.add_argument(
+            "--baseline",
+            default=str(settings.BASE_DIR / DEFAULT_BASELINE),
+            help="Файл базовой линии.",
+        )
+        parser.add_argument(
+            "--save-baseline", action="store_true", help="Сохранить результаты как новую базовую линию."
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Допустимый относительный рост 95-го перцентиля задержки.",
+        )
+        parser.add_argument(
+            "--min-delta",
+            type=float,
+            default=5.0,
+            help="Рост 95-го перцентиля меньше этого числа миллисекунд не считается регрессией.",
+        )
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1:
+            raise CommandError("Число запросов должно быть положительным")
+        scenarios = SCENARIOS
+        if options["scenarios"]:
+            unknown = set(options["scenarios"]) - {scenario.name for scenario in SCENARIOS}
+            if unknown:
+                raise CommandError(f"Неизвестные страницы: {', '.join(sorted(unknown))}")
+            scenarios = [scenario for scenario in SCENARIOS if scenario.name in options["scenarios"]]
+        try:
+            teacher = User.objects.select_related("userprofile").get(username=options["teacher"]).userprofile
+        except User.DoesNotExist:
+            raise CommandError(
+                f"Пользователь {options['teacher']} не найден, сгенерируйте данные командой seed"
+            )
+        data = BenchmarkData(teacher)
+
+        # Тестовые клиенты обращаются к хосту testserver
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            clients = {None: Client(), "teacher": Client(), "student": Client()}
+            clients["teacher"].force_login(teacher.user)
+            clients["student"].force_login(data.student.user)
+            results = {}
+            for scenario in scenarios:
+                results[scenario.name] = self.measure(
+                    clients[scenario.role], scenario.url(data), options["requests"]
+                )
+                self.report(scenario.name, results[scenario.name])
+
+        if options["save_baseline"]:
+            with open(options["baseline"], "w", encoding="utf-8") as baseline_file:
+                json.dump({"requests": options["requests"], "scenarios": results}, baseline_file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Базовая линия сохранена в {options['baseline']}"))
+            return
+        self.compare(results, options)
+
+    def measure(self, client, url, requests):
+        # Прогрев: первый запрос заполняет кэши
+        self.fetch(client, url)
+        latencies, queries = [], []
+        for _ in range(requests):
+            with ExitStack() as stack:
+                contexts = [
+                    stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections
+                ]
+                started = time.perf_counter()
+                self.fetch(client, url)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(sum(len(context) for context in contexts))
+        return {
+            "p50_ms": round(statistics.median(latencies), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "queries": max(queries),
+        }
+
+    @staticmethod
+    def fetch(client, url):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f"{url}: ответ {response.status_code}")
+        # Потоковые ответы (выгрузка ведомости) формируются при чтении
+        if response.streaming:
+            b"".join(response.streaming_content)
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"{name}: медиана {result['p50_ms']:.1f} мс, 95-й перцентиль {result['p95_ms']:.1f} мс, "
+            f"99-й перцентиль {result['p99_ms']:.1f} мс, запросов к базе: {result['queries']}"
+        )
+
+    def compare(self, results, options):
+        try:
+            with open(options["baseline"], encoding="utf-8") as baseline_file:
+                baseline = json.load(baseline_file)["scenarios"]
+        except FileNotFoundError:
+            raise CommandError(
+                f"Базовая линия {options['baseline']} не найдена, сохраните её с --save-baseline"
+            )
+        regressions = []
+        for name, result in results.items():
+            expected = baseline.get(name)
+            if expected is None:
+                self.stdout.write(self.style.WARNING(f"{name}: нет в базовой линии"))
+                continue
+            if result["queries"] > expected["queries"]:
+                regressions.append(
+                    f"{name}: запросов к базе {result['queries']} вместо {expected['queries']}"
+                )
+            limit = max(
+                expected["p95_ms"] * (1 + options["tolerance"]), expected["p95_ms"] + options["min_delta"]
+            )
+            if result["p95_ms"] > limit:
+                regressions.append(
+                    f"{name}: 95-й перцентиль {result['p95_ms']:.1f} мс вместо {expected['p95_ms']:.1f} мс"
+                )
+        if regressions:
+            raise CommandError("Регрессии производительности:\n" + "\n".join(regressions))
+        self.stdout.write(self.style.SUCCESS("Регрессий относительно базовой линии нет"))
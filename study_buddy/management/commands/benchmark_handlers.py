@@ -0,0 +1,107 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает пропускную способность страниц под WSGI (синхронные представления, пул потоков) "
+        "и ASGI (асинхронные представления) от имени указанного пользователя."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", help="Логин пользователя, от имени которого выполняются запросы.")
+        parser.add_argument(
+            "--url",
+            action="append",
+            dest="urls",
+            help="Адрес страницы (можно указать несколько раз). По умолчанию — главная страница.",
+        )
+        parser.add_argument("--requests", type=int, default=200, help="Число запросов к каждой странице.")
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=10,
+            help="Число одновременных запросов: потоков для WSGI и задач для ASGI.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"Пользователь {options['username']} не найден")
+        total, concurrency = options["requests"], options["concurrency"]
+        if total < 1 or concurrency < 1:
+            raise CommandError("Число запросов и одновременных запросов должно быть положительным")
+
+        # Тестовые клиенты обращаются к хосту testserver
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            client = Client()
+            client.force_login(user)
+            for url in options["urls"] or [reverse("home")]:
+                self.stdout.write(url)
+                self.report("WSGI", *self.run_wsgi(url, client.cookies, total, concurrency))
+                self.report("ASGI", *async_to_sync(self.run_asgi)(url, client.cookies, total, concurrency))
+
+    def run_wsgi(self, url, cookies, total, concurrency):
+        def worker(count):
+            client = Client()
+            client.cookies.update(cookies)
+            try:
+                return [self.timed(client.get, url) for _ in range(count)]
+            finally:
+                if concurrency > 1:
+                    connections.close_all()
+
+        counts = [total // concurrency + (i < total % concurrency) for i in range(concurrency)]
+        # Прогрев: первый запрос заполняет кэши, как и в ASGI-прогоне
+        worker(1)
+        started = time.perf_counter()
+        if concurrency == 1:
+            results = worker(total)
+        else:
+            with ThreadPoolExecutor(concurrency) as pool:
+                results = [result for chunk in pool.map(worker, counts) for result in chunk]
+        return results, time.perf_counter() - started
+
+    async def run_asgi(self, url, cookies, total, concurrency):
+        client = AsyncClient()
+        client.cookies.update(cookies)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def request():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(url)
+                return time.perf_counter() - started, response.status_code
+
+        # Прогрев
+        await request()
+        started = time.perf_counter()
+        results = await asyncio.gather(*(request() for _ in range(total)))
+        return results, time.perf_counter() - started
+
+    @staticmethod
+    def timed(get, url):
+        started = time.perf_counter()
+        response = get(url)
+        return time.perf_counter() - started, response.status_code
+
+    def report(self, handler, results, elapsed):
+        latencies = sorted(latency * 1000 for latency, _ in results)
+        errors = sum(status != 200 for _, status in results)
+        p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+        self.stdout.write(
+            f"  {handler}: {len(results) / elapsed:.1f} запросов/с, "
+            f"медиана {statistics.median(latencies):.1f} мс, 95-й перцентиль {p95:.1f} мс, ошибок: {errors}"
+        )
@@ -0,0 +1,33 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from study_buddy.gradebook import gradebook_csv
+from study_buddy.models import Course
+
+
+class Command(BaseCommand):
+    help = "Выгружает ведомости выполнения заданий курсов в CSV-файлы."
+
+    def add_arguments(self, parser):
+        parser.add_argument("output_dir", help="Каталог, в который сохраняются файлы course_<id>.csv.")
+        parser.add_argument(
+            "--course",
+            type=int,
+            action="append",
+            dest="course_ids",
+            help="Выгрузить только курс с этим идентификатором (можно указать несколько раз).",
+        )
+
+    def handle(self, *args, **options):
+        os.makedirs(options["output_dir"], exist_ok=True)
+        courses = Course.objects.order_by("pk")
+        if options["course_ids"]:
+            courses = courses.filter(pk__in=options["course_ids"])
+        exported = 0
+        for course in courses.iterator():
+            path = os.path.join(options["output_dir"], f"course_{course.pk}.csv")
+            with open(path, "w", newline="", encoding="utf-8") as csv_file:
+                csv_file.writelines(gradebook_csv(course))
+            exported += 1
+        self.stdout.write(self.style.SUCCESS(f"Выгружено ведомостей: {exported}"))
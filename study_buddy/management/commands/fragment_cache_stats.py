@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from study_buddy.fragment_cache import (
+    fragment_cache,
+    fragment_cache_stats,
+    is_shared_cache,
+    reset_fragment_cache_stats,
+)
+
+
+class Command(BaseCommand):
+    help = "Показывает число попаданий и промахов кэша фрагментов страниц курса."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Обнулить счётчики после вывода.",
+        )
+
+    def handle(self, *args, **options):
+        if not is_shared_cache(fragment_cache()):
+            # Счётчики ведут процессы сервера, а команда запускается в своём процессе со своим кэшем
+            raise CommandError(
+                "Кэш фрагментов хранится в памяти каждого процесса, команда не видит счётчиков сервера. "
+                "Укажите в STUDY_BUDDY_FRAGMENT_CACHE общий кэш (Redis, Memcached)."
+            )
+        stats = fragment_cache_stats()
+        total = stats["hits"] + stats["misses"]
+        ratio = stats["hits"] / total * 100 if total else 0
+        self.stdout.write(f"Попаданий: {stats['hits']}, промахов: {stats['misses']} ({ratio:.1f}% попаданий)")
+        if options["reset"]:
+            reset_fragment_cache_stats()
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from study_buddy.enrollment import import_enrollments
+from study_buddy.models import Course
+
+
+class Command(BaseCommand):
+    help = "Записывает на курс студентов из CSV-файла с логинами или email."
+
+    def add_arguments(self, parser):
+        parser.add_argument("course_id", type=int, help="Идентификатор курса.")
+        parser.add_argument("path", help="Путь к CSV-файлу.")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Сколько строк обрабатывать за один запрос.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            course = Course.objects.get(pk=options["course_id"])
+        except Course.DoesNotExist:
+            raise CommandError(f"Курс {options['course_id']} не найден")
+
+        try:
+            with open(options["path"], newline="", encoding="utf-8-sig") as csv_file:
+                report = import_enrollments(course, csv_file, chunk_size=options["chunk_size"])
+        except UnicodeDecodeError:
+            # Загрузка идемпотентна: после исправления кодировки файл можно загрузить повторно
+            raise CommandError("Файл должен быть в кодировке UTF-8")
+
+        for line, identifier, message in report.errors:
+            self.stderr.write(f"Строка {line} ({identifier}): {message}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Обработано строк: {report.processed}, записано новых студентов: {report.enrolled}, "
+                f"ошибок: {len(report.errors)}"
+            )
+        )
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from study_buddy.deletion import PURGE_CHUNK_SIZE, purge_course
+from study_buddy.models import Course
+
+
+class Command(BaseCommand):
+    help = (
+        "Окончательно удаляет курсы, помеченные удалёнными, вместе с занятиями, заданиями, отметками "
+        "о выполнении и форумом. Обычно это делает обработчик очереди; команда нужна, если очистка "
+        "не завершилась."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=PURGE_CHUNK_SIZE,
+            help="Сколько строк удалять одним запросом.",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("Размер порции должен быть положительным")
+
+        def report(label, deleted):
+            self.stdout.write(f"  {label}: удалено {deleted}")
+
+        course_ids = Course.all_objects.filter(deleted_at__isnull=False).values_list("pk", flat=True)
+        for course_id in list(course_ids):
+            self.stdout.write(f"Курс {course_id}")
+            deleted = purge_course(course_id, options["chunk_size"], progress=report)
+            self.stdout.write(self.style.SUCCESS(f"Курс {course_id} удалён, строк: {deleted}"))
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+
+from study_buddy.models import Assignment, Course
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает и проверяет счётчики студентов курсов и выполнивших задания."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Только проверить счётчики, ничего не изменяя. Завершается ошибкой при расхождениях.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Сколько строк пересчитывать в одной транзакции.",
+        )
+
+    def handle(self, *args, **options):
+        counters = (
+            # Удалённые курсы и их задания тоже проверяются: их можно восстановить до очистки
+            ("курсов", Course.all_objects, "with_stale_students_count", "refresh_students_count"),
+            ("заданий", Assignment.all_objects, "with_stale_completed_count", "refresh_completed_count"),
+        )
+        stale_total = 0
+        for label, manager, stale_method, refresh_method in counters:
+            stale = getattr(manager.all(), stale_method)().count()
+            stale_total += stale
+            self.stdout.write(f"Расхождений в счётчиках {label}: {stale}")
+            if options["check"]:
+                continue
+            self._refresh(manager, stale_method, refresh_method, options["batch_size"])
+            remaining = getattr(manager.all(), stale_method)().count()
+            if remaining:
+                raise CommandError(f"После пересчёта остались расхождения в счётчиках {label}: {remaining}")
+            self.stdout.write(self.style.SUCCESS(f"Счётчики {label} пересчитаны"))
+
+        if options["check"] and stale_total:
+            raise CommandError("Счётчики расходятся с данными, выполните rebuild_counters без --check")
+
+    def _refresh(self, manager, stale_method, refresh_method, batch_size):
+        """
+        Пересчитывает счётчики диапазонами первичных ключей, чтобы не держать блокировку
+        на запись всей таблицы в одной транзакции. Обновляются только расходящиеся строки и только
+        столбец счётчика: ``updated_at`` не меняется, поэтому пересчёт не сбрасывает кэш страниц.
+        """
+        max_pk = manager.aggregate(max_pk=Max("pk"))["max_pk"] or 0
+        for start in range(0, max_pk, batch_size):
+            with transaction.atomic():
+                stale = getattr(manager.filter(pk__gt=start, pk__lte=start + batch_size), stale_method)()
+                getattr(stale, refresh_method)(touch=False)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from study_buddy.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Перестраивает полнотекстовый индекс занятий, заданий и сообщений форума."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if not rebuild_search_index():
+                raise CommandError("Полнотекстовый поиск (SQLite FTS5) недоступен для этой базы данных.")
+        self.stdout.write("Поисковый индекс перестроен.")
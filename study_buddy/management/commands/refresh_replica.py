@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from study_buddy.db import copy_sqlite_database
+from study_buddy.routers import replica_aliases
+
+
+class Command(BaseCommand):
+    help = "Обновляет реплики SQLite копией основной базы (для локальной проверки чтения из реплик)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "aliases",
+            nargs="*",
+            help="Псевдонимы реплик из DATABASES. По умолчанию — все из STUDY_BUDDY_REPLICAS.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Обновлять реплики каждые столько секунд, пока команду не остановят.",
+        )
+
+    def handle(self, *args, **options):
+        aliases = options["aliases"] or replica_aliases()
+        if not aliases:
+            raise CommandError("Реплики не настроены (STUDY_BUDDY_REPLICAS)")
+        source = connections[DEFAULT_DB_ALIAS]
+        for alias in aliases:
+            if alias not in connections.databases or alias == DEFAULT_DB_ALIAS:
+                raise CommandError(f"Неизвестная реплика: {alias}")
+            if connections[alias].vendor != "sqlite" or source.vendor != "sqlite":
+                raise CommandError(
+                    "Копированием обновляются только реплики SQLite, остальные — репликацией СУБД"
+                )
+        while True:
+            for alias in aliases:
+                started = time.perf_counter()
+                copy_sqlite_database(source, connections[alias].settings_dict["NAME"])
+                self.stdout.write(f"Реплика {alias} обновлена за {time.perf_counter() - started:.2f} с")
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from study_buddy.archive import restore_courses
+
+
+class Command(BaseCommand):
+    help = "Возвращает курсы из архива в рабочие таблицы с прежними id и адресами страниц."
+
+    def add_arguments(self, parser):
+        parser.add_argument("course_ids", nargs="+", type=int, help="Id архивных курсов.")
+
+    def handle(self, *args, **options):
+        requested = set(options["course_ids"])
+        restored = restore_courses(requested)
+        if not restored:
+            raise CommandError("Указанных курсов нет в архиве")
+        if restored < len(requested):
+            self.stdout.write(self.style.WARNING(f"Не найдено в архиве курсов: {len(requested) - restored}"))
+        self.stdout.write(self.style.SUCCESS(f"Возвращено из архива курсов: {restored}"))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from study_buddy.jobs import run_pending
+
+
+class Command(BaseCommand):
+    help = "Выполняет фоновые задачи из очереди (рассылку уведомлений и т. п.)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Выполнить все готовые задачи и завершиться.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10,
+            help="Сколько задач забирать из очереди за раз.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=2.0,
+            help="Пауза в секундах, когда очередь пуста.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = run_pending(limit=options["batch_size"])
+            if processed:
+                self.stdout.write(f"Обработано задач: {processed}")
+                continue
+            if options["once"]:
+                break
+            time.sleep(options["sleep"])
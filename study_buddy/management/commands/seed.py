@@ -0,0 +1,75 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from study_buddy.seeding import (
+    SEED_PASSWORD,
+    SEED_USERNAME_PREFIX,
+    SeedOptions,
+    delete_seeded_data,
+    seed_database,
+    seeded_users,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет базу сгенерированными преподавателями, студентами, курсами, занятиями, заданиями, "
+        f"отметками о выполнении и сообщениями форума. Логины пользователей начинаются с {SEED_USERNAME_PREFIX}, "
+        f"пароль у всех — {SEED_PASSWORD}."
+    )
+
+    def add_arguments(self, parser):
+        defaults = SeedOptions()
+        parser.add_argument("--teachers", type=int, default=defaults.teachers, help="Число преподавателей.")
+        parser.add_argument("--students", type=int, default=defaults.students, help="Число студентов.")
+        parser.add_argument("--courses", type=int, default=defaults.courses, help="Число курсов.")
+        parser.add_argument(
+            "--students-per-course",
+            type=int,
+            default=defaults.students_per_course,
+            help="Сколько студентов записано на каждый курс.",
+        )
+        parser.add_argument("--lessons", type=int, default=defaults.lessons, help="Число занятий на курс.")
+        parser.add_argument(
+            "--assignments", type=int, default=defaults.assignments, help="Число заданий на курс."
+        )
+        parser.add_argument(
+            "--completion-rate",
+            type=float,
+            default=defaults.completion_rate,
+            help="Доля студентов, выполнивших задание с прошедшим сроком (от 0 до 1).",
+        )
+        parser.add_argument(
+            "--posts", type=int, default=defaults.posts, help="Число сообщений на форуме каждого курса."
+        )
+        parser.add_argument(
+            "--seed", type=int, default=defaults.seed, help="Начальное значение генератора случайных чисел."
+        )
+        parser.add_argument(
+            "--replace", action="store_true", help="Удалить данные предыдущего запуска перед генерацией."
+        )
+
+    def handle(self, *args, **options):
+        counts = ("teachers", "students", "courses", "students_per_course", "lessons", "assignments", "posts")
+        if any(options[name] < 0 for name in counts) or options["teachers"] < 1:
+            raise CommandError(
+                "Числа объектов не могут быть отрицательными, нужен хотя бы один преподаватель"
+            )
+        if not 0 <= options["completion_rate"] <= 1:
+            raise CommandError("Доля выполненных заданий должна быть от 0 до 1")
+        if seeded_users().exists():
+            if not options["replace"]:
+                raise CommandError(
+                    f"В базе уже есть сгенерированные данные (пользователи {SEED_USERNAME_PREFIX}*), "
+                    "запустите команду с --replace"
+                )
+            self.stdout.write(f"Удалено объектов предыдущего запуска: {delete_seeded_data()}")
+
+        started = time.perf_counter()
+        created = seed_database(
+            SeedOptions(**{name: options[name] for name in (*counts, "completion_rate", "seed")})
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(", ".join(f"{name}: {count}" for name, count in created.items()))
+        self.stdout.write(self.style.SUCCESS(f"Данные сгенерированы за {elapsed:.1f} с"))
@@ -0,0 +1,153 @@
+import multiprocessing
+import random
+import time
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+
+from study_buddy.completion import set_completions
+from study_buddy.db import is_database_locked, retry_on_lock
+from study_buddy.models import Assignment, Course, UserProfile
+
+USERNAME_PREFIX = "stress_writes_"
+
+
+@retry_on_lock
+def _enroll(course, student_id, assignment_id):
+    course.students.add(student_id)
+
+
+@retry_on_lock
+def _unenroll(course, student_id, assignment_id):
+    course.students.remove(student_id)
+
+
+@retry_on_lock
+def _mark(course, student_id, assignment_id):
+    set_completions(course, [(student_id, assignment_id, True)])
+
+
+@retry_on_lock
+def _unmark(course, student_id, assignment_id):
+    set_completions(course, [(student_id, assignment_id, False)])
+
+
+# Отметки о выполнении в часы сдачи заданий встречаются чаще, чем изменения состава курса
+OPERATIONS = (_enroll, _unenroll, _mark, _mark, _unmark)
+
+
+def _run_worker(task):
+    seed, operations, course_id, student_ids, assignment_ids = task
+    rng = random.Random(seed)
+    course = Course.objects.get(pk=course_id)
+    stats = Counter()
+    for _ in range(operations):
+        operation = rng.choice(OPERATIONS)
+        try:
+            operation(course, rng.choice(student_ids), rng.choice(assignment_ids))
+            stats["ok"] += 1
+        except OperationalError as error:
+            stats["locked" if is_database_locked(error) else "failed"] += 1
+    return stats
+
+
+def _run_process(task):
+    try:
+        return _run_worker(task)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочная проверка записи: несколько процессов одновременно записывают студентов на курс "
+        "и отмечают выполнение заданий. Завершается ошибкой, если запись упёрлась в блокировку базы "
+        "или счётчики разошлись с данными."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=4, help="Число процессов-писателей.")
+        parser.add_argument("--operations", type=int, default=200, help="Число операций в каждом процессе.")
+        parser.add_argument("--students", type=int, default=20, help="Число студентов тестового курса.")
+        parser.add_argument("--assignments", type=int, default=5, help="Число заданий тестового курса.")
+        parser.add_argument("--keep", action="store_true", help="Не удалять тестовые данные после проверки.")
+
+    def handle(self, *args, **options):
+        if min(options["processes"], options["operations"], options["students"], options["assignments"]) < 1:
+            raise CommandError("Все параметры должны быть положительными")
+        if User.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            raise CommandError(
+                f"В базе остались данные предыдущего запуска (пользователи {USERNAME_PREFIX}*)"
+            )
+        with connection.cursor() as cursor:
+            settings_summary = []
+            if connection.vendor == "sqlite":
+                for pragma in ("journal_mode", "synchronous", "busy_timeout"):
+                    cursor.execute(f"PRAGMA {pragma}")
+                    settings_summary.append(f"{pragma}={cursor.fetchone()[0]}")
+        self.stdout.write(f"База данных: {connection.vendor} {' '.join(settings_summary)}")
+
+        course, student_ids, assignment_ids = self.create_data(options["students"], options["assignments"])
+        try:
+            tasks = [
+                (seed, options["operations"], course.pk, student_ids, assignment_ids)
+                for seed in range(options["processes"])
+            ]
+            started = time.perf_counter()
+            stats = self.run(tasks)
+            elapsed = time.perf_counter() - started
+            self.report(stats, elapsed, course)
+        finally:
+            if not options["keep"]:
+                self.delete_data(course)
+
+    def create_data(self, students, assignments):
+        with transaction.atomic():
+            teacher = UserProfile.objects.create(
+                user=User.objects.create(username=f"{USERNAME_PREFIX}teacher"), role="teacher"
+            )
+            course = Course.objects.create(
+                title="Нагрузочная проверка", start_date="2023-01-01", end_date="2023-12-31", teacher=teacher
+            )
+            users = User.objects.bulk_create(
+                User(username=f"{USERNAME_PREFIX}student_{number}") for number in range(students)
+            )
+            profiles = UserProfile.objects.bulk_create(
+                UserProfile(user=user, role="student") for user in users
+            )
+            created = Assignment.objects.bulk_create(
+                Assignment(course=course, title=f"Задание {number}", due_date="2023-06-01 12:00:00+00:00")
+                for number in range(assignments)
+            )
+        return course, [profile.pk for profile in profiles], [assignment.pk for assignment in created]
+
+    def run(self, tasks):
+        if len(tasks) == 1:
+            return [_run_worker(tasks[0])]
+        # Дочерние процессы не должны унаследовать открытые соединения родителя
+        connections.close_all()
+        with multiprocessing.get_context("fork").Pool(len(tasks)) as pool:
+            return pool.map(_run_process, tasks)
+
+    def report(self, stats, elapsed, course):
+        total = sum(stats, Counter())
+        operations = sum(total.values())
+        self.stdout.write(
+            f"Операций: {operations} за {elapsed:.2f} с ({operations / elapsed:.1f} в секунду), "
+            f"успешно: {total['ok']}, упёрлись в блокировку: {total['locked']}, другие ошибки: {total['failed']}"
+        )
+        stale = (
+            Course.objects.filter(pk=course.pk).with_stale_students_count().count()
+            + Assignment.objects.filter(course=course).with_stale_completed_count().count()
+        )
+        if stale:
+            raise CommandError(f"Счётчики разошлись с данными: {stale}")
+        if total["locked"] or total["failed"]:
+            raise CommandError("Часть операций завершилась ошибкой")
+        self.stdout.write(self.style.SUCCESS("Все операции выполнены, счётчики сходятся"))
+
+    def delete_data(self, course):
+        course.delete()
+        User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
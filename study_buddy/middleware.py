@@ -0,0 +1,134 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.utils.functional import SimpleLazyObject
+
+from .access import CourseAccess, course_access
+from .models import UserProfile
+from .routers import (
+    finish_request_routing,
+    replica_aliases,
+    routed_stream,
+    start_request_routing,
+    sticky_seconds,
+)
+
+ASYNC_URLCONF = "study_buddy.async_urls"
+LAST_WRITE_SESSION_KEY = "_study_buddy_last_write"
+PROFILE_BACKEND = "study_buddy.backends.ProfileModelBackend"
+# Сессии, открытые до перехода на ProfileModelBackend
+LEGACY_BACKEND = "django.contrib.auth.backends.ModelBackend"
+
+
+class HybridMiddleware:
+    """
+    Middleware, работающее и под WSGI, и под ASGI без перехода в поток: под ASGI вызывается ``__acall__``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process(request)
+
+    def process(self, request):
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+
+class AsyncViewsMiddleware(HybridMiddleware):
+    """
+    Под ASGI направляет запросы в ``study_buddy.async_urls``, где самые посещаемые страницы
+    обслуживаются асинхронными представлениями. Под WSGI ничего не меняет.
+    """
+
+    async def __acall__(self, request):
+        request.urlconf = ASYNC_URLCONF
+        return await self.get_response(request)
+
+
+class ReplicaRoutingMiddleware(HybridMiddleware):
+    """
+    Разрешает ``ReplicaRouter`` читать из реплик во время запроса. После запроса, записавшего данные,
+    сессия читает из основной базы ``STUDY_BUDDY_REPLICA_STICKY_SECONDS`` секунд, чтобы, например,
+    преподаватель сразу увидел созданное занятие, даже если реплика ещё не обновилась.
+
+    Должно стоять после ``SessionMiddleware``.
+    """
+
+    @staticmethod
+    def use_replica(request):
+        last_write = request.session.get(LAST_WRITE_SESSION_KEY)
+        return last_write is None or time.time() - last_write > sticky_seconds()
+
+    @staticmethod
+    def finish(request, response, routing):
+        if routing.wrote:
+            request.session[LAST_WRITE_SESSION_KEY] = time.time()
+        if response.streaming:
+            response.streaming_content = routed_stream(response.streaming_content, routing.use_replica)
+        return response
+
+    def process(self, request):
+        if not replica_aliases():
+            return self.get_response(request)
+        token = start_request_routing(self.use_replica(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            routing = finish_request_routing(token)
+        return self.finish(request, response, routing)
+
+    async def __acall__(self, request):
+        if not replica_aliases():
+            return await self.get_response(request)
+        # Чтение сессии обращается к базе
+        token = start_request_routing(await sync_to_async(self.use_replica)(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            routing = finish_request_routing(token)
+        return self.finish(request, response, routing)
+
+
+def _request_course_access(request):
+    try:
+        profile = request.user.userprofile if request.user.is_authenticated else None
+    except UserProfile.DoesNotExist:
+        profile = None
+    return course_access(profile.pk) if profile is not None else CourseAccess()
+
+
+class ProfileMiddleware(HybridMiddleware):
+    """
+    Добавляет в запрос ``request.course_access`` — id курсов пользователя (см. ``access.course_access``),
+    которые вычисляются при первом обращении и дальше в запросе берутся из памяти.
+
+    Сессии, открытые через ``ModelBackend``, переводятся на ``ProfileModelBackend``, чтобы пользователи
+    не выходили из системы. Должно стоять после ``AuthenticationMiddleware``.
+    """
+
+    @staticmethod
+    def prepare(request):
+        if request.session.get(BACKEND_SESSION_KEY) == LEGACY_BACKEND:
+            request.session[BACKEND_SESSION_KEY] = PROFILE_BACKEND
+        request.course_access = SimpleLazyObject(lambda: _request_course_access(request))
+
+    def process(self, request):
+        self.prepare(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # Чтение сессии обращается к базе
+        await sync_to_async(self.prepare)(request)
+        return await self.get_response(request)
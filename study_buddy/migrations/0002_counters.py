@@ -0,0 +1,61 @@
+# Generated by Django 4.1.13 on 2026-10-18 19:29
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Course = apps.get_model("study_buddy", "Course")
+    Assignment = apps.get_model("study_buddy", "Assignment")
+    enrolled = (
+        Course.students.through.objects.filter(course_id=OuterRef("pk"))
+        .order_by()
+        .values("course_id")
+        .annotate(count=Count("*"))
+        .values("count")
+    )
+    completed = (
+        Assignment.students_completed.through.objects.filter(assignment_id=OuterRef("pk"))
+        .order_by()
+        .values("assignment_id")
+        .annotate(count=Count("*"))
+        .values("count")
+    )
+    Course.objects.update(students_count=Coalesce(Subquery(enrolled), Value(0)))
+    Assignment.objects.update(completed_count=Coalesce(Subquery(completed), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("study_buddy", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="assignment",
+            options={
+                "ordering": ["-due_date"],
+                "verbose_name": "Домашнее задание или проект",
+                "verbose_name_plural": "Домашние задания и проекты",
+            },
+        ),
+        migrations.AlterModelOptions(
+            name="lesson",
+            options={"ordering": ["-date_time"], "verbose_name": "Занятие", "verbose_name_plural": "Занятия"},
+        ),
+        migrations.AddField(
+            model_name="assignment",
+            name="completed_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Количество выполнивших"
+            ),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="students_count",
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="Количество студентов"),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.1.13 on 2026-10-18 19:31
+
+from django.conf import settings
+from django.db import migrations
+
+# Индексы для поиска студентов по префиксу (istartswith) логина, имени и фамилии.
+# Индексы создаются на таблице пользователей из django.contrib.auth, поэтому вместо
+# AddIndex используется SQL, подходящий для выражения, которое Django строит для istartswith.
+SEARCH_COLUMNS = ("username", "first_name", "last_name")
+
+
+def _index_name(column):
+    return f"study_buddy_user_{column}_prefix_idx"
+
+
+def create_search_indexes(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    table = schema_editor.quote_name(User._meta.db_table)
+    vendor = schema_editor.connection.vendor
+    for column in SEARCH_COLUMNS:
+        name = schema_editor.quote_name(_index_name(column))
+        quoted_column = schema_editor.quote_name(column)
+        if vendor == "sqlite":
+            # LIKE в SQLite регистронезависим и использует индекс только с COLLATE NOCASE
+            expression = f"{quoted_column} COLLATE NOCASE"
+        elif vendor == "postgresql":
+            expression = f"(UPPER({quoted_column}::text)) text_pattern_ops"
+        else:
+            expression = quoted_column
+        schema_editor.execute(f"CREATE INDEX {name} ON {table} ({expression})")
+
+
+def drop_search_indexes(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(
+            schema_editor.sql_delete_index
+            % {
+                "table": schema_editor.quote_name(User._meta.db_table),
+                "name": schema_editor.quote_name(_index_name(column)),
+            }
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("study_buddy", "0002_counters"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.db import migrations
+
+INDEX_NAME = "study_buddy_user_email_idx"
+
+
+def create_email_index(apps, schema_editor):
+    # Массовая запись студентов ищет пользователей по email условием IN
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    schema_editor.execute(
+        "CREATE INDEX %s ON %s (%s)"
+        % (
+            schema_editor.quote_name(INDEX_NAME),
+            schema_editor.quote_name(User._meta.db_table),
+            schema_editor.quote_name("email"),
+        )
+    )
+
+
+def drop_email_index(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    schema_editor.execute(
+        schema_editor.sql_delete_index
+        % {
+            "table": schema_editor.quote_name(User._meta.db_table),
+            "name": schema_editor.quote_name(INDEX_NAME),
+        }
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("study_buddy", "0003_student_search_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_email_index, drop_email_index),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.1.13 on 2026-10-18 19:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("study_buddy", "0005_job_queue"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "read", "created_at", "id"], name="study_buddy_notif_unread_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(fields=["user", "created_at", "id"], name="study_buddy_notif_inbox_idx"),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.13 on 2026-10-18 19:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("study_buddy", "0006_notification_inbox_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="forumpost",
+            index=models.Index(fields=["forum", "created_at", "id"], name="study_buddy_forumpost_list_idx"),
+        ),
+    ]
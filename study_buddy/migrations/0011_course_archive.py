@@ -0,0 +1,210 @@
+# Generated by Django 4.1.13 on 2026-10-18 20:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("study_buddy", "0010_course_soft_delete"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedAssignment",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("title", models.CharField(max_length=255, verbose_name="Название")),
+                ("description", models.TextField(verbose_name="Описание")),
+                ("due_date", models.DateTimeField(verbose_name="Срок выполнения")),
+                (
+                    "completed_count",
+                    models.PositiveIntegerField(default=0, verbose_name="Количество выполнивших"),
+                ),
+                ("updated_at", models.DateTimeField(verbose_name="Дата изменения")),
+            ],
+            options={
+                "verbose_name": "Архивное задание",
+                "verbose_name_plural": "Архивные задания",
+                "ordering": ["-due_date"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedCourse",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("title", models.CharField(max_length=255, verbose_name="Название")),
+                ("start_date", models.DateField(verbose_name="Дата начала")),
+                ("end_date", models.DateField(verbose_name="Дата окончания")),
+                (
+                    "students_count",
+                    models.PositiveIntegerField(default=0, verbose_name="Количество студентов"),
+                ),
+                ("updated_at", models.DateTimeField(verbose_name="Дата изменения")),
+                (
+                    "archived_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="Дата переноса в архив"
+                    ),
+                ),
+                (
+                    "teacher",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_courses_taught",
+                        to="study_buddy.userprofile",
+                        verbose_name="Преподаватель",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Архивный курс",
+                "verbose_name_plural": "Архивные курсы",
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedForum",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("title", models.CharField(max_length=255, verbose_name="Название")),
+                (
+                    "course",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="forum",
+                        to="study_buddy.archivedcourse",
+                        verbose_name="Курс",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Архивный форум",
+                "verbose_name_plural": "Архивные форумы",
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedLesson",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("title", models.CharField(max_length=255, verbose_name="Название")),
+                ("description", models.TextField(verbose_name="Описание")),
+                ("date_time", models.DateTimeField(verbose_name="Дата и время")),
+                ("updated_at", models.DateTimeField(verbose_name="Дата изменения")),
+                (
+                    "course",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lessons",
+                        to="study_buddy.archivedcourse",
+                        verbose_name="Курс",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Архивное занятие",
+                "verbose_name_plural": "Архивные занятия",
+                "ordering": ["-date_time"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedForumPost",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("title", models.CharField(max_length=255, verbose_name="Заголовок")),
+                ("content", models.TextField(verbose_name="Содержание")),
+                ("created_at", models.DateTimeField(verbose_name="Дата создания")),
+                ("updated_at", models.DateTimeField(verbose_name="Дата изменения")),
+                (
+                    "author",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_forum_posts",
+                        to="study_buddy.userprofile",
+                        verbose_name="Автор",
+                    ),
+                ),
+                (
+                    "forum",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="posts",
+                        to="study_buddy.archivedforum",
+                        verbose_name="Форум",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Архивное сообщение на форуме",
+                "verbose_name_plural": "Архивные сообщения на форуме",
+                "ordering": ["created_at", "id"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedEnrollment",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                (
+                    "course",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="enrollments",
+                        to="study_buddy.archivedcourse",
+                        verbose_name="Курс",
+                    ),
+                ),
+                (
+                    "userprofile",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_enrollments",
+                        to="study_buddy.userprofile",
+                        verbose_name="Студент",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Запись на архивный курс",
+                "verbose_name_plural": "Записи на архивные курсы",
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedCompletion",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                (
+                    "assignment",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="completions",
+                        to="study_buddy.archivedassignment",
+                        verbose_name="Задание",
+                    ),
+                ),
+                (
+                    "userprofile",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_completions",
+                        to="study_buddy.userprofile",
+                        verbose_name="Студент",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Отметка о выполнении архивного задания",
+                "verbose_name_plural": "Отметки о выполнении архивных заданий",
+            },
+        ),
+        migrations.AddField(
+            model_name="archivedassignment",
+            name="course",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="assignments",
+                to="study_buddy.archivedcourse",
+                verbose_name="Курс",
+            ),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.1.13 on 2026-10-18 20:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("study_buddy", "0011_course_archive"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="archivedlesson",
+            name="series",
+            field=models.UUIDField(blank=True, editable=False, null=True, verbose_name="Серия занятий"),
+        ),
+        migrations.AddField(
+            model_name="lesson",
+            name="series",
+            field=models.UUIDField(
+                blank=True, db_index=True, editable=False, null=True, verbose_name="Серия занятий"
+            ),
+        ),
+    ]
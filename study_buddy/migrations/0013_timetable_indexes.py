@@ -0,0 +1,21 @@
+# Generated by Django 4.1.13 on 2026-10-18 20:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("study_buddy", "0012_lesson_series"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="assignment",
+            index=models.Index(fields=["course", "due_date"], name="study_buddy_assign_due_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="lesson",
+            index=models.Index(fields=["course", "date_time"], name="study_buddy_lesson_time_idx"),
+        ),
+    ]
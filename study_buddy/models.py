@@ -1,5 +1,19 @@
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import (
+    Case,
+    Count,
+    Exists,
+    F,
+    OuterRef,
+    Prefetch,
+    Q,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 
 class UserProfile(models.Model):
@@ -24,7 +38,128 @@ class UserProfile(models.Model):
         return self.user.username
 
 
-class Course(models.Model):
+class CounterFieldsMixin:
+    """
+    Примесь для моделей с денормализованными счётчиками ``counter_fields``.
+
+    Счётчики поддерживаются только запросами UPDATE: сигналы ``m2m_changed`` (см. ``signals.py``)
+    и команда ``rebuild_counters`` вызывают ``refresh_students_count`` и ``refresh_completed_count``.
+    Поэтому ``save()`` существующего объекта, в том числе из админки, записывает все поля, кроме
+    счётчиков, чтобы не затереть их значением из устаревшей копии. Явный ``update_fields`` со счётчиком
+    — ошибка: такое сохранение молча затёрло бы пересчитанное значение.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            conflicting = sorted(set(update_fields) & set(self.counter_fields))
+            if conflicting:
+                raise ValueError(
+                    f"Счётчики {', '.join(conflicting)} не сохраняются через save(), "
+                    "их пересчитывают методы refresh_*_count"
+                )
+        elif not self._state.adding and not args:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class CourseQuerySet(models.QuerySet):
+    def visible_to(self, profile):
+        """
+        Курсы, на которые пользователь записан или которые он преподаёт, без повторов.
+        Принимает профиль или его id.
+        """
+        courses = Course.objects.filter(Q(students=profile) | Q(teacher=profile)).values("pk")
+        return self.filter(pk__in=courses)
+
+    def for_dashboard(self, profile):
+        """
+        Курсы пользователя для главной страницы.
+
+        Для студента вместе с курсами подгружаются преподаватели и задания с флагом ``is_completed``,
+        поэтому число запросов не зависит от количества курсов и заданий.
+        """
+        if profile.role != "student":
+            return self.filter(teacher=profile)
+        completed = Assignment.students_completed.through.objects.filter(
+            assignment_id=OuterRef("pk"), userprofile_id=profile.pk
+        )
+        assignments = Assignment.objects.annotate(is_completed=Exists(completed))
+        return (
+            self.filter(students=profile)
+            .select_related("teacher__user")
+            .prefetch_related(Prefetch("assignments", queryset=assignments))
+        )
+
+    def with_post_count(self):
+        """
+        Добавляет аннотацию ``post_count`` с количеством сообщений на форуме курса.
+        """
+        posts = (
+            ForumPost.objects.filter(forum__course_id=OuterRef("pk"))
+            .order_by()
+            .values("forum__course_id")
+            .annotate(count=Count("*"))
+            .values("count")
+        )
+        return self.annotate(post_count=Coalesce(Subquery(posts), Value(0)))
+
+    def _actual_students_count(self):
+        enrolled = (
+            Course.students.through.objects.filter(course_id=OuterRef("pk"))
+            .order_by()
+            .values("course_id")
+            .annotate(count=Count("*"))
+            .values("count")
+        )
+        return Coalesce(Subquery(enrolled), Value(0))
+
+    def refresh_students_count(self, touch=True):
+        """
+        Пересчитывает ``students_count`` у курсов выборки одним запросом UPDATE.
+        Изменение состава курса обновляет и ``updated_at``, чтобы страницы курса не считались актуальными;
+        с ``touch=False`` записывается только счётчик.
+        """
+        values = {"students_count": self._actual_students_count()}
+        if touch:
+            values["updated_at"] = timezone.now()
+        return self.update(**values)
+
+    def with_stale_students_count(self):
+        """
+        Курсы, у которых сохранённый ``students_count`` расходится с фактическим.
+        """
+        return self.alias(actual_students_count=self._actual_students_count()).exclude(
+            students_count=F("actual_students_count")
+        )
+
+
+class CourseManager(models.Manager):
+    """
+    Менеджер курсов по умолчанию: скрывает удалённые курсы, которые ещё ждут очистки (см. ``deletion.py``).
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class CourseItemManager(models.Manager):
+    """
+    Менеджер по умолчанию для занятий и заданий: скрывает объекты удалённых курсов, чтобы до окончания
+    очистки курс не был виден частично. Связанные объекты (``lesson.course``) по-прежнему загружаются.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(course__deleted_at__isnull=True)
+
+
+class Course(CounterFieldsMixin, models.Model):
     """
     Модель курса с информацией о преподавателе, начальной и конечной дате курса.
     """
@@ -39,6 +174,17 @@ class Course(models.Model):
     students = models.ManyToManyField(UserProfile, related_name="courses_enrolled", verbose_name="Студенты")
     start_date = models.DateField(verbose_name="Дата начала")
     end_date = models.DateField(verbose_name="Дата окончания")
+    students_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Количество студентов"
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Дата удаления")
+
+    objects = CourseManager.from_queryset(CourseQuerySet)()
+    # Все курсы, включая удалённые и ожидающие очистки
+    all_objects = CourseQuerySet.as_manager()
+
+    counter_fields = ("students_count",)
 
     class Meta:
         verbose_name = "Курс"
@@ -57,17 +203,78 @@ class Lesson(models.Model):
     title = models.CharField(max_length=255, verbose_name="Название")
     description = models.TextField(verbose_name="Описание")
     date_time = models.DateTimeField(verbose_name="Дата и время")
+    series = models.UUIDField(
+        null=True, blank=True, editable=False, db_index=True, verbose_name="Серия занятий"
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
+
+    objects = CourseItemManager()
 
     class Meta:
         verbose_name = "Занятие"
         verbose_name_plural = "Занятия"
         ordering = ["-date_time"]
+        indexes = [
+            # Занятия курсов за период (расписание) и список занятий курса по дате
+            models.Index(fields=["course", "date_time"], name="study_buddy_lesson_time_idx"),
+        ]
 
     def __str__(self):
         return self.title
 
 
-class Assignment(models.Model):
+class AssignmentQuerySet(models.QuerySet):
+    def with_progress(self):
+        """
+        Задания с прогрессом выполнения, прочитанным из денормализованных счётчиков.
+
+        Добавляет аннотации ``num_completed`` (сколько студентов выполнили задание),
+        ``num_enrolled`` (сколько студентов записано на курс) и ``completion_percent``.
+        Счётчики пересчитываются независимо (а выполнившие задание могли уйти с курса), поэтому
+        ``completion_percent`` ограничен 100.
+        """
+        return self.annotate(
+            num_completed=F("completed_count"),
+            num_enrolled=F("course__students_count"),
+        ).annotate(
+            completion_percent=Case(
+                When(num_enrolled=0, then=Value(0)),
+                When(num_completed__gte=F("num_enrolled"), then=Value(100)),
+                default=F("num_completed") * 100 / F("num_enrolled"),
+            )
+        )
+
+    def _actual_completed_count(self):
+        completed = (
+            Assignment.students_completed.through.objects.filter(assignment_id=OuterRef("pk"))
+            .order_by()
+            .values("assignment_id")
+            .annotate(count=Count("*"))
+            .values("count")
+        )
+        return Coalesce(Subquery(completed), Value(0))
+
+    def refresh_completed_count(self, touch=True):
+        """
+        Пересчитывает ``completed_count`` у заданий выборки одним запросом UPDATE.
+        Отметка о выполнении обновляет и ``updated_at``, чтобы страницы с заданием не считались актуальными;
+        с ``touch=False`` записывается только счётчик.
+        """
+        values = {"completed_count": self._actual_completed_count()}
+        if touch:
+            values["updated_at"] = timezone.now()
+        return self.update(**values)
+
+    def with_stale_completed_count(self):
+        """
+        Задания, у которых сохранённый ``completed_count`` расходится с фактическим.
+        """
+        return self.alias(actual_completed_count=self._actual_completed_count()).exclude(
+            completed_count=F("actual_completed_count")
+        )
+
+
+class Assignment(CounterFieldsMixin, models.Model):
     """
     Модель домашнего задания или проекта, связанного с определенным курсом.
     """
@@ -87,11 +294,25 @@ class Assignment(models.Model):
         blank=True,
         verbose_name="Студенты, выполнившие задание",
     )
+    completed_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Количество выполнивших"
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
+
+    objects = CourseItemManager.from_queryset(AssignmentQuerySet)()
+    # Все задания, включая задания удалённых курсов
+    all_objects = AssignmentQuerySet.as_manager()
+
+    counter_fields = ("completed_count",)
 
     class Meta:
         verbose_name = "Домашнее задание или проект"
         verbose_name_plural = "Домашние задания и проекты"
         ordering = ["-due_date"]
+        indexes = [
+            # Сроки сдачи заданий курсов за период (расписание) и список заданий курса по сроку
+            models.Index(fields=["course", "due_date"], name="study_buddy_assign_due_idx"),
+        ]
 
     def __str__(self):
         return self.title
@@ -133,6 +354,10 @@ class ForumPost(models.Model):
     class Meta:
         verbose_name = "Сообщение на форуме"
         verbose_name_plural = "Сообщения на форуме"
+        indexes = [
+            # Лента сообщений форума по курсору (created_at, id) и подсчёт сообщений
+            models.Index(fields=["forum", "created_at", "id"], name="study_buddy_forumpost_list_idx"),
+        ]
 
     def __str__(self):
         return self.title
@@ -153,10 +378,197 @@ class Notification(models.Model):
     content = models.TextField(verbose_name="Содержание")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
     read = models.BooleanField(default=False, verbose_name="Прочитано")
+    job = models.ForeignKey(
+        "Job",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="notifications",
+        verbose_name="Фоновая задача",
+    )
 
     class Meta:
         verbose_name = "Уведомление"
         verbose_name_plural = "Уведомления"
+        constraints = [
+            # Повторный запуск задачи рассылки не создаёт дублей уведомлений
+            models.UniqueConstraint(fields=["job", "user"], name="study_buddy_notification_job_user_uniq"),
+        ]
+        indexes = [
+            # Непрочитанные уведомления пользователя и их количество
+            models.Index(fields=["user", "read", "created_at", "id"], name="study_buddy_notif_unread_idx"),
+            # Лента всех уведомлений пользователя по курсору (created_at, id)
+            models.Index(fields=["user", "created_at", "id"], name="study_buddy_notif_inbox_idx"),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class Job(models.Model):
+    """
+    Модель фоновой задачи в очереди, которую выполняет команда ``run_jobs``.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = (
+        (STATUS_PENDING, "В очереди"),
+        (STATUS_RUNNING, "Выполняется"),
+        (STATUS_DONE, "Выполнена"),
+        (STATUS_FAILED, "Ошибка"),
+    )
+
+    name = models.CharField(max_length=255, verbose_name="Обработчик")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="Параметры")
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name="Статус"
+    )
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Попыток")
+    run_after = models.DateTimeField(default=timezone.now, verbose_name="Выполнить после")
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name="Взята в работу")
+    last_error = models.TextField(blank=True, verbose_name="Последняя ошибка")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+
+    class Meta:
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        indexes = [models.Index(fields=["status", "run_after"], name="study_buddy_job_queue_idx")]
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
+
+
+# Архив завершённых курсов (см. ``archive.py``). Таблицы повторяют поля рабочих таблиц и сохраняют
+# их id, чтобы курс можно было вернуть из архива с прежними адресами страниц.
+
+
+class ArchivedCourse(models.Model):
+    """
+    Курс, перенесённый в архив после окончания.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=255, verbose_name="Название")
+    teacher = models.ForeignKey(
+        UserProfile,
+        on_delete=models.CASCADE,
+        related_name="archived_courses_taught",
+        verbose_name="Преподаватель",
+    )
+    start_date = models.DateField(verbose_name="Дата начала")
+    end_date = models.DateField(verbose_name="Дата окончания")
+    students_count = models.PositiveIntegerField(default=0, verbose_name="Количество студентов")
+    updated_at = models.DateTimeField(verbose_name="Дата изменения")
+    archived_at = models.DateTimeField(default=timezone.now, verbose_name="Дата переноса в архив")
+
+    class Meta:
+        verbose_name = "Архивный курс"
+        verbose_name_plural = "Архивные курсы"
+
+    def __str__(self):
+        return self.title
+
+
+class ArchivedEnrollment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    course = models.ForeignKey(
+        ArchivedCourse, on_delete=models.CASCADE, related_name="enrollments", verbose_name="Курс"
+    )
+    userprofile = models.ForeignKey(
+        UserProfile, on_delete=models.CASCADE, related_name="archived_enrollments", verbose_name="Студент"
+    )
+
+    class Meta:
+        verbose_name = "Запись на архивный курс"
+        verbose_name_plural = "Записи на архивные курсы"
+
+
+class ArchivedLesson(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    course = models.ForeignKey(
+        ArchivedCourse, on_delete=models.CASCADE, related_name="lessons", verbose_name="Курс"
+    )
+    title = models.CharField(max_length=255, verbose_name="Название")
+    description = models.TextField(verbose_name="Описание")
+    date_time = models.DateTimeField(verbose_name="Дата и время")
+    series = models.UUIDField(null=True, blank=True, editable=False, verbose_name="Серия занятий")
+    updated_at = models.DateTimeField(verbose_name="Дата изменения")
+
+    class Meta:
+        verbose_name = "Архивное занятие"
+        verbose_name_plural = "Архивные занятия"
+        ordering = ["-date_time"]
 
     def __str__(self):
         return self.title
+
+
+class ArchivedAssignment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    course = models.ForeignKey(
+        ArchivedCourse, on_delete=models.CASCADE, related_name="assignments", verbose_name="Курс"
+    )
+    title = models.CharField(max_length=255, verbose_name="Название")
+    description = models.TextField(verbose_name="Описание")
+    due_date = models.DateTimeField(verbose_name="Срок выполнения")
+    completed_count = models.PositiveIntegerField(default=0, verbose_name="Количество выполнивших")
+    updated_at = models.DateTimeField(verbose_name="Дата изменения")
+
+    class Meta:
+        verbose_name = "Архивное задание"
+        verbose_name_plural = "Архивные задания"
+        ordering = ["-due_date"]
+
+    def __str__(self):
+        return self.title
+
+
+class ArchivedCompletion(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    assignment = models.ForeignKey(
+        ArchivedAssignment, on_delete=models.CASCADE, related_name="completions", verbose_name="Задание"
+    )
+    userprofile = models.ForeignKey(
+        UserProfile, on_delete=models.CASCADE, related_name="archived_completions", verbose_name="Студент"
+    )
+
+    class Meta:
+        verbose_name = "Отметка о выполнении архивного задания"
+        verbose_name_plural = "Отметки о выполнении архивных заданий"
+
+
+class ArchivedForum(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    course = models.OneToOneField(
+        ArchivedCourse, on_delete=models.CASCADE, related_name="forum", verbose_name="Курс"
+    )
+    title = models.CharField(max_length=255, verbose_name="Название")
+
+    class Meta:
+        verbose_name = "Архивный форум"
+        verbose_name_plural = "Архивные форумы"
+
+
+class ArchivedForumPost(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    forum = models.ForeignKey(
+        ArchivedForum, on_delete=models.CASCADE, related_name="posts", verbose_name="Форум"
+    )
+    author = models.ForeignKey(
+        UserProfile,
+        on_delete=models.CASCADE,
+        related_name="archived_forum_posts",
+        verbose_name="Автор",
+    )
+    title = models.CharField(max_length=255, verbose_name="Заголовок")
+    content = models.TextField(verbose_name="Содержание")
+    created_at = models.DateTimeField(verbose_name="Дата создания")
+    updated_at = models.DateTimeField(verbose_name="Дата изменения")
+
+    class Meta:
+        verbose_name = "Архивное сообщение на форуме"
+        verbose_name_plural = "Архивные сообщения на форуме"
+        ordering = ["created_at", "id"]
@@ -0,0 +1,124 @@
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from .jobs import enqueue
+from .models import Course, Notification
+from .pagination import keyset_page
+
+# Сколько уведомлений создаётся одним запросом INSERT
+FAN_OUT_CHUNK_SIZE = 500
+# Сколько уведомлений показывается на одной странице ленты
+INBOX_PAGE_SIZE = 20
+# Время жизни закэшированного счётчика непрочитанных. Уведомления создаёт обработчик очереди в своём
+# процессе, и при кэше в памяти процесса его сброс счётчика сервер не видит, поэтому счётчик живёт
+# недолго: после рассылки значок обновляется не позже чем через это время
+UNREAD_COUNT_TIMEOUT = 30
+
+
+def _unread_count_key(profile_id):
+    return f"study_buddy:notifications:unread:{profile_id}"
+
+
+def unread_count(profile_id):
+    """
+    Количество непрочитанных уведомлений пользователя из кэша.
+    COUNT(*) выполняется только при промахе кэша.
+    """
+    key = _unread_count_key(profile_id)
+    count = cache.get(key)
+    if count is None:
+        # Из основной базы: значение из отстающей реплики осталось бы в кэше на весь срок
+        count = Notification.objects.using(DEFAULT_DB_ALIAS).filter(user_id=profile_id, read=False).count()
+        cache.set(key, count, UNREAD_COUNT_TIMEOUT)
+    return count
+
+
+def invalidate_unread_count(*profile_ids):
+    cache.delete_many([_unread_count_key(profile_id) for profile_id in profile_ids])
+
+
+def mark_read(profile_id, notification_id):
+    """
+    Отмечает одно уведомление прочитанным и уменьшает закэшированный счётчик.
+    """
+    updated = Notification.objects.filter(pk=notification_id, user_id=profile_id, read=False).update(
+        read=True
+    )
+    if updated:
+        try:
+            cache.decr(_unread_count_key(profile_id))
+        except ValueError:
+            # Счётчика нет в кэше: он будет посчитан заново при следующем обращении
+            pass
+    return updated
+
+
+def mark_all_read(profile_id):
+    """
+    Отмечает все уведомления пользователя прочитанными одним запросом UPDATE.
+    """
+    updated = Notification.objects.filter(user_id=profile_id, read=False).update(read=True)
+    cache.set(_unread_count_key(profile_id), 0, UNREAD_COUNT_TIMEOUT)
+    return updated
+
+
+def inbox_page(profile_id, cursor=None, unread_only=False):
+    """
+    Страница ленты уведомлений пользователя от новых к старым, см. ``keyset_page``.
+    """
+    notifications = Notification.objects.filter(user_id=profile_id)
+    if unread_only:
+        notifications = notifications.filter(read=False)
+    return keyset_page(notifications, cursor, INBOX_PAGE_SIZE)
+
+
+def notify_course_students(course, title, content):
+    """
+    Ставит в очередь рассылку уведомления всем студентам курса.
+
+    Сама рассылка выполняется обработчиком очереди (команда ``run_jobs``), поэтому
+    не задерживает ответ на запрос преподавателя.
+    """
+    return enqueue(fan_out_notification, course_id=course.pk, title=title, content=content)
+
+
+def notify_lesson_saved(lesson, created):
+    title = f"Новое занятие: {lesson.title}" if created else f"Занятие изменено: {lesson.title}"
+    when = timezone.localtime(lesson.date_time).strftime("%d.%m.%Y %H:%M")
+    return notify_course_students(lesson.course, title, f"Курс «{lesson.course.title}», {when}")
+
+
+def notify_assignment_saved(assignment, created):
+    title = f"Новое задание: {assignment.title}" if created else f"Задание изменено: {assignment.title}"
+    due = timezone.localtime(assignment.due_date).strftime("%d.%m.%Y %H:%M")
+    return notify_course_students(
+        assignment.course, title, f"Курс «{assignment.course.title}», срок выполнения {due}"
+    )
+
+
+def fan_out_notification(job, course_id, title, content):
+    """
+    Создаёт уведомление каждому студенту курса пачками через ``bulk_create``.
+
+    Студенты перебираются по возрастанию id курсором, а уникальность пары (задача, пользователь)
+    и ``ignore_conflicts`` делают повторный запуск задачи после сбоя безопасным.
+    """
+    enrollments = (
+        Course.students.through.objects.filter(course_id=course_id)
+        .order_by("userprofile_id")
+        .values_list("userprofile_id", flat=True)
+    )
+    last_id = 0
+    while True:
+        student_ids = list(enrollments.filter(userprofile_id__gt=last_id)[:FAN_OUT_CHUNK_SIZE])
+        if not student_ids:
+            break
+        Notification.objects.bulk_create(
+            [Notification(user_id=pk, job=job, title=title, content=content) for pk in student_ids],
+            ignore_conflicts=True,
+        )
+        # bulk_create не отправляет post_save, поэтому счётчики сбрасываются явно (это действует
+        # только при общем кэше, иначе значения устаревают по UNREAD_COUNT_TIMEOUT)
+        invalidate_unread_count(*student_ids)
+        last_id = student_ids[-1]
@@ -0,0 +1,49 @@
+from datetime import datetime
+
+from django.db.models import Q
+
+
+def encode_cursor(obj, field="created_at"):
+    return f"{getattr(obj, field).isoformat()}_{obj.pk}"
+
+
+def decode_cursor(cursor):
+    """
+    Разбирает курсор вида ``<дата ISO 8601>_<id>``. Для некорректного курсора возвращает None.
+    """
+    try:
+        value, pk = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(value), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+def keyset_page(queryset, cursor, page_size, field="created_at"):
+    """
+    Страница выборки от новых к старым с курсорной пагинацией по (``field``, id).
+
+    В отличие от OFFSET, стоимость запроса не зависит от номера страницы, если есть индекс,
+    заканчивающийся на (``field``, id). Возвращает пару (объекты, курсор следующей страницы
+    или None). Некорректный курсор трактуется как запрос первой страницы.
+    """
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        value, pk = position
+        queryset = queryset.filter(Q(**{f"{field}__lt": value}) | Q(**{field: value, "pk__lt": pk}))
+    page = list(queryset.order_by(f"-{field}", "-pk")[: page_size + 1])
+    if len(page) > page_size:
+        return page[:page_size], encode_cursor(page[page_size - 1], field)
+    return page, None
+
+
+def id_page(queryset, after, page_size):
+    """
+    Страница выборки по возрастанию id: следующая страница запрашивается с ``after``,
+    равным id последнего объекта. Возвращает пару (объекты, курсор следующей страницы или None).
+    """
+    if after and str(after).isdigit():
+        queryset = queryset.filter(pk__gt=int(after))
+    page = list(queryset.order_by("pk")[: page_size + 1])
+    if len(page) > page_size:
+        return page[:page_size], str(page[page_size - 1].pk)
+    return page, None
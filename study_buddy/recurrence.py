@@ -0,0 +1,149 @@
+import uuid
+from datetime import datetime, timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .cloning import shift_local
+from .fragment_cache import bump_course_version
+from .models import Lesson
+from .notifications import notify_course_students
+
+# Сколько занятий можно создать одной серией
+MAX_OCCURRENCES = 200
+# Сколько ошибочных дат перечисляется в сообщении об ошибке
+MAX_LISTED_DATES = 5
+
+WEEKDAYS = (
+    (0, "Пн"),
+    (1, "Вт"),
+    (2, "Ср"),
+    (3, "Чт"),
+    (4, "Пт"),
+    (5, "Сб"),
+    (6, "Вс"),
+)
+
+
+class RecurrenceRule:
+    """
+    Правило повторения занятий: дни недели (0 — понедельник), время начала, дата первой недели
+    и число недель. Даты из ``skip_dates`` (праздники, каникулы) пропускаются.
+    """
+
+    def __init__(self, weekdays, time, start_date, weeks, skip_dates=()):
+        self.weekdays = set(weekdays)
+        self.time = time
+        self.start_date = start_date
+        self.weeks = weeks
+        self.skip_dates = set(skip_dates)
+
+    def dates(self):
+        days = (self.start_date + timedelta(days=offset) for offset in range(self.weeks * 7))
+        return [day for day in days if day.weekday() in self.weekdays and day not in self.skip_dates]
+
+    def occurrences(self):
+        """
+        Дата и время каждого занятия по правилу в текущем часовом поясе, по возрастанию.
+        """
+        return [timezone.make_aware(datetime.combine(day, self.time)) for day in self.dates()]
+
+
+def _wall_clock(value):
+    return timezone.localtime(value).replace(tzinfo=None)
+
+
+def _format_dates(values):
+    listed = ", ".join(
+        timezone.localtime(value).strftime("%d.%m.%Y %H:%M") for value in values[:MAX_LISTED_DATES]
+    )
+    return f"{listed} и ещё {len(values) - MAX_LISTED_DATES}" if len(values) > MAX_LISTED_DATES else listed
+
+
+def validate_occurrences(course, occurrences, exclude=None):
+    """
+    Проверяет даты занятий серии: они должны попадать в даты курса и не совпадать с уже
+    назначенными занятиями курса (кроме занятий из ``exclude``). Бросает ``ValidationError``.
+    """
+    if not occurrences:
+        raise ValidationError("По правилу не получается ни одного занятия.")
+    if len(occurrences) > MAX_OCCURRENCES:
+        raise ValidationError(f"Одной серией можно создать не больше {MAX_OCCURRENCES} занятий.")
+    errors = []
+    outside = [
+        value
+        for value in occurrences
+        if not course.start_date <= timezone.localdate(value) <= course.end_date
+    ]
+    if outside:
+        errors.append(f"Занятия вне дат курса: {_format_dates(outside)}.")
+    busy = Lesson.objects.filter(course=course, date_time__in=occurrences)
+    if exclude is not None:
+        busy = busy.exclude(pk__in=exclude.values("pk"))
+    busy = sorted(busy.values_list("date_time", flat=True))
+    if busy:
+        errors.append(f"В это время уже есть занятия: {_format_dates(busy)}.")
+    if errors:
+        raise ValidationError(errors)
+
+
+@transaction.atomic
+def create_series(course, rule, title, description):
+    """
+    Создаёт занятия курса по правилу ``rule`` одним ``bulk_create`` и одну рассылку студентам.
+    Занятия серии получают общий идентификатор ``series``. Возвращает созданные занятия.
+    """
+    occurrences = rule.occurrences()
+    validate_occurrences(course, occurrences)
+    series = uuid.uuid4()
+    lessons = Lesson.objects.bulk_create(
+        Lesson(course=course, title=title, description=description, date_time=value, series=series)
+        for value in occurrences
+    )
+    # bulk_create не отправляет post_save, поэтому кэш фрагментов курса сбрасывается явно
+    bump_course_version(course.pk)
+    first, last = (
+        timezone.localtime(value).strftime("%d.%m.%Y") for value in (occurrences[0], occurrences[-1])
+    )
+    notify_course_students(
+        course,
+        f"Новое расписание: {title}",
+        f"Курс «{course.title}», занятий: {len(lessons)}, с {first} по {last}",
+    )
+    return lessons
+
+
+@transaction.atomic
+def update_following(lesson, title, description, date_time):
+    """
+    Изменяет занятие и все следующие занятия его серии: название и описание заменяются,
+    а время сдвигается на столько же, на сколько сдвинуто само занятие (по местным часам).
+
+    Название и описание записываются одним UPDATE, новое время — одним ``bulk_update``.
+    Возвращает число изменённых занятий.
+    """
+    start = Lesson.objects.values_list("date_time", flat=True).get(pk=lesson.pk)
+    lessons = list(
+        Lesson.objects.filter(course_id=lesson.course_id, series=lesson.series, date_time__gte=start).only(
+            "pk", "date_time"
+        )
+    )
+    # Занятия выбираются по id: после сдвига назад они уже не попадут под условие по времени
+    following = Lesson.objects.filter(pk__in=[item.pk for item in lessons])
+    offset = _wall_clock(date_time) - _wall_clock(start)
+    if offset:
+        for item in lessons:
+            item.date_time = shift_local(item.date_time, offset)
+        validate_occurrences(lesson.course, [item.date_time for item in lessons], exclude=following)
+        Lesson.objects.bulk_update(lessons, ["date_time"])
+    count = following.update(title=title, description=description, updated_at=timezone.now())
+    bump_course_version(lesson.course_id)
+    lesson.refresh_from_db()
+    notify_course_students(
+        lesson.course,
+        f"Изменена серия занятий: {title}",
+        f"Курс «{lesson.course.title}», занятий: {count}, начиная с "
+        f"{timezone.localtime(lesson.date_time).strftime('%d.%m.%Y %H:%M')}",
+    )
+    return count
@@ -0,0 +1,125 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Сколько секунд после записи запросы той же сессии читают из основной базы
+DEFAULT_STICKY_SECONDS = 10
+
+# Состояние маршрутизации текущего запроса; вне запросов (команды, обработчик задач) не задано
+_request_routing = ContextVar("study_buddy_request_routing", default=None)
+
+
+class RequestRouting:
+    """
+    Маршрутизация запросов к базе внутри одного HTTP-запроса: можно ли читать из реплики
+    и была ли запись. После первой записи запрос до конца читает из основной базы.
+    """
+
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+def replica_aliases():
+    return getattr(settings, "STUDY_BUDDY_REPLICAS", [])
+
+
+def sticky_seconds():
+    return getattr(settings, "STUDY_BUDDY_REPLICA_STICKY_SECONDS", DEFAULT_STICKY_SECONDS)
+
+
+def start_request_routing(use_replica):
+    return _request_routing.set(RequestRouting(use_replica))
+
+
+def finish_request_routing(token):
+    routing = _request_routing.get()
+    _request_routing.reset(token)
+    return routing
+
+
+@contextmanager
+def primary_reads():
+    """
+    Внутри блока запросы текущего HTTP-запроса читают из основной базы.
+
+    Нужен там, где прочитанное сохраняется в кэш: данные из отстающей реплики пролежали бы
+    в кэше весь срок его жизни, намного дольше самого отставания.
+    """
+    routing = _request_routing.get()
+    if routing is None or not routing.use_replica:
+        yield
+        return
+    routing.use_replica = False
+    try:
+        yield
+    finally:
+        # После записи запрос до конца читает из основной базы
+        routing.use_replica = not routing.wrote
+
+
+def routed_stream(content, use_replica):
+    """
+    Потоковый ответ читает данные уже после выхода из middleware, поэтому каждый фрагмент
+    получается с той же маршрутизацией, что и сам запрос.
+    """
+    iterator = iter(content)
+    while True:
+        token = start_request_routing(use_replica)
+        try:
+            chunk = next(iterator, None)
+        finally:
+            finish_request_routing(token)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def _pinned_to_primary(model):
+    # Сессии читаются сразу после записи в том же запросе, задержка реплики для них недопустима
+    return model._meta.app_label == "sessions"
+
+
+class ReplicaRouter:
+    """
+    Отправляет чтение из представлений в реплики (``STUDY_BUDDY_REPLICAS``), а запись — в основную базу.
+
+    Из основной базы читаются: всё вне HTTP-запросов, запросы внутри транзакций, запросы после записи
+    в том же HTTP-запросе и в течение ``STUDY_BUDDY_REPLICA_STICKY_SECONDS`` после записи в той же сессии
+    (окно задаёт ``ReplicaRoutingMiddleware``), а также сессии.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = _request_routing.get()
+        replicas = replica_aliases()
+        if (
+            routing is None
+            or not routing.use_replica
+            or not replicas
+            or _pinned_to_primary(model)
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        routing = _request_routing.get()
+        if routing is not None and not _pinned_to_primary(model):
+            routing.use_replica = False
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики — копии основной базы, схема попадает в них вместе с данными
+        if db in replica_aliases():
+            return False
+        return None
@@ -0,0 +1,256 @@
+import re
+
+from django.db import connection as default_connection
+from django.db.models import Q, Value
+from django.db.models.expressions import RawSQL
+from django.urls import reverse
+
+from .models import Assignment, Course, Forum, ForumPost, Lesson
+
+SEARCH_PAGE_SIZE = 20
+
+
+class SearchSource:
+    """
+    Описание модели, участвующей в поиске: какие поля индексируются и как найти курс объекта.
+    """
+
+    def __init__(self, kind, label, model, fields, course_lookup, select_related):
+        self.kind = kind
+        self.label = label
+        self.model = model
+        self.fields = fields
+        self.course_lookup = course_lookup
+        self.select_related = select_related
+
+    @property
+    def table(self):
+        return self.model._meta.db_table
+
+    @property
+    def fts_table(self):
+        return f"{self.table}_fts"
+
+
+SEARCH_SOURCES = (
+    SearchSource("lesson", "Занятие", Lesson, ("title", "description"), "course_id", ("course",)),
+    SearchSource("assignment", "Задание", Assignment, ("title", "description"), "course_id", ("course",)),
+    SearchSource(
+        "forumpost",
+        "Сообщение на форуме",
+        ForumPost,
+        ("title", "content"),
+        "forum__course_id",
+        ("forum__course", "author__user"),
+    ),
+)
+SOURCES_BY_KIND = {source.kind: source for source in SEARCH_SOURCES}
+SOURCES_BY_MODEL = {source.model: source for source in SEARCH_SOURCES}
+
+
+def fts5_available(connection=default_connection):
+    if connection.vendor != "sqlite":
+        return False
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE temp.study_buddy_fts5_probe USING fts5(value)")
+            cursor.execute("DROP TABLE temp.study_buddy_fts5_probe")
+        except Exception:
+            return False
+    return True
+
+
+def _index_statements(source):
+    """
+    SQL для таблицы FTS5 и триггеров, синхронизирующих её с исходной таблицей.
+
+    Таблица FTS5 ссылается на исходную (external content), а триггеры срабатывают на любые
+    изменения, включая ``bulk_create`` и массовые UPDATE/DELETE, которые не отправляют сигналов.
+    """
+    table, fts = source.table, source.fts_table
+    columns = ", ".join(source.fields)
+    new_values = ", ".join(f"new.{field}" for field in source.fields)
+    old_values = ", ".join(f"old.{field}" for field in source.fields)
+    delete_old = f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+    insert_new = f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values});"
+    return {
+        fts: (
+            f"CREATE VIRTUAL TABLE {fts} USING fts5({columns}, content='{table}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2')"
+        ),
+        f"{fts}_ai": f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN {insert_new} END",
+        f"{fts}_ad": f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN {delete_old} END",
+        f"{fts}_au": (
+            f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {columns} ON {table} BEGIN {delete_old} {insert_new} END"
+        ),
+    }
+
+
+def install_search_index(connection=default_connection):
+    """
+    Создаёт недостающие таблицы FTS5 и триггеры и перестраивает индекс там, где что-то было создано.
+
+    Вызывается из миграции и после каждого ``migrate``: SQLite пересоздаёт таблицу при
+    некоторых изменениях схемы, и её триггеры при этом теряются.
+    Возвращает False, если полнотекстовый поиск недоступен для этой базы данных.
+    """
+    if not fts5_available(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = {row[0] for row in cursor.fetchall()}
+        for source in SEARCH_SOURCES:
+            missing = [sql for name, sql in _index_statements(source).items() if name not in existing]
+            for sql in missing:
+                cursor.execute(sql)
+            if missing:
+                cursor.execute(f"INSERT INTO {source.fts_table}({source.fts_table}) VALUES ('rebuild')")
+    return True
+
+
+def uninstall_search_index(connection=default_connection):
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for source in SEARCH_SOURCES:
+            for suffix in ("ai", "ad", "au"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {source.fts_table}_{suffix}")
+            cursor.execute(f"DROP TABLE IF EXISTS {source.fts_table}")
+
+
+def rebuild_search_index(connection=default_connection):
+    """
+    Полностью перестраивает полнотекстовый индекс по исходным таблицам.
+    """
+    if not install_search_index(connection):
+        return False
+    with connection.cursor() as cursor:
+        for source in SEARCH_SOURCES:
+            cursor.execute(f"INSERT INTO {source.fts_table}({source.fts_table}) VALUES ('rebuild')")
+            cursor.execute(
+                f"INSERT INTO {source.fts_table}({source.fts_table}, rank) VALUES ('integrity-check', 1)"
+            )
+    return True
+
+
+def search_enabled(connection=default_connection):
+    if connection.vendor != "sqlite":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN (%s)"
+            % ", ".join("%s" for _ in SEARCH_SOURCES),
+            [source.fts_table for source in SEARCH_SOURCES],
+        )
+        return cursor.fetchone()[0] == len(SEARCH_SOURCES)
+
+
+def search_terms(query):
+    return re.findall(r"\w+", query.lower())
+
+
+def match_expression(query):
+    """
+    Превращает пользовательский запрос в выражение FTS5: все слова обязательны и ищутся по префиксу.
+    Слова состоят только из символов ``\\w``, поэтому кавычки экранировать не нужно.
+    """
+    return " ".join(f'"{term}"*' for term in search_terms(query))
+
+
+def fts_matches(model, query):
+    """
+    Подзапрос с id объектов модели, найденных полнотекстовым индексом, для ``filter(pk__in=...)``.
+    """
+    fts = SOURCES_BY_MODEL[model].fts_table
+    return RawSQL(f"SELECT rowid FROM {fts} WHERE {fts} MATCH %s", [match_expression(query)])
+
+
+class SearchResult:
+    def __init__(self, source, obj):
+        self.kind = source.kind
+        self.label = source.label
+        self.object = obj
+        self.title = obj.title
+        self.text = getattr(obj, source.fields[1])
+        if isinstance(obj, ForumPost):
+            self.course = obj.forum.course
+            self.url = reverse("forum_detail", kwargs={"course_pk": self.course.pk})
+        else:
+            self.course = obj.course
+            if isinstance(obj, Assignment):
+                self.url = reverse("assignment_detail", kwargs={"pk": obj.pk})
+            else:
+                self.url = reverse("course_detail", kwargs={"pk": self.course.pk})
+
+
+def _fts_rows(query, course_ids, limit, offset):
+    """
+    Ранжированные (bm25) пары (тип, id) из всех индексов одним запросом.
+    """
+    placeholders = ", ".join("%s" for _ in course_ids)
+    forum_table = Forum._meta.db_table
+    parts, params = [], []
+    for source in SEARCH_SOURCES:
+        table, fts = source.table, source.fts_table
+        if source.model is ForumPost:
+            course_join = f"JOIN {forum_table} ON {forum_table}.id = {table}.forum_id"
+            course_column = f"{forum_table}.course_id"
+        else:
+            course_join = ""
+            course_column = f"{table}.course_id"
+        parts.append(
+            f"SELECT '{source.kind}' AS kind, {table}.id AS id, bm25({fts}) AS score "
+            f"FROM {fts} JOIN {table} ON {table}.id = {fts}.rowid {course_join} "
+            f"WHERE {fts} MATCH %s AND {course_column} IN ({placeholders})"
+        )
+        params += [match_expression(query), *course_ids]
+    sql = f"SELECT kind, id FROM ({' UNION ALL '.join(parts)}) ORDER BY score, kind, id LIMIT %s OFFSET %s"
+    with default_connection.cursor() as cursor:
+        cursor.execute(sql, [*params, limit, offset])
+        return cursor.fetchall()
+
+
+def _fallback_rows(query, course_ids, limit, offset):
+    """
+    Поиск через LIKE для СУБД без FTS5: все слова должны встречаться в одном из полей.
+    Ранжирования нет, результаты упорядочены от новых к старым.
+    """
+    querysets = []
+    for source in SEARCH_SOURCES:
+        queryset = source.model.objects.filter(**{f"{source.course_lookup}__in": course_ids})
+        for term in search_terms(query):
+            term_filter = Q()
+            for field in source.fields:
+                term_filter |= Q(**{f"{field}__icontains": term})
+            queryset = queryset.filter(term_filter)
+        querysets.append(queryset.annotate(kind=Value(source.kind)).values_list("kind", "pk").order_by())
+    combined = querysets[0].union(*querysets[1:], all=True).order_by("-pk", "kind")
+    return list(combined[offset : offset + limit])
+
+
+def search(profile, query, page=1, page_size=SEARCH_PAGE_SIZE):
+    """
+    Ищет занятия, задания и сообщения форума в курсах, доступных пользователю.
+
+    Возвращает пару (список ``SearchResult`` для страницы ``page``, есть ли следующая страница).
+    """
+    if not search_terms(query):
+        return [], False
+    course_ids = list(Course.objects.visible_to(profile).values_list("pk", flat=True))
+    if not course_ids:
+        return [], False
+
+    find_rows = _fts_rows if search_enabled() else _fallback_rows
+    rows = find_rows(query, course_ids, page_size + 1, (page - 1) * page_size)
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+
+    ids_by_kind = {}
+    for kind, pk in rows:
+        ids_by_kind.setdefault(kind, []).append(pk)
+    objects = {}
+    for kind, ids in ids_by_kind.items():
+        source = SOURCES_BY_KIND[kind]
+        for obj in source.model.objects.filter(pk__in=ids).select_related(*source.select_related):
+            objects[kind, obj.pk] = SearchResult(source, obj)
+    return [objects[row] for row in map(tuple, rows) if row in objects], has_next
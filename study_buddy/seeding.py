@@ -0,0 +1,227 @@
+import random
+from datetime import date, datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .access import invalidate_course_access
+from .fragment_cache import bump_course_version
+from .models import Assignment, Course, Forum, ForumPost, Lesson, UserProfile
+
+# Префикс логинов сгенерированных пользователей: по нему данные находятся для удаления и замеров
+SEED_USERNAME_PREFIX = "seed_"
+SEED_PASSWORD = "seed-password"
+SEED_BATCH_SIZE = 1000
+
+SUBJECTS = (
+    "Математика",
+    "Физика",
+    "Химия",
+    "Биология",
+    "История",
+    "Литература",
+    "Информатика",
+    "Английский язык",
+    "География",
+    "Экономика",
+)
+LEVELS = ("для начинающих", "базовый курс", "продвинутый курс", "подготовка к экзамену", "практикум")
+TOPICS = (
+    "Введение",
+    "Основные понятия",
+    "Разбор задач",
+    "Практическое занятие",
+    "Лабораторная работа",
+    "Повторение",
+    "Семинар",
+    "Контрольная точка",
+)
+WORDS = (
+    "решение задач по теме занятия",
+    "обсуждение домашнего задания",
+    "разбор типичных ошибок",
+    "работа с дополнительной литературой",
+    "подготовка к контрольной работе",
+    "вопросы по материалу лекции",
+)
+
+
+class SeedOptions:
+    """
+    Объём генерируемых данных. Занятия, задания и сообщения форума задаются на курс,
+    ``completion_rate`` — доля студентов курса, выполнивших каждое прошедшее задание.
+    """
+
+    def __init__(
+        self,
+        teachers=10,
+        students=500,
+        courses=30,
+        students_per_course=40,
+        lessons=16,
+        assignments=8,
+        completion_rate=0.7,
+        posts=20,
+        seed=0,
+    ):
+        self.teachers = teachers
+        self.students = students
+        self.courses = courses
+        self.students_per_course = min(students_per_course, students)
+        self.lessons = lessons
+        self.assignments = assignments
+        self.completion_rate = completion_rate
+        self.posts = posts
+        self.seed = seed
+
+
+def seeded_users():
+    return User.objects.filter(username__startswith=SEED_USERNAME_PREFIX)
+
+
+def delete_seeded_data():
+    """
+    Удаляет сгенерированных пользователей; курсы, занятия и сообщения удаляются каскадно.
+    """
+    profile_ids = list(UserProfile.objects.filter(user__in=seeded_users()).values_list("pk", flat=True))
+    course_ids = list(Course.objects.filter(teacher_id__in=profile_ids).values_list("pk", flat=True))
+    deleted, _ = seeded_users().delete()
+    bump_course_version(*course_ids)
+    invalidate_course_access(*profile_ids)
+    return deleted
+
+
+def _create_users(role, count):
+    # Хэш пароля вычисляется один раз: на тысячах пользователей он занимал бы почти всё время генерации
+    password = make_password(SEED_PASSWORD)
+    users = User.objects.bulk_create(
+        (
+            User(username=f"{SEED_USERNAME_PREFIX}{role}_{number}", password=password)
+            for number in range(count)
+        ),
+        batch_size=SEED_BATCH_SIZE,
+    )
+    return UserProfile.objects.bulk_create(
+        (UserProfile(user=user, role=role) for user in users), batch_size=SEED_BATCH_SIZE
+    )
+
+
+def _aware(day, hour):
+    return timezone.make_aware(datetime.combine(day, time(hour)))
+
+
+@transaction.atomic
+def seed_database(options):
+    """
+    Заполняет базу правдоподобными данными через ``bulk_create`` и возвращает словарь
+    с числом созданных объектов каждого вида.
+
+    ``bulk_create`` не отправляет сигналы, поэтому счётчики пересчитываются, а кэши
+    страниц курсов и доступа к курсам сбрасываются явно. Поисковый индекс SQLite
+    обновляют триггеры базы.
+    """
+    rng = random.Random(options.seed)
+    teachers = _create_users("teacher", options.teachers)
+    students = _create_users("student", options.students)
+
+    today = date.today()
+    courses = Course.objects.bulk_create(
+        (
+            Course(
+                title=f"{rng.choice(SUBJECTS)}: {rng.choice(LEVELS)} №{number + 1}",
+                teacher=teachers[number % len(teachers)],
+                start_date=today - timedelta(weeks=options.lessons // 2),
+                end_date=today + timedelta(weeks=options.lessons - options.lessons // 2),
+            )
+            for number in range(options.courses)
+        ),
+        batch_size=SEED_BATCH_SIZE,
+    )
+    forums = Forum.objects.bulk_create(
+        (Forum(course=course, title=f"Форум курса «{course.title}»") for course in courses),
+        batch_size=SEED_BATCH_SIZE,
+    )
+
+    lessons = Lesson.objects.bulk_create(
+        (
+            Lesson(
+                course=course,
+                title=f"{rng.choice(TOPICS)} {number + 1}",
+                description=rng.choice(WORDS),
+                date_time=_aware(course.start_date + timedelta(weeks=number), rng.choice((9, 11, 14, 16))),
+            )
+            for course in courses
+            for number in range(options.lessons)
+        ),
+        batch_size=SEED_BATCH_SIZE,
+    )
+
+    # Задания распределены по длительности курса равномерно, часть сроков уже прошла
+    step = max(options.lessons, 1) * 7 // max(options.assignments, 1)
+    assignments = Assignment.objects.bulk_create(
+        (
+            Assignment(
+                course=course,
+                title=f"Домашнее задание {number + 1}",
+                description=rng.choice(WORDS),
+                due_date=_aware(course.start_date + timedelta(days=step * (number + 1)), 23),
+            )
+            for course in courses
+            for number in range(options.assignments)
+        ),
+        batch_size=SEED_BATCH_SIZE,
+    )
+
+    enrolled = {course.pk: rng.sample(students, options.students_per_course) for course in courses}
+    Course.students.through.objects.bulk_create(
+        (
+            Course.students.through(course_id=course_id, userprofile_id=student.pk)
+            for course_id, course_students in enrolled.items()
+            for student in course_students
+        ),
+        batch_size=SEED_BATCH_SIZE,
+    )
+
+    now = timezone.now()
+    completions = [
+        Assignment.students_completed.through(assignment_id=assignment.pk, userprofile_id=student.pk)
+        for assignment in assignments
+        if assignment.due_date < now
+        for student in enrolled[assignment.course_id]
+        if rng.random() < options.completion_rate
+    ]
+    Assignment.students_completed.through.objects.bulk_create(completions, batch_size=SEED_BATCH_SIZE)
+
+    authors = {course.pk: [course.teacher, *enrolled[course.pk]] for course in courses}
+    posts = ForumPost.objects.bulk_create(
+        (
+            ForumPost(
+                forum=forum,
+                author=rng.choice(authors[forum.course_id]),
+                title=rng.choice(TOPICS),
+                content=rng.choice(WORDS),
+            )
+            for forum in forums
+            for _ in range(options.posts)
+        ),
+        batch_size=SEED_BATCH_SIZE,
+    )
+
+    course_ids = [course.pk for course in courses]
+    Course.objects.filter(pk__in=course_ids).refresh_students_count()
+    Assignment.objects.filter(course_id__in=course_ids).refresh_completed_count()
+    # Id удалённых ранее объектов могут использоваться повторно, поэтому старые записи кэша сбрасываются
+    bump_course_version(*course_ids)
+    invalidate_course_access(*(profile.pk for profile in teachers), *(profile.pk for profile in students))
+    return {
+        "teachers": len(teachers),
+        "students": len(students),
+        "courses": len(courses),
+        "lessons": len(lessons),
+        "assignments": len(assignments),
+        "enrollments": sum(len(course_students) for course_students in enrolled.values()),
+        "completions": len(completions),
+        "posts": len(posts),
+    }
@@ -0,0 +1,141 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from .access import invalidate_course_access
+from .fragment_cache import bump_course_version
+from .models import Assignment, Course, Lesson, Notification, UserProfile
+from .notifications import invalidate_unread_count
+
+# Массовое изменение отметок о выполнении (см. ``completion.set_completions``).
+# Аргументы: course, added и removed — списки пар (id студента, id задания).
+completions_changed = Signal()
+
+
+def _changed_ids(instance, action, reverse, pk_set, related_name):
+    """
+    Возвращает id объектов, счётчик которых нужно пересчитать после изменения m2m-связи,
+    или None, если на этом шаге пересчитывать нечего.
+
+    При изменении со стороны UserProfile (``reverse=True``) затронуты объекты из ``pk_set``,
+    а при ``clear()`` их список запоминается заранее на шаге ``pre_clear``.
+    """
+    if not reverse:
+        return [instance.pk] if action in ("post_add", "post_remove", "post_clear") else None
+    cache_name = f"_cleared_{related_name}_ids"
+    if action == "pre_clear":
+        setattr(instance, cache_name, list(getattr(instance, related_name).values_list("pk", flat=True)))
+        return None
+    if action == "post_clear":
+        return instance.__dict__.pop(cache_name, [])
+    if action in ("post_add", "post_remove"):
+        return pk_set
+    return None
+
+
+@receiver(m2m_changed, sender=Course.students.through)
+def update_students_count(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Поддерживает ``Course.students_count`` при записи и исключении студентов.
+    """
+    course_ids = _changed_ids(instance, action, reverse, pk_set, "courses_enrolled")
+    if course_ids:
+        Course.objects.filter(pk__in=course_ids).refresh_students_count()
+        bump_course_version(*course_ids)
+
+
+@receiver(m2m_changed, sender=Course.students.through)
+def reset_course_access_on_enrollment(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Сбрасывает закэшированные курсы студентов, записанных на курс или исключённых из него.
+    """
+    # Здесь важны профили, то есть обратная сторона связи по сравнению со счётчиками курсов
+    profile_ids = _changed_ids(instance, action, not reverse, pk_set, "students")
+    if profile_ids:
+        invalidate_course_access(*profile_ids)
+
+
+@receiver(m2m_changed, sender=Assignment.students_completed.through)
+def update_completed_count(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Поддерживает ``Assignment.completed_count`` при отметке о выполнении задания.
+    """
+    assignment_ids = _changed_ids(instance, action, reverse, pk_set, "completed_assignments")
+    if assignment_ids:
+        assignments = Assignment.objects.filter(pk__in=assignment_ids)
+        assignments.refresh_completed_count()
+        bump_course_version(*assignments.values_list("course_id", flat=True))
+
+
+@receiver(completions_changed)
+def update_counters_after_bulk_completion(sender, course, added, removed, **kwargs):
+    assignment_ids = {assignment_id for _, assignment_id in added} | {
+        assignment_id for _, assignment_id in removed
+    }
+    Assignment.objects.filter(pk__in=assignment_ids).refresh_completed_count()
+    bump_course_version(course.pk)
+
+
+@receiver(pre_delete, sender=UserProfile)
+def remember_profile_relations(sender, instance, **kwargs):
+    """
+    Каскадное удаление профиля не отправляет ``m2m_changed``, поэтому затронутые курсы
+    и задания запоминаются перед удалением.
+    """
+    instance._counter_course_ids = list(instance.courses_enrolled.values_list("pk", flat=True))
+    instance._counter_assignment_ids = list(instance.completed_assignments.values_list("pk", flat=True))
+    instance._counter_assignment_course_ids = list(
+        instance.completed_assignments.values_list("course_id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=UserProfile)
+def update_counters_after_profile_delete(sender, instance, **kwargs):
+    Course.objects.filter(pk__in=getattr(instance, "_counter_course_ids", [])).refresh_students_count()
+    Assignment.objects.filter(
+        pk__in=getattr(instance, "_counter_assignment_ids", [])
+    ).refresh_completed_count()
+    bump_course_version(
+        *getattr(instance, "_counter_course_ids", []),
+        *getattr(instance, "_counter_assignment_course_ids", []),
+    )
+
+
+@receiver(pre_delete, sender=Course)
+def remember_course_students(sender, instance, **kwargs):
+    # Каскадное удаление связей со студентами не отправляет m2m_changed
+    instance._access_profile_ids = list(instance.students.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def reset_course_access(sender, instance, **kwargs):
+    """
+    Сбрасывает закэшированные курсы преподавателя при сохранении и удалении курса,
+    а при удалении — и курсы записанных на него студентов.
+    """
+    invalidate_course_access(instance.teacher_id, *getattr(instance, "_access_profile_ids", []))
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
+def reset_course_fragments_of_item(sender, instance, **kwargs):
+    bump_course_version(instance.course_id)
+
+
+@receiver(post_delete, sender=Lesson)
+@receiver(post_delete, sender=Assignment)
+def touch_course_after_item_delete(sender, instance, **kwargs):
+    """
+    Удалённое занятие или задание не оставляет своего ``updated_at``, поэтому отмечается изменение курса:
+    иначе ETag и Last-Modified страниц курса могли бы остаться прежними.
+    """
+    Course.objects.filter(pk=instance.course_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def reset_unread_count(sender, instance, **kwargs):
+    invalidate_unread_count(instance.user_id)
@@ -0,0 +1,53 @@
+from django import template
+
+from ..fragment_cache import fragment_key, get_fragment, set_fragment
+from ..routers import primary_reads
+
+register = template.Library()
+
+
+class CourseCacheNode(template.Node):
+    def __init__(self, nodelist, course, name, variant):
+        self.nodelist = nodelist
+        self.course = course
+        self.name = name
+        self.variant = variant
+
+    def render(self, context):
+        name = self.name.resolve(context)
+        prefetched = context.get("course_fragments")
+        if prefetched is not None and name in prefetched:
+            # Асинхронное представление уже прочитало фрагмент и само сохранит отрисованный
+            key, content = prefetched[name]
+            if content is None:
+                content = self.nodelist.render(context)
+                prefetched.remember(key, content)
+            return content
+        course = self.course.resolve(context)
+        key = fragment_key(course, name, self.variant.resolve(context))
+        content = get_fragment(key)
+        if content is None:
+            # Ленивые выборки фрагмента выполняются при отрисовке, поэтому читают из основной базы
+            with primary_reads():
+                content = self.nodelist.render(context)
+            set_fragment(key, content)
+        return content
+
+
+@register.tag("coursecache")
+def do_course_cache(parser, token):
+    """
+    Кэширует фрагмент шаблона с учётом версии курса::
+
+        {% coursecache course "lessons" user.userprofile.role %} ... {% endcoursecache %}
+
+    Фрагмент не должен содержать данных конкретного пользователя (например, ``{% csrf_token %}``):
+    он общий для всех пользователей с одинаковым вариантом.
+    """
+    bits = token.split_contents()
+    if len(bits) != 4:
+        raise template.TemplateSyntaxError(f"Тег '{bits[0]}' принимает курс, имя фрагмента и вариант.")
+    nodelist = parser.parse(("endcoursecache",))
+    parser.delete_first_token()
+    course, name, variant = (parser.compile_filter(bit) for bit in bits[1:])
+    return CourseCacheNode(nodelist, course, name, variant)
@@ -1,12 +1,84 @@
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import BACKEND_SESSION_KEY
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections
+from django.db.transaction import TransactionManagementError
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
 from django.urls import reverse
+from django.utils import timezone
 
-from .models import Assignment, Course, Lesson, UserProfile
+from . import archive
+from .access import COURSE_ACCESS_TIMEOUT, course_access
+from .async_views import AsyncAssignmentDetailView, AsyncCourseDetailView, AsyncHomeView
+from .cloning import clone_course
+from .completion import set_completions
+from .db import apply_sqlite_pragmas, copy_sqlite_database, retry_on_lock
+from .deletion import delete_course, purge_course
+from .enrollment import import_enrollments
+from .fragment_cache import bump_course_version, fragment_cache_stats
+from .gradebook import gradebook_rows
+from .ical import calendar_token
+from .jobs import enqueue, run_pending
+from .management.commands import benchmark
+from .middleware import (
+    LAST_WRITE_SESSION_KEY,
+    PROFILE_BACKEND,
+    ReplicaRoutingMiddleware,
+)
+from .models import (
+    ArchivedCompletion,
+    ArchivedCourse,
+    ArchivedForumPost,
+    ArchivedLesson,
+    Assignment,
+    Course,
+    Forum,
+    ForumPost,
+    Job,
+    Lesson,
+    Notification,
+    UserProfile,
+)
+from .notifications import (
+    UNREAD_COUNT_TIMEOUT,
+    fan_out_notification,
+    mark_all_read,
+    notify_course_students,
+    unread_count,
+)
+from .recurrence import RecurrenceRule, create_series, update_following
+from .routers import (
+    ReplicaRouter,
+    finish_request_routing,
+    primary_reads,
+    start_request_routing,
+)
+from .search import _fallback_rows, search
+from .seeding import SEED_PASSWORD, SeedOptions, seed_database
+from .signals import completions_changed
+from .timetable import period_start, shift_period, timetable, timetable_events
+from .views import HomeView
 
 
 # Создаём тестовые данные, которые можно использовать в разных тестовых случаях
 def create_test_data():
+    # Кэш живёт между тестами, а откат транзакции теста не сбрасывает закэшированные данные
+    cache.clear()
     user_teacher = User.objects.create_user(username="testuser_teacher", password="testpassword_teacher")
     user_student = User.objects.create_user(username="testuser_student", password="testpassword_student")
     teacher = UserProfile.objects.create(user=user_teacher, role="teacher")
@@ -29,6 +101,15 @@ def create_test_data():
     return user_teacher, user_student, teacher, student, course, lesson, assignment
 
 
+class FixtureTests(TestCase):
+    def test_demo_fixtures_load(self):
+        call_command("loaddata", "userprofile", "course", verbosity=0)
+        self.assertEqual(Course.objects.count(), 3)
+        self.assertEqual(Lesson.objects.count(), 6)
+        self.assertEqual(Assignment.objects.count(), 4)
+        self.assertFalse(Course.objects.filter(updated_at__isnull=True).exists())
+
+
 class ModelTests(TestCase):
     def test_course_creation(self):
         _, _, _, _, course, _, _ = create_test_data()
@@ -182,3 +263,1805 @@ class CourseManagementTests(TestCase):
 
         response = self.client.get(reverse("course_detail", args=[course.pk]))
         self.assertEqual(response.status_code, 403)  # Ожидаемый статус-код "Forbidden"
+
+
+class DashboardTests(TestCase):
+    def test_student_dashboard_shows_completion(self):
+        _, _, _, student, course, _, assignment = create_test_data()
+        course.students.add(student)
+        assignment.students_completed.add(student)
+        self.client.login(username="testuser_student", password="testpassword_student")
+
+        response = self.client.get(reverse("home"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Test Assignment")
+        self.assertContains(response, "Выполнено")
+        self.assertNotContains(response, "Не выполнено")
+
+    def test_student_dashboard_query_count_is_constant(self):
+        _, _, teacher, student, course, _, assignment = create_test_data()
+        course.students.add(student)
+        self.client.login(username="testuser_student", password="testpassword_student")
+        # Сессия, пользователь с профилем, ETag/Last-Modified, курсы и задания
+        with self.assertNumQueries(6):
+            self.client.get(reverse("home"))
+
+        for i in range(3):
+            extra_course = Course.objects.create(
+                title=f"Extra Course {i}", start_date="2023-01-01", end_date="2023-12-31", teacher=teacher
+            )
+            extra_course.students.add(student)
+            for j in range(5):
+                extra_assignment = Assignment.objects.create(
+                    title=f"Extra Assignment {i}.{j}",
+                    description="Extra assignment description",
+                    due_date="2023-02-01 23:59:59",
+                    course=extra_course,
+                )
+                if j % 2:
+                    extra_assignment.students_completed.add(student)
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse("home"))
+        self.assertContains(response, "Extra Assignment 2.4")
+
+
+class CourseProgressTests(TestCase):
+    def test_assignments_annotated_with_progress(self):
+        _, _, teacher, student, course, _, assignment = create_test_data()
+        other_user = User.objects.create_user(username="testuser_other", password="testpassword_other")
+        other = UserProfile.objects.create(user=other_user, role="student")
+        course.students.add(student, other)
+        assignment.students_completed.add(student)
+
+        annotated = Assignment.objects.with_progress().get(pk=assignment.pk)
+        self.assertEqual(annotated.num_completed, 1)
+        self.assertEqual(annotated.num_enrolled, 2)
+        self.assertEqual(annotated.completion_percent, 50)
+
+    def test_completion_percent_does_not_exceed_100(self):
+        _, _, _, student, course, _, assignment = create_test_data()
+        other_user = User.objects.create_user(username="testuser_other", password="testpassword_other")
+        other = UserProfile.objects.create(user=other_user, role="student")
+        course.students.add(student)
+        # Второй выполнивший задание студент ушёл с курса, а его отметка о выполнении осталась
+        assignment.students_completed.add(student, other)
+        annotated = Assignment.objects.with_progress().get(pk=assignment.pk)
+        self.assertEqual((annotated.num_completed, annotated.completion_percent), (2, 100))
+
+    def test_course_detail_query_count_does_not_depend_on_assignments(self):
+        _, _, _, student, course, _, _ = create_test_data()
+        course.students.add(student)
+        self.client.login(username="testuser_teacher", password="testpassword_teacher")
+        # Первый запрос заполняет кэш счётчика уведомлений, фрагменты сравниваемых запросов не закэшированы
+        self.client.get(reverse("course_detail", args=[course.pk]))
+        bump_course_version(course.pk)
+        with CaptureQueriesContext(connection) as single:
+            self.client.get(reverse("course_detail", args=[course.pk]))
+
+        for i in range(10):
+            Assignment.objects.create(
+                title=f"Extra Assignment {i}",
+                description="Extra assignment description",
+                due_date="2023-02-01 23:59:59",
+                course=course,
+            )
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(reverse("course_detail", args=[course.pk]))
+        self.assertContains(response, "0 из 1")
+        self.assertEqual(len(single), len(many))
+
+
+class CounterTests(TestCase):
+    def setUp(self):
+        _, _, _, self.student, self.course, _, self.assignment = create_test_data()
+        other_user = User.objects.create_user(username="testuser_other", password="testpassword_other")
+        self.other = UserProfile.objects.create(user=other_user, role="student")
+
+    def assertCounters(self, students_count, completed_count):
+        self.course.refresh_from_db()
+        self.assignment.refresh_from_db()
+        self.assertEqual(self.course.students_count, students_count)
+        self.assertEqual(self.assignment.completed_count, completed_count)
+
+    def test_counters_follow_forward_changes(self):
+        self.course.students.add(self.student, self.other)
+        self.assignment.students_completed.add(self.student, self.other)
+        self.assertCounters(2, 2)
+        self.course.students.remove(self.other)
+        self.assignment.students_completed.remove(self.other)
+        self.assertCounters(1, 1)
+        self.course.students.clear()
+        self.assignment.students_completed.clear()
+        self.assertCounters(0, 0)
+
+    def test_counters_follow_reverse_changes(self):
+        self.student.courses_enrolled.add(self.course)
+        self.student.completed_assignments.add(self.assignment)
+        self.other.courses_enrolled.add(self.course)
+        self.assertCounters(2, 1)
+        self.student.courses_enrolled.clear()
+        self.student.completed_assignments.clear()
+        self.assertCounters(1, 0)
+        self.other.delete()
+        self.assertCounters(0, 0)
+
+    def test_save_does_not_overwrite_counters(self):
+        stale_course = Course.objects.get(pk=self.course.pk)
+        self.course.students.add(self.student)
+        stale_course.title = "Renamed Course"
+        stale_course.save()
+        self.assertCounters(1, 0)
+
+    def test_save_rejects_counters_in_update_fields(self):
+        self.course.students_count = 5
+        with self.assertRaisesMessage(ValueError, "students_count"):
+            self.course.save(update_fields=["title", "students_count"])
+        self.course.title = "Renamed Course"
+        self.course.save(update_fields=["title"])
+        self.assertEqual(Course.objects.get(pk=self.course.pk).title, "Renamed Course")
+        self.assertCounters(0, 0)
+
+    def test_rebuild_counters_command(self):
+        self.course.students.add(self.student)
+        Course.objects.filter(pk=self.course.pk).update(students_count=42)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_counters", "--check", stdout=StringIO())
+        call_command("rebuild_counters", stdout=StringIO())
+        self.assertCounters(1, 0)
+        call_command("rebuild_counters", "--check", stdout=StringIO())
+
+    def test_rebuild_counters_updates_only_stale_rows(self):
+        self.course.students.add(self.student)
+        Course.objects.create(
+            title="Fresh Course", start_date="2023-01-01", end_date="2023-12-31", teacher=self.course.teacher
+        )
+        Course.all_objects.filter(pk=self.course.pk).update(students_count=42, deleted_at=timezone.now())
+        Assignment.all_objects.filter(pk=self.assignment.pk).update(completed_count=7)
+        before = dict(Course.all_objects.values_list("pk", "updated_at"))
+        with CaptureQueriesContext(connection) as queries:
+            call_command("rebuild_counters", stdout=StringIO())
+        updates = [query["sql"] for query in queries if query["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 2)
+        self.assertTrue(all("updated_at" not in sql for sql in updates))
+        self.assertEqual(Course.all_objects.get(pk=self.course.pk).students_count, 1)
+        self.assertEqual(Assignment.all_objects.get(pk=self.assignment.pk).completed_count, 0)
+        self.assertEqual(dict(Course.all_objects.values_list("pk", "updated_at")), before)
+
+    def test_assignment_completion_view_updates_counter(self):
+        self.course.students.add(self.student)
+        self.client.login(username="testuser_student", password="testpassword_student")
+        response = self.client.post(reverse("assignment_detail", args=[self.assignment.pk]))
+        self.assertEqual(response.status_code, 302)
+        self.assertCounters(1, 1)
+
+
+class StudentSearchTests(TestCase):
+    def setUp(self):
+        _, _, _, self.student, self.course, _, _ = create_test_data()
+        for i in range(25):
+            user = User.objects.create_user(
+                username=f"pupil{i:02d}", first_name="Пётр", last_name=f"Сидоров{i}"
+            )
+            UserProfile.objects.create(user=user, role="student")
+
+    def search(self, **params):
+        response = self.client.get(reverse("student_search", args=[self.course.pk]), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_search_by_prefix_excludes_enrolled(self):
+        self.course.students.add(self.student)
+        self.client.login(username="testuser_teacher", password="testpassword_teacher")
+        self.assertEqual(self.search(q="testuser")["results"], [])
+        data = self.search(q="Сидоров1")
+        self.assertEqual(
+            {s["username"] for s in data["results"]}, {"pupil01"} | {f"pupil{i}" for i in range(10, 20)}
+        )
+
+    def test_search_keyset_pagination(self):
+        self.client.login(username="testuser_teacher", password="testpassword_teacher")
+        first = self.search(q="pupil")
+        self.assertEqual(len(first["results"]), 20)
+        self.assertEqual(first["next"], "pupil19")
+        second = self.search(q="pupil", after=first["next"])
+        self.assertEqual([s["username"] for s in second["results"]], [f"pupil{i}" for i in range(20, 25)])
+        self.assertIsNone(second["next"])
+
+    def test_student_cannot_search(self):
+        self.client.login(username="testuser_student", password="testpassword_student")
+        response = self.client.get(reverse("student_search", args=[self.course.pk]))
+        self.assertEqual(response.status_code, 403)
+
+
+class EnrollmentImportTests(TestCase):
+    def setUp(self):
+        _, _, _, self.student, self.course, _, _ = create_test_data()
+        other_user = User.objects.create_user(
+            username="testuser_other", password="testpassword_other", email="other@example.com"
+        )
+        self.other = UserProfile.objects.create(user=other_user, role="student")
+
+    def test_import_enrollments_reports_row_errors(self):
+        lines = StringIO("username\ntestuser_student\nother@example.com\nunknown\ntestuser_teacher\n\n")
+        report = import_enrollments(self.course, lines, chunk_size=2)
+        self.assertEqual(report.processed, 4)
+        self.assertEqual(report.enrolled, 2)
+        self.assertEqual(
+            [(line, identifier) for line, identifier, _ in report.errors],
+            [(4, "unknown"), (5, "testuser_teacher")],
+        )
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.students_count, 2)
+
+        report = import_enrollments(self.course, StringIO("testuser_student\n"))
+        self.assertEqual(report.enrolled, 0)
+        self.assertEqual(report.errors, [])
+
+    def test_enrollment_import_view(self):
+        self.client.login(username="testuser_teacher", password="testpassword_teacher")
+        upload = SimpleUploadedFile("students.csv", "testuser_student\nnobody\n".encode())
+        response = self.client.post(reverse("enrollment_import", args=[self.course.pk]), {"file": upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Записано новых студентов: 1")
+        self.assertContains(response, "Пользователь не найден")
+        self.assertTrue(self.course.students.filter(pk=self.student.pk).exists())
+
+    def test_enrollment_import_rejects_non_utf8_file_before_enrolling(self):
+        self.client.login(username="testuser_teacher", password="testpassword_teacher")
+        content = "testuser_student\nother@example.com\nСидоров\n".encode("cp1251")
+        response = self.client.post(
+            reverse("enrollment_import", args=[self.course.pk]),
+            {"file": SimpleUploadedFile("students.csv", content)},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(
+            response.context["form"],
+            "file",
+            "Файл должен быть в кодировке UTF-8, недопустимые символы в строке 3. "
+            "Сохраните файл в UTF-8 и загрузите заново.",
+        )
+        self.assertFalse(self.course.students.exists())
+
+    def test_enrollment_import_is_limited_to_the_course_teacher(self):
+        url = reverse("enrollment_import", args=[self.course.pk])
+        self.assertRedirects(
+            self.client.get(url), f"{reverse('login')}?next={url}", fetch_redirect_response=False
+        )
+        stranger = User.objects.create_user(username="testuser_stranger", password="testpassword_stranger")
+        UserProfile.objects.create(user=stranger, role="teacher")
+        self.client.login(username="testuser_stranger", password="testpassword_stranger")
+        upload = SimpleUploadedFile("students.csv", b"testuser_student\n")
+        self.assertEqual(self.client.post(url, {"file": upload}).status_code, 403)
+        self.assertFalse(self.course.students.exists())
+
+    def test_import_enrollments_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as csv_file:
+            csv_file.write("other@example.com\n")
+        self.addCleanup(os.remove, csv_file.name)
+        call_command(
+            "import_enrollments", self.course.pk, csv_file.name, stdout=StringIO(), stderr=StringIO()
+        )
+        self.assertTrue(self.course.students.filter(pk=self.other.pk).exists())
+
+        with open(csv_file.name, "wb") as broken_file:
+            broken_file.write("Сидоров\n".encode("cp1251"))
+        with self.assertRaisesMessage(CommandError, "UTF-8"):
+            call_command("import_enrollments", self.course.pk, csv_file.name, stdout=StringIO())
+
+
+def failing_job(job):
+    raise RuntimeError("boom")
+
+
+class NotificationFanOutTests(TestCase):
+    def setUp(self):
+        _, _, _, self.student, self.course, _, _ = create_test_data()
+        self.course.students.add(self.student)
+
+    def test_lesson_create_enqueues_notification(self):
+        self.client.login(username="testuser_teacher", password="testpassword_teacher")
+        response = self.client.post(
+            reverse("lesson_create", args=[self.course.pk]),
+            {"title": "New Lesson", "description": "New lesson description", "date_time": "2023-02-10 10:00"},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(Job.objects.get().status, Job.STATUS_PENDING)
+
+        call_command("run_jobs", "--once", stdout=StringIO())
+        notification = Notification.objects.get()
+        self.assertEqual(notification.user, self.student)
+        self.assertEqual(notification.title, "Новое занятие: New Lesson")
+        self.assertEqual(Job.objects.get().status, Job.STATUS_DONE)
+
+    def test_unread_count_expires_without_invalidation(self):
+        self.assertEqual(unread_count(self.student.pk), 0)
+        # Так выглядит рассылка из процесса обработчика очереди: сброс его кэша сюда не доходит
+        Notification.objects.bulk_create([Notification(user=self.student, title="Title", content="")])
+        self.assertEqual(unread_count(self.student.pk), 0)
+        expired = time.time() + UNREAD_COUNT_TIMEOUT + 1
+        with mock.patch("django.core.cache.backends.locmem.time.time", return_value=expired):
+            self.assertEqual(unread_count(self.student.pk), 1)
+
+    def test_fan_out_is_idempotent(self):
+        job = notify_course_students(self.course, "Title", "Content")
+        fan_out_notification(job, **job.payload)
+        fan_out_notification(job, **job.payload)
+        self.assertEqual(Notification.objects.filter(job=job).count(), 1)
+
+    def test_failed_job_is_retried_later(self):
+        job = enqueue(failing_job)
+        self.assertEqual(run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_PENDING)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn("boom", job.last_error)
+        self.assertEqual(run_pending(), 0)
+
+
+class NotificationInboxTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        _, _, _, self.student, self.course, _, _ = create_test_data()
+        self.course.students.add(self.student)
+        Notification.objects.bulk_create(
+            [Notification(user=self.student, title=f"Notification {i}", content="Content") for i in range(25)]
+        )
+        self.client.login(username="testuser_student", password="testpassword_student")
+
+    def test_inbox_keyset_pagination(self):
+        response = self.client.get(reverse("notification_list"))
+        first_page = response.context["notifications"]
+        self.assertEqual(len(first_page), 20)
+        self.assertIsNotNone(response.context["next_cursor"])
+
+        response = self.client.get(reverse("notification_list"), {"before": response.context["next_cursor"]})
+        second_page = response.context["notifications"]
+        self.assertEqual(len(second_page), 5)
+        self.assertIsNone(response.context["next_cursor"])
+        self.assertFalse({n.pk for n in first_page} & {n.pk for n in second_page})
+
+    def test_unread_badge_is_cached(self):
+        response = self.client.get(reverse("notification_list"))
+        self.assertContains(response, '<span class="badge rounded-pill bg-danger">25</span>', html=True)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("notification_list"))
+        self.assertFalse([q for q in queries if "COUNT" in q["sql"]])
+
+    def test_mark_all_read_is_single_update(self):
+        self.assertEqual(unread_count(self.student.pk), 25)
+        with self.assertNumQueries(1):
+            mark_all_read(self.student.pk)
+        self.assertEqual(unread_count(self.student.pk), 0)
+        self.assertFalse(Notification.objects.filter(read=False).exists())
+
+    def test_counter_follows_read_and_fan_out(self):
+        notification = Notification.objects.first()
+        self.assertEqual(unread_count(self.student.pk), 25)
+        self.client.post(reverse("notification_mark_read", args=[notification.pk]))
+        self.assertEqual(unread_count(self.student.pk), 24)
+
+        notify_course_students(self.course, "Title", "Content")
+        run_pending()
+        self.assertEqual(unread_count(self.student.pk), 25)
+
+
+class ForumTests(TestCase):
+    def setUp(self):
+        _, _, _, self.student, self.course, _, _ = create_test_data()
+        self.course.students.add(self.student)
+
+    def test_student_posts_and_deletes_message(self):
+        self.client.login(username="testuser_student", password="testpassword_student")
+        response = self.client.post(
+            reverse("forum_detail", args=[self.course.pk]), {"title": "Question", "content": "How?"}
+        )
+        self.assertEqual(response.status_code, 302)
+        post = ForumPost.objects.get()
+        self.assertEqual(post.author, self.student)
+        self.assertEqual(post.forum.course, self.course)
+
+        response = self.client.get(reverse("forum_detail", args=[self.course.pk]))
+        self.assertContains(response, "Question")
+        self.client.post(reverse("forum_post_delete", args=[post.pk]))
+        self.assertFalse(ForumPost.objects.exists())
+
+    def test_forum_listing_is_paginated_with_constant_queries(self):
+        forum = Forum.objects.create(course=self.course, title="Forum")
+        ForumPost.objects.bulk_create(
+            [
+                ForumPost(forum=forum, author=self.student, title=f"Post {i}", content="Content")
+                for i in range(30)
+            ]
+        )
+        self.client.login(username="testuser_student", password="testpassword_student")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("forum_detail", args=[self.course.pk]))
+        self.assertEqual(len(response.context["posts"]), 20)
+        self.assertLess(len(queries), 10)
+        response = self.client.get(
+            reverse("forum_detail", args=[self.course.pk]), {"before": response.context["next_cursor"]}
+        )
+        self.assertEqual(len(response.context["posts"]), 10)
+
+    def test_unenrolled_student_cannot_view_forum(self):
+        self.course.students.remove(self.student)
+        self.client.login(username="testuser_student", password="testpassword_student")
+        response = self.client.get(reverse("forum_detail", args=[self.course.pk]))
+        self.assertEqual(response.status_code, 403)
+
+    def test_course_pages_show_post_counts(self):
+        forum = Forum.objects.create(course=self.course, title="Forum")
+        ForumPost.objects.create(forum=forum, author=self.student, title="Post", content="Content")
+        self.client.login(username="testuser_student", password="testpassword_student")
+        self.assertContains(self.client.get(reverse("home")), "Сообщений: 1")
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        _, _, self.teacher, self.student, self.course, self.lesson, self.assignment = create_test_data()
+        self.course.students.add(self.student)
+        self.other_course = Course.objects.create(
+            title="Other", start_date="2023-01-01", end_date="2023-12-31", teacher=self.teacher
+        )
+        Lesson.objects.create(
+            title="Хранимые процедуры",
+            date_time="2023-02-10 14:00:00",
+            description="Чужой курс",
+            course=self.other_course,
+        )
+
+    def test_index_follows_inserts_updates_and_deletes(self):
+        lesson = Lesson.objects.create(
+            title="Индексы в базах данных",
+            date_time="2023-02-01 10:00:00",
+            description="B-деревья",
+            course=self.course,
+        )
+        results, _ = search(self.student, "индекс")
+        self.assertEqual([result.object for result in results], [lesson])
+
+        Lesson.objects.filter(pk=lesson.pk).update(title="Транзакции")
+        self.assertEqual(search(self.student, "индекс")[0], [])
+        self.assertEqual(len(search(self.student, "транзакц")[0]), 1)
+
+        lesson.delete()
+        self.assertEqual(search(self.student, "транзакц")[0], [])
+
+    def test_search_is_restricted_to_visible_courses(self):
+        self.assertEqual(search(self.student, "процедуры")[0], [])
+        self.assertEqual(len(search(self.teacher, "процедуры")[0]), 1)
+
+    def test_results_are_ranked_and_paginated(self):
+        forum = Forum.objects.create(course=self.course, title="Forum")
+        ForumPost.objects.bulk_create(
+            [
+                ForumPost(forum=forum, author=self.student, title=f"Post {i}", content="test")
+                for i in range(25)
+            ]
+        )
+        results, has_next = search(self.student, "test lesson")
+        self.assertEqual([result.object for result in results], [self.lesson])
+        self.assertFalse(has_next)
+
+        first_page, has_next = search(self.student, "test", page_size=20)
+        self.assertTrue(has_next)
+        second_page, has_next = search(self.student, "test", page=2, page_size=20)
+        self.assertFalse(has_next)
+        self.assertEqual(len(first_page) + len(second_page), 27)
+
+    def test_fallback_matches_all_terms(self):
+        rows = _fallback_rows("test lesson", [self.course.pk], 10, 0)
+        self.assertEqual(rows, [("lesson", self.lesson.pk)])
+
+    def test_rebuild_command(self):
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual(len(search(self.student, "assignment")[0]), 1)
+
+    def test_admin_search(self):
+        User.objects.create_superuser(username="admin", password="adminpassword")
+        self.client.login(username="admin", password="adminpassword")
+        url = reverse("admin:study_buddy_lesson_changelist")
+        self.assertContains(self.client.get(url, {"q": "процедур"}), "Хранимые процедуры")
+        self.assertNotContains(self.client.get(url, {"q": "!!!"}), "Хранимые процедуры")
+        for query in ("-", '"', "*"):
+            self.assertEqual(self.client.get(url, {"q": query}).status_code, 200)
+
+    def test_search_view(self):
+        self.client.login(username="testuser_student", password="testpassword_student")
+        response = self.client.get(reverse("search"), {"q": "Test assignment"})
+        self.assertContains(response, reverse("assignment_detail", args=[self.assignment.pk]))
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        _, _, _, self.student, self.course, self.lesson, self.assignment = create_test_data()
+        self.course.students.add(self.student)
+        self.client.login(username="testuser_teacher", password="testpassword_teacher")
+        self.url = reverse("course_detail", args=[self.course.pk])
+
+    def test_repeated_requests_hit_cache(self):
+        self.client.get(self.url)
+        self.assertEqual(fragment_cache_stats(), {"hits": 0, "misses": 3})
+        with CaptureQueriesContext(connection) as cached:
+            response = self.client.get(self.url)
+        self.assertEqual(fragment_cache_stats(), {"hits": 3, "misses": 3})
+        self.assertContains(response, "Test Lesson")
+        self.assertFalse(
+            any('"study_buddy_lesson"."title"' in query["sql"] for query in cached.captured_queries)
+        )
+
+    def test_changes_invalidate_fragments(self):
+        self.client.get(self.url)
+        self.lesson.title = "Renamed Lesson"
+        self.lesson.save()
+        self.assertContains(self.client.get(self.url), "Renamed Lesson")
+
+        self.assignment.students_completed.add(self.student)
+        self.assertContains(self.client.get(self.url), "1 из 1")
+
+        self.course.students.remove(self.student)
+        self.assertContains(self.client.get(self.url), "Нет студентов")
+
+    def test_version_is_stored_in_database(self):
+        self.client.get(self.url)
+        # Так выглядит сброс из другого процесса: его кэш не общий с процессом сервера, а база общая
+        Lesson.objects.filter(pk=self.lesson.pk).update(title="Renamed Lesson")
+        Course.objects.filter(pk=self.course.pk).update(updated_at=timezone.now())
+        self.assertContains(self.client.get(self.url), "Renamed Lesson")
+
+    def test_stats_command_requires_shared_cache(self):
+        with self.assertRaisesMessage(CommandError, "STUDY_BUDDY_FRAGMENT_CACHE"):
+            call_command("fragment_cache_stats", stdout=StringIO())
+        with tempfile.TemporaryDirectory() as directory:
+            caches_setting = {
+                "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+                "shared": {
+                    "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                    "LOCATION": directory,
+                },
+            }
+            with override_settings(CACHES=caches_setting, STUDY_BUDDY_FRAGMENT_CACHE="shared"):
+                self.client.get(self.url)
+                self.client.get(self.url)
+                stdout = StringIO()
+                call_command("fragment_cache_stats", stdout=stdout)
+        self.assertIn("Попаданий: 3, промахов: 3", stdout.getvalue())
+
+    def test_teacher_and_student_variants_are_separate(self):
+        self.client.get(self.url)
+        self.client.login(username="testuser_student", password="testpassword_student")
+        response = self.client.get(self.url)
+        self.assertNotContains(response, "Редактировать")
+        self.assertEqual(fragment_cache_stats()["hits"], 0)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        _, _, _, self.student, self.course, self.lesson, self.assignment = create_test_data()
+        self.course.students.add(self.student)
+        self.client.login(username="testuser_student", password="testpassword_student")
+
+    def assertNotModified(self, url):
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(3):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        return etag
+
+    def test_unchanged_pages_return_304(self):
+        response = self.client.get(reverse("home"))
+        self.assertIn("Last-Modified", response)
+        self.assertNotModified(reverse("home"))
+        self.assertNotModified(reverse("course_detail", args=[self.course.pk]))
+
+    def test_completion_changes_validator(self):
+        url = reverse("home")
+        etag = self.assertNotModified(url)
+        self.assignment.students_completed.add(self.student)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Выполнено")
+
+    def test_enrollment_and_deletes_change_validator(self):
+        url = reverse("course_detail", args=[self.course.pk])
+        etag = self.assertNotModified(url)
+        other_user = User.objects.create_user(username="testuser_other", password="testpassword_other")
+        self.course.students.add(UserProfile.objects.create(user=other_user, role="student"))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.assertNotModified(url)
+        self.lesson.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_course_validators_are_not_sent_without_access(self):
+        url = reverse("course_detail", args=[self.course.pk])
+        response = self.client.get(url)
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+        self.course.students.remove(self.student)
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn("ETag", response)
+        self.assertNotIn("Last-Modified", response)
+        # «*» и дата из будущего совпали бы с валидаторами любой существующей страницы
+        for headers in (
+            {"HTTP_IF_NONE_MATCH": etag},
+            {"HTTP_IF_NONE_MATCH": "*"},
+            {"HTTP_IF_MODIFIED_SINCE": last_modified},
+            {"HTTP_IF_MODIFIED_SINCE": "Fri, 01 Jan 2100 00:00:00 GMT"},
+        ):
+            self.assertEqual(self.client.get(url, **headers).status_code, 403)
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        _, _, _, self.student, self.course, self.lesson, self.assignment = create_test_data()
+        self.course.students.add(self.student)
+        self.login("testuser_student", "testpassword_student")
+
+    def login(self, username, password):
+        self.client.login(username=username, password=password)
+        self.async_client.cookies = self.client.cookies
+
+    async def test_asgi_requests_use_async_views(self):
+        response = await self.async_client.get(reverse("home"))
+        self.assertEqual(response.resolver_match.func.view_class, AsyncHomeView)
+        self.assertContains(response, "Test Course")
+        self.assertContains(response, "Не выполнено")
+
+        # Первый ответ выставляет CSRF-cookie, которое входит в ETag. AsyncClient в Django 4.1
+        # превращает именованные аргументы в заголовки как есть, без префикса HTTP_
+        etag = (await self.async_client.get(reverse("home")))["ETag"]
+        response = await self.async_client.get(reverse("home"), **{"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_wsgi_requests_use_sync_views(self):
+        self.assertEqual(self.client.get(reverse("home")).resolver_match.func.view_class, HomeView)
+
+    async def test_course_page_renders_and_caches_fragments(self):
+        await sync_to_async(self.login)("testuser_teacher", "testpassword_teacher")
+        url = reverse("course_detail", args=[self.course.pk])
+        response = await self.async_client.get(url)
+        self.assertEqual(response.resolver_match.func.view_class, AsyncCourseDetailView)
+        self.assertContains(response, "Test Lesson")
+        self.assertContains(response, "0 из 1")
+
+        response = await self.async_client.get(url)
+        self.assertContains(response, "Test Lesson")
+        self.assertEqual(await sync_to_async(fragment_cache_stats)(), {"hits": 3, "misses": 3})
+
+    async def test_course_page_access(self):
+        other = await Course.objects.acreate(
+            title="Other Course",
+            start_date="2023-01-01",
+            end_date="2023-12-31",
+            teacher_id=self.course.teacher_id,
+        )
+        response = await self.async_client.get(reverse("course_detail", args=[other.pk]))
+        self.assertEqual(response.status_code, 403)
+        response = await self.async_client.get(reverse("course_detail", args=[other.pk + 1]))
+        self.assertEqual(response.status_code, 404)
+
+        self.async_client.cookies.clear()
+        response = await self.async_client.get(reverse("course_detail", args=[self.course.pk]))
+        self.assertEqual(response.status_code, 302)
+
+    async def test_student_marks_assignment_completed(self):
+        url = reverse("assignment_detail", args=[self.assignment.pk])
+        response = await self.async_client.post(url)
+        self.assertEqual(response.resolver_match.func.view_class, AsyncAssignmentDetailView)
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        self.assertContains(await self.async_client.get(url), "Вы выполнили это домашнее задание")
+        await sync_to_async(self.assignment.refresh_from_db)()
+        self.assertEqual(self.assignment.completed_count, 1)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        url = reverse("course_detail", args=[self.course.pk])
+        call_command(
+            "benchmark_handlers", "testuser_student", urls=[url], requests=3, concurrency=1, stdout=out
+        )
+        self.assertIn("WSGI:", out.getvalue())
+        self.assertIn("ASGI:", out.getvalue())
+        self.assertEqual(out.getvalue().count("ошибок: 0"), 2)
+
+
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        _, _, self.teacher, self.student, self.course, self.lesson, self.assignment = create_test_data()
+        self.course.students.add(self.student)
+        self.url = reverse("calendar_feed", args=[calendar_token(self.student)])
+
+    def test_feed_streams_lessons_and_deadlines(self):
+        response = self.client.get(self.url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/calendar; charset=utf-8")
+        body = b"".join(response.streaming_content).decode()
+        self.assertIn(f"UID:lesson-{self.lesson.pk}@study-buddy\r\n", body)
+        self.assertIn("SUMMARY:Срок сдачи: Test Assignment (Test Course)\r\n", body)
+        self.assertIn("DTSTART:20230110T110000Z\r\n", body)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in body.split("\r\n")))
+
+    def test_polling_is_served_from_cache_and_honors_conditional_get(self):
+        response = self.client.get(self.url)
+        b"".join(response.streaming_content)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertFalse(response.streaming)
+        self.assertContains(response, "Test Lesson")
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_teacher_feed_and_invalid_token(self):
+        response = self.client.get(reverse("calendar_feed", args=[calendar_token(self.teacher)]))
+        self.assertIn("Test Lesson", b"".join(response.streaming_content).decode())
+        response = self.client.get(reverse("calendar_feed", args=[f"{self.student.pk}:forged"]))
+        self.assertEqual(response.status_code, 404)
+
+
+class GradebookTests(TestCase):
+    def setUp(self):
+        _, _, _, self.student, self.course, _, self.assignment = create_test_data()
+        self.other_user = User.objects.create_user(
+            username="testuser_other", password="testpassword_other", last_name="Иванов"
+        )
+        self.other = UserProfile.objects.create(user=self.other_user, role="student")
+        self.second = Assignment.objects.create(
+            title="Second", description="", due_date="2023-03-01 00:00:00", course=self.course
+        )
+        self.course.students.add(self.student, self.other)
+        self.assignment.students_completed.add(self.student)
+        self.second.students_completed.add(self.student, self.other)
+
+    def test_rows_merge_enrollments_and_completions(self):
+        rows = list(gradebook_rows(self.course))
+        self.assertEqual(rows[0], ["Логин", "Фамилия", "Имя", "Test Assignment", "Second"])
+        self.assertEqual(rows[1], ["testuser_student", "", "", 1, 1])
+        self.assertEqual(rows[2], ["testuser_other", "Иванов", "", 0, 1])
+
+    def test_export_query_count_does_not_depend_on_size(self):
+        for i in range(5):
+            user = User.objects.create_user(username=f"extra{i}", password="password")
+            profile = UserProfile.objects.create(user=user, role="student")
+            self.course.students.add(profile)
+            self.second.students_completed.add(profile)
+        with self.assertNumQueries(3):
+            rows = list(gradebook_rows(self.course))
+        self.assertEqual(len(rows), 8)
+
+    def test_teacher_downloads_streamed_csv(self):
+        self.client.login(username="testuser_teacher", password="testpassword_teacher")
+        response = self.client.get(reverse("gradebook_export", args=[self.course.pk]))
+        self.assertTrue(response.streaming)
+        content = b"".join(response.streaming_content).decode("utf-8-sig")
+        self.assertIn("testuser_other,Иванов,,0,1", content)
+
+        self.client.login(username="testuser_student", password="testpassword_student")
+        response = self.client.get(reverse("gradebook_export", args=[self.course.pk]))
+        self.assertEqual(response.status_code, 403)
+
+    def test_export_is_limited_to_the_course_teacher(self):
+        url = reverse("gradebook_export", args=[self.course.pk])
+        response = self.client.get(url)
+        self.assertRedirects(response, f"{reverse('login')}?next={url}", fetch_redirect_response=False)
+
+        stranger = User.objects.create_user(username="testuser_stranger", password="testpassword_stranger")
+        UserProfile.objects.create(user=stranger, role="teacher")
+        self.client.login(username="testuser_stranger", password="testpassword_stranger")
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_export_command_writes_every_course(self):
+        with tempfile.TemporaryDirectory() as directory:
+            call_command("export_gradebooks", directory, stdout=StringIO())
+            with open(
+                os.path.join(directory, f"course_{self.course.pk}.csv"), encoding="utf-8-sig"
+            ) as csv_file:
+                self.assertEqual(len(csv_file.readlines()), 3)
+
+
+class BulkCompletionTests(TestCase):
+    def setUp(self):
+        _, _, _, self.student, self.course, _, self.assignment = create_test_data()
+        other_user = User.objects.create_user(username="testuser_other", password="testpassword_other")
+        self.other = UserProfile.objects.create(user=other_user, role="student")
+        self.second = Assignment.objects.create(
+            title="Second", description="", due_date="2023-03-01 00:00:00", course=self.course
+        )
+        self.course.students.add(self.student, self.other)
+        self.assignment.students_completed.add(self.student)
+
+    def test_applies_only_the_diff_and_sends_one_signal(self):
+        received = []
+        completions_changed.connect(lambda **kwargs: received.append(kwargs), weak=False, dispatch_uid="test")
+        self.addCleanup(completions_changed.disconnect, dispatch_uid="test")
+        marks = [
+            (self.student.pk, self.assignment.pk, False),
+            (self.student.pk, self.second.pk, True),
+            (self.other.pk, self.assignment.pk, False),
+            (self.other.pk, self.second.pk, True),
+        ]
+        report = set_completions(self.course, marks)
+        self.assertEqual((report.added, report.removed), (2, 1))
+        self.assertEqual(len(received), 1)
+        self.assertEqual(received[0]["removed"], [(self.student.pk, self.assignment.pk)])
+
+        self.assignment.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.assignment.completed_count, self.second.completed_count), (0, 2))
+
+    def test_ignores_unenrolled_students_and_foreign_assignments(self):
+        other_course = Course.objects.create(
+            title="Other", start_date="2023-01-01", end_date="2023-12-31", teacher=self.course.teacher
+        )
+        foreign = Assignment.objects.create(
+            title="Foreign", description="", due_date="2023-03-01", course=other_course
+        )
+        self.course.students.remove(self.other)
+        report = set_completions(
+            self.course, [(self.other.pk, self.second.pk, True), (self.student.pk, foreign.pk, True)]
+        )
+        self.assertEqual(report.added, 0)
+
+    def test_grid_saves_page_of_students(self):
+        self.client.login(username="testuser_teacher", password="testpassword_teacher")
+        url = reverse("completion_grid", args=[self.course.pk])
+        response = self.client.get(url)
+        self.assertEqual(len(response.context["rows"]), 2)
+        response = self.client.post(
+            url,
+            {"students": [self.student.pk, self.other.pk], "done": [f"{self.other.pk}:{self.second.pk}"]},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            set(Assignment.students_completed.through.objects.values_list("userprofile_id", "assignment_id")),
+            {(self.other.pk, self.second.pk)},
+        )
+
+    def test_import_round_trips_exported_gradebook(self):
+        self.client.login(username="testuser_teacher", password="testpassword_teacher")
+        exported = b"".join(
+            self.client.get(reverse("gradebook_export", args=[self.course.pk])).streaming_content
+        ).decode("utf-8-sig")
+        edited = exported.replace("testuser_other,,,0,0", "testuser_other,,,1,").replace(
+            "testuser_student,,,1,0", "testuser_student,,,0,x"
+        )
+        response = self.client.post(
+            reverse("completion_import", args=[self.course.pk]),
+            {"file": SimpleUploadedFile("gradebook.csv", edited.encode())},
+        )
+        report = response.context["report"]
+        self.assertEqual((report.processed, report.added, report.removed), (2, 1, 1))
+        self.assertEqual(len(report.errors), 1)
+        self.assertEqual(
+            set(Assignment.students_completed.through.objects.values_list("userprofile_id", "assignment_id")),
+            {(self.other.pk, self.assignment.pk)},
+        )
+
+    def test_import_rejects_non_utf8_file(self):
+        self.client.login(username="testuser_teacher", password="testpassword_teacher")
+        content = "Логин,Фамилия,Имя,Test Assignment,Second\ntestuser_other,Иванов,,1,1\n".encode("cp1251")
+        response = self.client.post(
+            reverse("completion_import", args=[self.course.pk]),
+            {"file": SimpleUploadedFile("gradebook.csv", content)},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(
+            response.context["form"],
+            "file",
+            "Файл должен быть в кодировке UTF-8, недопустимые символы в строке 1. "
+            "Сохраните файл в UTF-8 и загрузите заново.",
+        )
+        self.assertFalse(self.second.students_completed.exists())
+
+    def test_grid_and_import_are_limited_to_the_course_teacher(self):
+        stranger = User.objects.create_user(username="testuser_stranger", password="testpassword_stranger")
+        UserProfile.objects.create(user=stranger, role="teacher")
+        for name in ("completion_grid", "completion_import"):
+            url = reverse(name, args=[self.course.pk])
+            self.client.logout()
+            self.assertRedirects(
+                self.client.get(url), f"{reverse('login')}?next={url}", fetch_redirect_response=False
+            )
+            self.client.login(username="testuser_stranger", password="testpassword_stranger")
+            self.assertEqual(self.client.get(url).status_code, 403)
+            self.assertEqual(self.client.post(url).status_code, 403)
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        _, _, self.teacher, self.student, self.course, self.lesson, self.assignment = create_test_data()
+        self.course.students.add(self.student)
+        self.assignment.students_completed.add(self.student)
+        for i in range(2):
+            course = Course.objects.create(
+                title=f"Course {i}", start_date="2023-01-01", end_date="2023-12-31", teacher=self.teacher
+            )
+            course.students.add(self.student)
+            for j in range(3):
+                Lesson.objects.create(
+                    title=f"Lesson {j}", description="", date_time="2023-02-01 10:00", course=course
+                )
+                Assignment.objects.create(
+                    title=f"Task {j}", description="", due_date="2023-02-01 10:00", course=course
+                )
+        self.client.login(username="testuser_student", password="testpassword_student")
+
+    def get_json(self, name, *args, **params):
+        response = self.client.get(reverse(name, args=args), params)
+        if response.streaming:
+            return response.status_code, json.loads(b"".join(response.streaming_content))
+        return response.status_code, json.loads(response.content)
+
+    def test_sparse_fieldsets_and_includes(self):
+        status, data = self.get_json(
+            "api_course_list",
+            fields="id,title",
+            include="teacher,assignments",
+            **{"fields[assignments]": "id,completed"},
+        )
+        self.assertEqual(status, 200)
+        first = data["results"][0]
+        self.assertEqual(set(first), {"id", "title", "teacher", "assignments"})
+        self.assertEqual(first["teacher"]["username"], "testuser_teacher")
+        self.assertEqual(first["assignments"], [{"id": self.assignment.pk, "completed": True}])
+
+        status, data = self.get_json("api_course_list", fields="secret")
+        self.assertEqual(status, 400)
+
+    def test_list_query_count_does_not_depend_on_page_size(self):
+        url = reverse("api_course_list")
+        params = {"include": "teacher,lessons,assignments"}
+        # Сессия, пользователь с профилем, курсы с преподавателями, занятия и задания
+        with self.assertNumQueries(5):
+            self.client.get(url, {**params, "limit": 1})
+        with self.assertNumQueries(5):
+            self.client.get(url, {**params, "limit": 50})
+
+        for name, include in (("api_lesson_list", "course"), ("api_assignment_list", "course")):
+            with self.assertNumQueries(3):
+                self.client.get(reverse(name), {"include": include, "limit": 1})
+            with self.assertNumQueries(3):
+                self.client.get(reverse(name), {"include": include, "limit": 50})
+
+    def test_keyset_pagination(self):
+        _, data = self.get_json("api_lesson_list", limit=4)
+        self.assertEqual(len(data["results"]), 4)
+        _, rest = self.get_json("api_lesson_list", limit=4, after=data["next"])
+        self.assertEqual(len(rest["results"]), 3)
+        self.assertIsNone(rest["next"])
+
+    def test_visibility_and_completions(self):
+        hidden = Course.objects.create(
+            title="Hidden", start_date="2023-01-01", end_date="2023-12-31", teacher=self.teacher
+        )
+        self.assertEqual(self.get_json("api_course_detail", hidden.pk)[0], 404)
+        _, data = self.get_json("api_completion_list", include="assignment")
+        self.assertEqual(len(data["results"]), 1)
+        self.assertEqual(data["results"][0]["assignment"]["title"], "Test Assignment")
+
+        Notification.objects.create(user=self.student, title="Hello", content="")
+        _, data = self.get_json("api_notification_list")
+        self.assertEqual(data["results"][0]["title"], "Hello")
+
+        self.client.logout()
+        self.assertEqual(self.get_json("api_course_list")[0], 401)
+
+
+class RetryOnLockTests(SimpleTestCase):
+    def test_retry_on_lock(self):
+        calls = []
+
+        def flaky(error_message, failures):
+            calls.append(error_message)
+            if len(calls) <= failures:
+                raise OperationalError(error_message)
+            return "ok"
+
+        self.assertEqual(retry_on_lock(flaky, delay=0)("database is locked", 2), "ok")
+        self.assertEqual(len(calls), 3)
+
+        calls.clear()
+        with self.assertRaises(OperationalError):
+            retry_on_lock(flaky, attempts=3, delay=0)("database is locked", 5)
+        self.assertEqual(len(calls), 3)
+
+        calls.clear()
+        with self.assertRaises(OperationalError):
+            retry_on_lock(flaky, delay=0)("no such table", 1)
+        self.assertEqual(len(calls), 1)
+
+
+class DatabaseProfileTests(TestCase):
+    def test_no_retry_inside_transaction(self):
+        calls = []
+
+        @retry_on_lock(delay=0)
+        def locked():
+            calls.append(1)
+            raise OperationalError("database is locked")
+
+        # Тест выполняется внутри транзакции TestCase
+        with self.assertRaises(OperationalError):
+            locked()
+        self.assertEqual(len(calls), 1)
+
+    def test_pragmas_applied_on_connection(self):
+        connection = connections["default"]
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA cache_size")
+            (cache_size,) = cursor.fetchone()
+        pragmas = {"cache_size": -4096}
+        with override_settings(
+            STUDY_BUDDY_SQLITE_PRAGMAS=pragmas, STUDY_BUDDY_SQLITE_TRANSACTION_MODE="IMMEDIATE"
+        ):
+            apply_sqlite_pragmas(sender=connection.__class__, connection=connection)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA cache_size")
+                self.assertEqual(cursor.fetchone()[0], -4096)
+            self.assertIn("_start_transaction_under_autocommit", vars(connection))
+        finally:
+            del connection._start_transaction_under_autocommit
+            with connection.cursor() as cursor:
+                cursor.execute(f"PRAGMA cache_size = {cache_size}")
+
+
+class StressWritesTests(TransactionTestCase):
+    @override_settings(
+        STUDY_BUDDY_SQLITE_PRAGMAS={"busy_timeout": 5000, "journal_mode": "wal"},
+        STUDY_BUDDY_SQLITE_TRANSACTION_MODE="IMMEDIATE",
+    )
+    def test_stress_writes_command(self):
+        # Тестовая база SQLite живёт в памяти и не видна другим процессам, поэтому писатели работают
+        # с её копией в файле: на время команды соединение default подменяется соединением с копией
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "stress.sqlite3")
+        memory_connection = connections["default"]
+        copy_sqlite_database(memory_connection, path)
+        file_connection = memory_connection.__class__(
+            {**memory_connection.settings_dict, "NAME": path}, "default"
+        )
+        connections["default"] = file_connection
+        out = StringIO()
+        try:
+            call_command("stress_writes", processes=2, operations=30, students=3, assignments=2, stdout=out)
+            self.assertFalse(User.objects.filter(username__startswith="stress_writes_").exists())
+            self.assertFalse(Course.objects.exists())
+        finally:
+            file_connection.close()
+            connections["default"] = memory_connection
+        self.assertIn("journal_mode=wal", out.getvalue())
+        self.assertIn("упёрлись в блокировку: 0, другие ошибки: 0", out.getvalue())
+        self.assertIn("счётчики сходятся", out.getvalue())
+
+
+@override_settings(STUDY_BUDDY_REPLICAS=["replica"])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertEqual(self.router.db_for_read(Lesson), "default")
+
+    def test_request_reads_use_replica_until_write(self):
+        token = start_request_routing(use_replica=True)
+        try:
+            self.assertEqual(self.router.db_for_read(Lesson), "replica")
+            self.assertEqual(self.router.db_for_read(Session), "default")
+            self.assertEqual(self.router.db_for_write(Lesson), "default")
+            self.assertEqual(self.router.db_for_read(Lesson), "default")
+        finally:
+            routing = finish_request_routing(token)
+        self.assertTrue(routing.wrote)
+
+    def test_sticky_requests_use_primary(self):
+        token = start_request_routing(use_replica=False)
+        try:
+            self.assertEqual(self.router.db_for_read(Lesson), "default")
+        finally:
+            finish_request_routing(token)
+
+    def test_sticky_window(self):
+        class FakeRequest:
+            session = {}
+
+        request = FakeRequest()
+        self.assertTrue(ReplicaRoutingMiddleware.use_replica(request))
+        request.session[LAST_WRITE_SESSION_KEY] = time.time()
+        self.assertFalse(ReplicaRoutingMiddleware.use_replica(request))
+        request.session[LAST_WRITE_SESSION_KEY] = time.time() - 60
+        self.assertTrue(ReplicaRoutingMiddleware.use_replica(request))
+
+    def test_migrations_skip_replicas(self):
+        self.assertFalse(self.router.allow_migrate("replica", "study_buddy"))
+        self.assertIsNone(self.router.allow_migrate("default", "study_buddy"))
+
+
+# Основная база играет роль реплики: маршрутизация работает, а запросы идут в тестовую базу
+@override_settings(STUDY_BUDDY_REPLICAS=["default"])
+class ReplicaRoutingMiddlewareTests(TestCase):
+    def setUp(self):
+        _, _, _, _, self.course, _, _ = create_test_data()
+        self.client.login(username="testuser_teacher", password="testpassword_teacher")
+
+    def test_write_starts_sticky_window(self):
+        self.client.get(reverse("course_detail", args=[self.course.pk]))
+        self.assertNotIn(LAST_WRITE_SESSION_KEY, self.client.session)
+        self.client.post(
+            reverse("lesson_create", args=[self.course.pk]),
+            {"title": "New Lesson", "date_time": "2023-02-01 10:00", "description": "New"},
+        )
+        self.assertIn(LAST_WRITE_SESSION_KEY, self.client.session)
+        self.assertContains(self.client.get(reverse("course_detail", args=[self.course.pk])), "New Lesson")
+
+    def test_copy_inside_transaction_is_rejected(self):
+        with self.assertRaises(TransactionManagementError):
+            copy_sqlite_database(connections["default"], os.devnull)
+
+
+class ReplicaCacheFillTests(TransactionTestCase):
+    """
+    Реплика — снимок базы, сделанный до изменений, то есть отстающая копия.
+    """
+
+    def setUp(self):
+        _, _, self.teacher, self.student, self.course, self.lesson, _ = create_test_data()
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, "stale.sqlite3")
+        copy_sqlite_database(connections["default"], path)
+        connections.settings["stale"] = {**connections.settings["default"], "NAME": path}
+
+    def tearDown(self):
+        connections["stale"].close()
+        del connections["stale"]
+        del connections.settings["stale"]
+        self.directory.cleanup()
+
+    @override_settings(STUDY_BUDDY_REPLICAS=["stale"])
+    def test_caches_are_filled_from_primary(self):
+        self.course.students.add(self.student)
+        Notification.objects.create(user=self.student, title="Новое занятие", content="")
+        Lesson.objects.filter(pk=self.lesson.pk).update(title="Fresh Lesson")
+        cache.clear()
+        self.assertFalse(Course.students.through.objects.using("stale").exists())
+
+        token = start_request_routing(use_replica=True)
+        try:
+            self.assertEqual(ReplicaRouter().db_for_read(Lesson), "stale")
+            self.assertEqual(course_access(self.student.pk).enrolled, {self.course.pk})
+            self.assertEqual(unread_count(self.student.pk), 1)
+            with primary_reads():
+                self.assertEqual(ReplicaRouter().db_for_read(Lesson), "default")
+            self.assertEqual(ReplicaRouter().db_for_read(Lesson), "stale")
+        finally:
+            finish_request_routing(token)
+
+        self.client.login(username="testuser_teacher", password="testpassword_teacher")
+        response = self.client.get(reverse("course_detail", args=[self.course.pk]))
+        self.assertContains(response, "Fresh Lesson")
+        self.assertNotContains(response, "Нет студентов")
+
+
+class RefreshReplicaTests(TransactionTestCase):
+    def test_copy_sqlite_database(self):
+        create_test_data()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "replica.sqlite3")
+            copy_sqlite_database(connections["default"], path)
+            replica = sqlite3.connect(path)
+            try:
+                (titles,) = replica.execute("SELECT group_concat(title) FROM study_buddy_course").fetchone()
+            finally:
+                replica.close()
+        self.assertEqual(titles, "Test Course")
+
+    def test_command_requires_replicas(self):
+        with self.assertRaises(CommandError):
+            call_command("refresh_replica")
+
+
+class CourseAccessTests(TestCase):
+    def setUp(self):
+        _, _, self.teacher, self.student, self.course, _, _ = create_test_data()
+        self.client.login(username="testuser_student", password="testpassword_student")
+
+    def test_user_is_loaded_with_profile(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("home"))
+        self.assertFalse(
+            [query for query in queries if query["sql"].startswith('SELECT "study_buddy_userprofile"')]
+        )
+
+    def test_enrollment_changes_reset_access(self):
+        self.assertFalse(course_access(self.student.pk).enrolled)
+        self.course.students.add(self.student)
+        self.assertEqual(course_access(self.student.pk).enrolled, {self.course.pk})
+        self.student.courses_enrolled.remove(self.course)
+        self.assertFalse(course_access(self.student.pk).enrolled)
+        self.student.courses_enrolled.add(self.course)
+        self.assertEqual(course_access(self.student.pk).enrolled, {self.course.pk})
+        self.student.courses_enrolled.clear()
+        self.assertFalse(course_access(self.student.pk).enrolled)
+        self.course.students.add(self.student)
+        self.assertEqual(course_access(self.student.pk).enrolled, {self.course.pk})
+        self.course.students.clear()
+        self.assertFalse(course_access(self.student.pk).enrolled)
+
+    def test_access_expires_without_invalidation(self):
+        self.course.students.add(self.student)
+        self.assertEqual(course_access(self.student.pk).enrolled, {self.course.pk})
+        # Так выглядит исключение из курса командой или задачей в другом процессе: сброс кэша сюда не доходит
+        Course.students.through.objects.filter(course=self.course)._raw_delete(connection.alias)
+        self.assertEqual(course_access(self.student.pk).enrolled, {self.course.pk})
+        expired = time.time() + COURSE_ACCESS_TIMEOUT + 1
+        with mock.patch("django.core.cache.backends.locmem.time.time", return_value=expired):
+            self.assertFalse(course_access(self.student.pk).enrolled)
+
+    def test_course_changes_reset_access(self):
+        self.course.students.add(self.student)
+        self.assertEqual(course_access(self.teacher.pk).taught, {self.course.pk})
+        self.assertEqual(course_access(self.student.pk).enrolled, {self.course.pk})
+        self.course.delete()
+        self.assertFalse(course_access(self.teacher.pk).taught)
+        self.assertFalse(course_access(self.student.pk).enrolled)
+
+    def test_course_page_checks_access_without_queries(self):
+        url = reverse("course_detail", args=[self.course.pk])
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.course.students.add(self.student)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse([query for query in queries if "study_buddy_course_students" in query["sql"]])
+
+    def test_missing_course_is_not_found(self):
+        url = reverse("course_detail", args=[self.course.pk + 100])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("course_detail", args=[self.course.pk]))
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse([query for query in queries if "archived" in query["sql"]])
+
+    def test_legacy_session_is_upgraded(self):
+        session = self.client.session
+        session[BACKEND_SESSION_KEY] = "django.contrib.auth.backends.ModelBackend"
+        session.save()
+        self.assertEqual(self.client.get(reverse("home")).status_code, 200)
+        self.assertEqual(self.client.session[BACKEND_SESSION_KEY], PROFILE_BACKEND)
+
+
+class SeedCommandTests(TestCase):
+    def seed(self, *args):
+        call_command(
+            "seed",
+            "--teachers=2",
+            "--students=10",
+            "--courses=3",
+            "--students-per-course=4",
+            "--lessons=4",
+            "--assignments=4",
+            "--posts=2",
+            *args,
+            stdout=StringIO(),
+        )
+
+    def test_seed_creates_consistent_data(self):
+        self.seed()
+        self.assertEqual(UserProfile.objects.filter(role="teacher").count(), 2)
+        self.assertEqual(UserProfile.objects.filter(role="student").count(), 10)
+        self.assertEqual(Lesson.objects.count(), 12)
+        self.assertEqual(ForumPost.objects.count(), 6)
+        self.assertEqual(set(Course.objects.values_list("students_count", flat=True)), {4})
+        self.assertFalse(Course.objects.with_stale_students_count().exists())
+        self.assertFalse(Assignment.objects.with_stale_completed_count().exists())
+        self.assertTrue(Assignment.students_completed.through.objects.exists())
+        self.assertTrue(self.client.login(username="seed_student_0", password=SEED_PASSWORD))
+
+    def test_seed_requires_replace(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
+        self.seed("--replace", "--seed=1")
+        self.assertEqual(Course.objects.count(), 3)
+
+
+class BenchmarkCommandTests(TestCase):
+    def setUp(self):
+        seed_database(
+            SeedOptions(teachers=1, students=5, courses=1, students_per_course=3, lessons=2, posts=2)
+        )
+        handle, self.baseline = tempfile.mkstemp(suffix=".json")
+        os.close(handle)
+        self.addCleanup(os.remove, self.baseline)
+
+    def benchmark(self, *args):
+        out = StringIO()
+        call_command("benchmark", "--requests=2", f"--baseline={self.baseline}", *args, stdout=out)
+        return out.getvalue()
+
+    def test_compares_with_baseline(self):
+        self.benchmark("--save-baseline")
+        with open(self.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        self.assertEqual(set(baseline["scenarios"]), {scenario.name for scenario in benchmark.SCENARIOS})
+        self.assertIn("Регрессий относительно базовой линии нет", self.benchmark("--tolerance=100"))
+
+        baseline["scenarios"]["home:student"]["queries"] -= 1
+        with open(self.baseline, "w", encoding="utf-8") as baseline_file:
+            json.dump(baseline, baseline_file)
+        with self.assertRaisesMessage(CommandError, "home:student: запросов к базе"):
+            self.benchmark("--scenario=home:student", "--tolerance=100")
+
+    def test_missing_baseline_is_an_error(self):
+        os.remove(self.baseline)
+        with self.assertRaisesMessage(CommandError, "не найдена"):
+            self.benchmark("--scenario=home:student")
+        self.benchmark("--scenario=home:student", "--save-baseline")
+        self.assertTrue(os.path.exists(self.baseline))
+
+
+class CourseDeletionTests(TestCase):
+    def setUp(self):
+        _, _, self.teacher, self.student, self.course, self.lesson, self.assignment = create_test_data()
+        self.course.students.add(self.student)
+        self.assignment.students_completed.add(self.student)
+        forum = Forum.objects.create(course=self.course, title="Форум")
+        ForumPost.objects.create(forum=forum, author=self.student, title="Вопрос", content="Текст")
+
+    def test_delete_hides_course_and_items_before_purge(self):
+        self.client.login(username="testuser_teacher", password="testpassword_teacher")
+        self.client.post(reverse("course_delete", args=[self.course.pk]))
+        self.assertTrue(Course.all_objects.filter(pk=self.course.pk, deleted_at__isnull=False).exists())
+        self.assertTrue(Lesson._base_manager.filter(pk=self.lesson.pk).exists())
+        self.assertFalse(Lesson.objects.filter(pk=self.lesson.pk).exists())
+        self.assertFalse(Assignment.objects.filter(pk=self.assignment.pk).exists())
+        self.assertEqual(
+            self.client.get(reverse("assignment_detail", args=[self.assignment.pk])).status_code, 404
+        )
+
+        self.client.login(username="testuser_student", password="testpassword_student")
+        self.assertEqual(self.client.get(reverse("course_detail", args=[self.course.pk])).status_code, 404)
+        self.assertNotContains(self.client.get(reverse("home")), "Test Course")
+        response = self.client.get(reverse("api_assignment_list"))
+        self.assertEqual(json.loads(b"".join(response.streaming_content))["results"], [])
+
+    def test_purge_removes_rows_in_chunks(self):
+        delete_course(self.course)
+        Lesson.objects.create(
+            title="Second Lesson", date_time="2023-01-17 14:00:00+00:00", description="", course=self.course
+        )
+        progress = []
+        deleted = purge_course(self.course.pk, chunk_size=1, progress=lambda *step: progress.append(step))
+        self.assertEqual(deleted, 8)
+        self.assertIn(("занятия", 2), progress)
+        self.assertFalse(Course.all_objects.filter(pk=self.course.pk).exists())
+        self.assertFalse(Lesson._base_manager.exists())
+        self.assertFalse(ForumPost.objects.exists())
+        self.assertFalse(Assignment.students_completed.through.objects.exists())
+        self.assertFalse(Course.students.through.objects.exists())
+        self.assertTrue(UserProfile.objects.filter(pk=self.student.pk).exists())
+
+    def test_purge_runs_from_queue_and_skips_live_courses(self):
+        self.assertEqual(purge_course(self.course.pk), 0)
+        self.assertTrue(Course.objects.filter(pk=self.course.pk).exists())
+        delete_course(self.course)
+        run_pending()
+        self.assertFalse(Course.all_objects.filter(pk=self.course.pk).exists())
+        self.assertEqual(Job.objects.get().status, Job.STATUS_DONE)
+
+
+class CourseArchiveTests(TestCase):
+    def setUp(self):
+        _, _, self.teacher, self.student, self.course, self.lesson, self.assignment = create_test_data()
+        self.course.students.add(self.student)
+        self.assignment.students_completed.add(self.student)
+        forum = Forum.objects.create(course=self.course, title="Форум")
+        self.post = ForumPost.objects.create(
+            forum=forum, author=self.student, title="Вопрос", content="Текст"
+        )
+        self.created_at = ForumPost.objects.get().created_at
+        self.current = Course.objects.create(
+            title="Current Course", start_date="2023-01-01", end_date="2099-12-31", teacher=self.teacher
+        )
+
+    def archive(self):
+        call_command("archive_courses", stdout=StringIO())
+
+    def test_archive_moves_ended_courses(self):
+        self.archive()
+        self.assertEqual(list(Course.objects.all()), [self.current])
+        self.assertFalse(Lesson._base_manager.exists())
+        self.assertFalse(ForumPost.objects.exists())
+        self.assertFalse(Assignment.students_completed.through.objects.exists())
+        archived = ArchivedCourse.objects.get()
+        self.assertEqual((archived.pk, archived.students_count), (self.course.pk, 1))
+        self.assertEqual(list(archived.lessons.values_list("pk", flat=True)), [self.lesson.pk])
+        self.assertEqual(ArchivedCompletion.objects.get().userprofile_id, self.student.pk)
+        self.assertEqual(ArchivedForumPost.objects.get().created_at, self.created_at)
+
+    def test_archive_copies_and_deletes_rows_in_short_transactions(self):
+        Lesson.objects.bulk_create(
+            Lesson(course=self.course, title=f"Lesson {i}", description="", date_time=self.lesson.date_time)
+            for i in range(4)
+        )
+        # Прерванный перенос: курс уже скопирован в архив, но ещё виден в рабочих таблицах
+        archive._copy_rows(Course, ArchivedCourse, "pk", [self.course.pk])
+        with mock.patch.object(archive, "ARCHIVE_CHUNK_SIZE", 2), CaptureQueriesContext(
+            connection
+        ) as queries:
+            self.archive()
+        statements = [query["sql"] for query in queries]
+        self.assertEqual(
+            len(
+                [
+                    sql
+                    for sql in statements
+                    if sql.startswith("INSERT") and '"study_buddy_archivedlesson"' in sql[:60]
+                ]
+            ),
+            3,
+        )
+        self.assertEqual(
+            len([sql for sql in statements if sql.startswith('DELETE FROM "study_buddy_lesson"')]), 3
+        )
+        self.assertEqual(ArchivedLesson.objects.filter(course_id=self.course.pk).count(), 5)
+        self.assertFalse(Course.all_objects.filter(pk=self.course.pk).exists())
+
+    def test_archived_course_is_read_only_page(self):
+        self.archive()
+        url = reverse("course_detail", args=[self.course.pk])
+        self.client.login(username="testuser_student", password="testpassword_student")
+        response = self.client.get(url)
+        self.assertContains(response, "Архив")
+        self.assertContains(response, "Test Lesson")
+        self.assertContains(response, "Вопрос")
+        self.assertNotContains(response, reverse("lesson_update", args=[self.lesson.pk]))
+
+        self.client.login(username="testuser_teacher", password="testpassword_teacher")
+        self.assertContains(self.client.get(url), "Test Assignment")
+
+        UserProfile.objects.create(
+            user=User.objects.create_user(username="other_student", password="password"), role="student"
+        )
+        self.client.login(username="other_student", password="password")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(
+            self.client.get(reverse("course_detail", args=[self.course.pk + 100])).status_code, 404
+        )
+
+    async def test_archived_course_under_asgi(self):
+        await sync_to_async(self.archive)()
+        await sync_to_async(self.client.login)(username="testuser_student", password="testpassword_student")
+        self.async_client.cookies = self.client.cookies
+        response = await self.async_client.get(reverse("course_detail", args=[self.course.pk]))
+        self.assertEqual(response.resolver_match.func.view_class, AsyncCourseDetailView)
+        self.assertContains(response, "Test Lesson")
+
+    def test_restore_brings_course_back(self):
+        self.archive()
+        call_command("restore_courses", str(self.course.pk), stdout=StringIO())
+        self.assertFalse(ArchivedCourse.objects.exists())
+        course = Course.objects.get(pk=self.course.pk)
+        self.assertEqual(course.students_count, 1)
+        self.assertEqual(Assignment.objects.get(pk=self.assignment.pk).completed_count, 1)
+        self.assertEqual(ForumPost.objects.get(pk=self.post.pk).created_at, self.created_at)
+        self.assertEqual(course_access(self.student.pk).enrolled, {self.course.pk})
+        self.client.login(username="testuser_student", password="testpassword_student")
+        self.assertContains(self.client.get(reverse("course_detail", args=[self.course.pk])), "Форум курса")
+        with self.assertRaises(CommandError):
+            call_command("restore_courses", str(self.course.pk), stdout=StringIO())
+
+
+class CourseCloneTests(TestCase):
+    def setUp(self):
+        _, _, self.teacher, self.student, self.course, self.lesson, self.assignment = create_test_data()
+        self.course.students.add(self.student)
+        self.assignment.students_completed.add(self.student)
+        for obj in (self.course, self.lesson, self.assignment):
+            obj.refresh_from_db()
+
+    def test_clone_shifts_dates(self):
+        clone = clone_course(self.course, self.teacher, "Test Course 2", date(2023, 7, 2))
+        self.assertEqual((clone.start_date, clone.end_date), (date(2023, 7, 2), date(2024, 6, 30)))
+        lesson = clone.lessons.get()
+        self.assertEqual(lesson.title, "Test Lesson")
+        self.assertEqual(timezone.localtime(lesson.date_time).replace(tzinfo=None), datetime(2023, 7, 11, 14))
+        assignment = clone.assignments.get()
+        self.assertEqual(assignment.due_date - self.assignment.due_date, timedelta(days=182))
+        self.assertEqual(assignment.completed_count, 0)
+        self.assertFalse(clone.students.exists())
+
+    def test_clone_copies_students_with_constant_queries(self):
+        Lesson.objects.bulk_create(
+            Lesson(course=self.course, title=f"Lesson {i}", description="", date_time=self.lesson.date_time)
+            for i in range(150)
+        )
+        Assignment.objects.bulk_create(
+            Assignment(
+                course=self.course, title=f"Task {i}", description="", due_date=self.assignment.due_date
+            )
+            for i in range(150)
+        )
+        with CaptureQueriesContext(connection) as queries:
+            clone = clone_course(self.course, self.teacher, "Copy", date(2024, 1, 1), copy_students=True)
+        self.assertLess(len(queries), 20)
+        self.assertEqual(clone.lessons.count(), 151)
+        self.assertEqual(clone.assignments.count(), 151)
+        self.assertEqual(clone.students_count, 1)
+        self.assertEqual(course_access(self.student.pk).enrolled, {self.course.pk, clone.pk})
+
+    def test_clone_view(self):
+        url = reverse("course_clone", args=[self.course.pk])
+        self.assertRedirects(
+            self.client.get(url), f"{reverse('login')}?next={url}", fetch_redirect_response=False
+        )
+        self.client.login(username="testuser_student", password="testpassword_student")
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        stranger = User.objects.create_user(username="testuser_stranger", password="testpassword_stranger")
+        UserProfile.objects.create(user=stranger, role="teacher")
+        self.client.login(username="testuser_stranger", password="testpassword_stranger")
+        self.assertEqual(
+            self.client.post(url, {"title": "Stolen", "start_date": "2023-07-02"}).status_code, 403
+        )
+        self.assertFalse(Course.objects.filter(title="Stolen").exists())
+
+        self.client.login(username="testuser_teacher", password="testpassword_teacher")
+        self.assertContains(self.client.get(url), 'value="2023-07-02"')
+        response = self.client.post(
+            url, {"title": "Next Term", "start_date": "2023-07-02", "copy_students": "on"}
+        )
+        clone = Course.objects.get(title="Next Term")
+        self.assertRedirects(response, reverse("course_detail", args=[clone.pk]))
+        self.assertEqual(clone.teacher, self.teacher)
+        self.assertEqual(clone.students_count, 1)
+
+
+class LessonSeriesTests(TestCase):
+    def setUp(self):
+        _, _, self.teacher, self.student, self.course, self.lesson, _ = create_test_data()
+        self.course.students.add(self.student)
+        self.course.refresh_from_db()
+        # Вторники и четверги в 10:00 с 6 февраля 2023 года, 23 февраля — праздник
+        self.rule = RecurrenceRule(
+            [1, 3], datetime(2023, 2, 6, 10).time(), date(2023, 2, 6), 16, {date(2023, 2, 23)}
+        )
+
+    def local_times(self, lessons):
+        return [timezone.localtime(lesson.date_time).replace(tzinfo=None) for lesson in lessons]
+
+    def test_rule_expands_in_order_skipping_dates(self):
+        dates = self.rule.dates()
+        self.assertEqual(len(dates), 31)
+        self.assertEqual(dates[:3], [date(2023, 2, 7), date(2023, 2, 9), date(2023, 2, 14)])
+        self.assertNotIn(date(2023, 2, 23), dates)
+        self.assertEqual(dates[-1], date(2023, 5, 25))
+        self.assertEqual(timezone.localtime(self.rule.occurrences()[0]).hour, 10)
+
+    def test_create_series_with_single_insert(self):
+        jobs = Job.objects.count()
+        with CaptureQueriesContext(connection) as queries:
+            lessons = create_series(self.course, self.rule, "Лекция", "Материал лекции")
+        inserts = [query for query in queries if query["sql"].startswith('INSERT INTO "study_buddy_lesson"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(len(lessons), 31)
+        self.assertEqual(Lesson.objects.filter(series=lessons[0].series).count(), 31)
+        self.assertEqual(Job.objects.count(), jobs + 1)
+
+    def test_create_series_validates_occurrences(self):
+        # 10 января в 14:00 уже есть занятие, а после 31 декабря курс закончился
+        rule = RecurrenceRule([1], datetime(2023, 1, 9, 14).time(), date(2023, 1, 9), 52)
+        with self.assertRaises(ValidationError) as context:
+            create_series(self.course, rule, "Лекция", "")
+        self.assertEqual(len(context.exception.messages), 2)
+        self.assertIn("10.01.2023 14:00", context.exception.messages[1])
+        with self.assertRaises(ValidationError):
+            create_series(
+                self.course,
+                RecurrenceRule([], datetime(2023, 1, 9, 14).time(), date(2023, 1, 9), 4),
+                "Лекция",
+                "",
+            )
+        self.assertEqual(Lesson.objects.filter(course=self.course).count(), 1)
+
+    def test_update_following(self):
+        lessons = sorted(
+            create_series(self.course, self.rule, "Лекция", ""), key=lambda lesson: lesson.date_time
+        )
+        lesson = lessons[4]
+        new_time = timezone.make_aware(datetime(2023, 2, 21, 11, 30))
+        with CaptureQueriesContext(connection) as queries:
+            count = update_following(lesson, "Семинар", "Новый формат", new_time)
+        self.assertEqual(count, 27)
+        self.assertLess(len(queries), 15)
+        series = list(Lesson.objects.filter(series=lesson.series).order_by("date_time"))
+        self.assertEqual({item.title for item in series[:4]}, {"Лекция"})
+        self.assertEqual({item.title for item in series[4:]}, {"Семинар"})
+        self.assertEqual(
+            self.local_times(series[3:5]), [datetime(2023, 2, 16, 10), datetime(2023, 2, 21, 11, 30)]
+        )
+        self.assertEqual(self.local_times(series[-1:]), [datetime(2023, 5, 25, 11, 30)])
+        self.assertEqual(lesson.title, "Семинар")
+
+    def test_update_following_moved_back(self):
+        lessons = sorted(
+            create_series(self.course, self.rule, "Лекция", ""), key=lambda lesson: lesson.date_time
+        )
+        count = update_following(lessons[1], "Лекция", "", timezone.make_aware(datetime(2023, 2, 8, 10)))
+        self.assertEqual(count, 30)
+        self.assertEqual(Lesson.objects.filter(series=lessons[0].series, title="Лекция").count(), 31)
+        self.assertEqual(
+            self.local_times(Lesson.objects.filter(series=lessons[0].series).order_by("date_time")[:3]),
+            [datetime(2023, 2, 7, 10), datetime(2023, 2, 8, 10), datetime(2023, 2, 13, 10)],
+        )
+
+    def test_series_view(self):
+        url = reverse("lesson_series_create", args=[self.course.pk])
+        data = {
+            "title": "Лекция",
+            "description": "Материал лекции",
+            "weekdays": ["1", "3"],
+            "time": "10:00",
+            "start_date": "2023-02-06",
+            "weeks": "16",
+            "skip_dates": "23.02.2023",
+        }
+        self.assertRedirects(
+            self.client.get(url), f"{reverse('login')}?next={url}", fetch_redirect_response=False
+        )
+        self.client.login(username="testuser_student", password="testpassword_student")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        stranger = User.objects.create_user(username="testuser_stranger", password="testpassword_stranger")
+        UserProfile.objects.create(user=stranger, role="teacher")
+        self.client.login(username="testuser_stranger", password="testpassword_stranger")
+        self.assertEqual(self.client.post(url, data).status_code, 403)
+        self.assertEqual(Lesson.objects.filter(course=self.course).count(), 1)
+
+        self.client.login(username="testuser_teacher", password="testpassword_teacher")
+        response = self.client.post(url, {**data, "preview": ""})
+        self.assertContains(response, "Будет создано занятий: 31")
+        self.assertEqual(Lesson.objects.filter(course=self.course).count(), 1)
+
+        response = self.client.post(url, {**data, "skip_dates": "23 февраля"})
+        self.assertContains(response, "Неверная дата: 23")
+
+        response = self.client.post(url, data)
+        self.assertRedirects(response, reverse("course_detail", args=[self.course.pk]))
+        self.assertEqual(Lesson.objects.filter(course=self.course).count(), 32)
+
+        response = self.client.post(url, data)
+        self.assertContains(response, "В это время уже есть занятия")
+
+    def test_lesson_update_view_following(self):
+        lessons = sorted(
+            create_series(self.course, self.rule, "Лекция", ""), key=lambda lesson: lesson.date_time
+        )
+        self.client.login(username="testuser_teacher", password="testpassword_teacher")
+        url = reverse("lesson_update", args=[lessons[-2].pk])
+        self.assertContains(self.client.get(url), "Это и следующие занятия серии")
+        self.assertNotContains(
+            self.client.get(reverse("lesson_update", args=[self.lesson.pk])), "Это и следующие занятия серии"
+        )
+        response = self.client.post(
+            url,
+            {
+                "title": "Консультация",
+                "description": "Вопросы",
+                "date_time": "2023-05-23 10:00",
+                "scope": "following",
+            },
+        )
+        self.assertRedirects(response, reverse("course_detail", args=[self.course.pk]))
+        self.assertEqual(Lesson.objects.filter(title="Консультация").count(), 2)
+
+    def test_clone_gets_new_series(self):
+        lessons = create_series(self.course, self.rule, "Лекция", "")
+        clone = clone_course(self.course, self.teacher, "Copy", date(2023, 7, 2))
+        series = set(clone.lessons.values_list("series", flat=True))
+        self.assertEqual(len(series), 2)
+        self.assertIn(None, series)
+        self.assertNotIn(lessons[0].series, series)
+
+
+class TimetableTests(TestCase):
+    def setUp(self):
+        _, _, self.teacher, self.student, self.course, self.lesson, self.assignment = create_test_data()
+        self.course.students.add(self.student)
+        other = Course.objects.create(
+            title="Other Course", start_date="2023-01-01", end_date="2023-12-31", teacher=self.teacher
+        )
+        Lesson.objects.create(
+            course=other,
+            title="Other Lesson",
+            description="",
+            date_time=timezone.make_aware(datetime(2023, 1, 11, 9)),
+        )
+
+    def titles(self, events):
+        return [event["title"] for event in events]
+
+    def test_periods(self):
+        self.assertEqual(period_start("week", date(2023, 1, 11)), date(2023, 1, 9))
+        self.assertEqual(period_start("month", date(2023, 1, 11)), date(2023, 1, 1))
+        self.assertEqual(shift_period("month", date(2023, 12, 1), 1), date(2024, 1, 1))
+        self.assertEqual(shift_period("month", date(2023, 1, 1), -1), date(2022, 12, 1))
+        self.assertEqual(shift_period("week", date(2023, 1, 9), -1), date(2023, 1, 2))
+
+    def test_courses_of_user(self):
+        self.assertEqual(self.titles(timetable(self.student.pk, "week", date(2023, 1, 11))), ["Test Lesson"])
+        self.assertEqual(
+            self.titles(timetable(self.teacher.pk, "week", date(2023, 1, 11))),
+            ["Test Lesson", "Other Lesson"],
+        )
+        self.assertEqual(
+            self.titles(timetable(self.student.pk, "month", date(2023, 1, 31))),
+            ["Test Lesson", "Test Assignment"],
+        )
+
+    def test_neighbour_periods_from_cache(self):
+        with CaptureQueriesContext(connection) as queries:
+            timetable(self.student.pk, "week", date(2023, 1, 11))
+        self.assertEqual(len([query for query in queries if "UNION ALL" in query["sql"]]), 1)
+        # Соседние недели берутся из кэша; из базы читаются только версии курсов
+        with self.assertNumQueries(2):
+            self.assertEqual(
+                self.titles(timetable(self.student.pk, "week", date(2023, 1, 18))), ["Test Assignment"]
+            )
+            self.assertEqual(timetable(self.student.pk, "week", date(2023, 1, 4)), [])
+
+    def test_changes_visible_immediately(self):
+        timetable(self.student.pk, "week", date(2023, 1, 11))
+        self.lesson.title = "Moved Lesson"
+        self.lesson.save()
+        self.assertEqual(self.titles(timetable(self.student.pk, "week", date(2023, 1, 11))), ["Moved Lesson"])
+        self.course.students.remove(self.student)
+        self.assertEqual(timetable(self.student.pk, "week", date(2023, 1, 11)), [])
+
+    def test_range_query_uses_indexes(self):
+        events = timetable_events(
+            [self.course.pk],
+            timezone.make_aware(datetime(2023, 1, 9)),
+            timezone.make_aware(datetime(2023, 1, 16)),
+        )
+        self.assertEqual(self.titles(events), ["Test Lesson"])
+        plan = Lesson.objects.filter(
+            course_id__in=[self.course.pk], date_time__gte=timezone.now(), date_time__lt=timezone.now()
+        ).explain()
+        self.assertIn("study_buddy_lesson_time_idx", plan)
+        plan = Assignment.objects.filter(
+            course_id__in=[self.course.pk], due_date__gte=timezone.now(), due_date__lt=timezone.now()
+        ).explain()
+        self.assertIn("study_buddy_assign_due_idx", plan)
+
+    def test_timetable_view(self):
+        self.client.login(username="testuser_student", password="testpassword_student")
+        response = self.client.get(reverse("timetable"), {"period": "week", "date": "2023-01-11"})
+        self.assertContains(response, "Test Lesson")
+        self.assertNotContains(response, "Other Lesson")
+        self.assertContains(response, "date=2023-01-16")
+        self.assertEqual(len(response.context["days"]), 7)
+
+        response = self.client.get(reverse("timetable"), {"period": "month", "date": "2023-01-11"})
+        self.assertContains(response, reverse("assignment_detail", args=[self.assignment.pk]))
+        self.assertEqual(len(response.context["days"]), 2)
+
+        for period in ("week", "month"):
+            for day in ("0001-01-01", "0001-01-31", "9999-12-01", "9999-12-31"):
+                response = self.client.get(reverse("timetable"), {"period": period, "date": day})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context["start"], period_start(period, timezone.localdate()))
+        for day in ("0001-03-04", "9999-10-30"):
+            response = self.client.get(reverse("timetable"), {"period": "month", "date": day})
+            self.assertEqual(response.context["start"], date.fromisoformat(day).replace(day=1))
+        response = self.client.get(reverse("timetable"), {"period": "week", "date": "9999-10-30"})
+        self.assertEqual(response.context["start"], date(9999, 10, 25))
+
+        response = self.client.get(reverse("timetable"), {"period": "year", "date": "вчера"})
+        self.assertEqual(response.context["period"], "week")
+        self.assertEqual(response.context["start"], period_start("week", timezone.localdate()))
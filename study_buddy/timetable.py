@@ -0,0 +1,122 @@
+import hashlib
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import CharField, F, Value
+from django.utils import timezone
+
+from .access import course_access
+from .fragment_cache import course_versions
+from .models import Assignment, Lesson
+
+PERIODS = ("week", "month")
+# Допустимые даты расписания: соседние периоды (до двух месяцев в каждую сторону) не выходят за пределы ``date``
+FIRST_DAY = date.min + timedelta(days=62)
+LAST_DAY = date.max - timedelta(days=62)
+# Время жизни закэшированного периода расписания. Изменения занятий и заданий учитываются версиями
+# курсов в ключе, поэтому срок лишь ограничивает, сколько кэш хранит соседние периоды
+TIMETABLE_CACHE_TIMEOUT = 60 * 5
+
+
+def parse_day(value):
+    """
+    Дата расписания из строки ``ГГГГ-ММ-ДД`` или None, если строка не дата или дата вне допустимых пределов.
+    """
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        return None
+    return day if FIRST_DAY <= day <= LAST_DAY else None
+
+
+def period_start(period, day):
+    """
+    Первый день недели (понедельник) или месяца, в который попадает ``day``.
+    """
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def shift_period(period, start, steps):
+    """
+    Начало периода, отстоящего от периода ``start`` на ``steps`` недель или месяцев.
+    """
+    if period == "week":
+        return start + timedelta(weeks=steps)
+    month = start.month - 1 + steps
+    return start.replace(year=start.year + month // 12, month=month % 12 + 1, day=1)
+
+
+def _midnight(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def timetable_events(course_ids, start, end):
+    """
+    Занятия и сроки сдачи заданий курсов ``course_ids`` с ``start`` до ``end`` одним запросом UNION ALL.
+    Обе части выбирают диапазон дат по составным индексам (курс, дата), не читая остальные строки курсов.
+    Результат кэшируется, поэтому читается из основной базы.
+    """
+    columns = ("kind", "pk", "title", "starts_at", "course_id", "course_title")
+    lessons = (
+        Lesson.objects.filter(course_id__in=course_ids, date_time__gte=start, date_time__lt=end)
+        .annotate(kind=Value("lesson", output_field=CharField()), starts_at=F("date_time"))
+        .annotate(course_title=F("course__title"))
+        .values_list(*columns)
+        .order_by()
+    )
+    assignments = (
+        Assignment.objects.filter(course_id__in=course_ids, due_date__gte=start, due_date__lt=end)
+        .annotate(kind=Value("assignment", output_field=CharField()), starts_at=F("due_date"))
+        .annotate(course_title=F("course__title"))
+        .values_list(*columns)
+        .order_by()
+    )
+    rows = lessons.union(assignments, all=True).order_by("starts_at", "kind", "pk").using(DEFAULT_DB_ALIAS)
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def _cache_key(profile_id, period, start, versions):
+    digest = hashlib.md5(repr(sorted(versions.items())).encode()).hexdigest()
+    return f"study_buddy:timetable:{profile_id}:{period}:{start.isoformat()}:{digest}"
+
+
+def timetable(profile_id, period, day):
+    """
+    События недели или месяца, в которые попадает ``day``, по всем курсам пользователя.
+
+    При промахе кэша одним запросом выбираются и соседние периоды, и все три кэшируются на
+    ``TIMETABLE_CACHE_TIMEOUT``: переход к предыдущей или следующей неделе читает из базы только
+    версии курсов пользователя. Версии входят в ключ, поэтому изменения занятий и заданий видны сразу.
+    """
+    access = course_access(profile_id)
+    course_ids = access.enrolled | access.taught
+    if not course_ids:
+        return []
+    versions = course_versions(course_ids)
+    starts = [shift_period(period, period_start(period, day), step) for step in (-1, 0, 1, 2)]
+    keys = [_cache_key(profile_id, period, start, versions) for start in starts[:3]]
+    events = cache.get(keys[1])
+    if events is not None:
+        return events
+    buckets = {key: [] for key in keys}
+    for event in timetable_events(course_ids, _midnight(starts[0]), _midnight(starts[-1])):
+        index = bisect_right(starts, timezone.localdate(event["starts_at"])) - 1
+        buckets[keys[index]].append(event)
+    cache.set_many(buckets, TIMETABLE_CACHE_TIMEOUT)
+    return buckets[keys[1]]
+
+
+def group_by_day(events, start, end, include_empty=False):
+    """
+    Пары (день, события дня) с ``start`` до ``end``; с ``include_empty`` — и дни без событий.
+    """
+    days = {}
+    if include_empty:
+        days = {start + timedelta(days=offset): [] for offset in range((end - start).days)}
+    for event in events:
+        days.setdefault(timezone.localdate(event["starts_at"]), []).append(event)
+    return sorted(days.items())
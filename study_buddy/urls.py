@@ -1,26 +1,61 @@
 from django.contrib import admin
-from django.urls import path
+from django.urls import include, path
 
+from .api import (
+    API_VERSION,
+    AssignmentApiView,
+    CompletionApiView,
+    CourseApiView,
+    LessonApiView,
+    NotificationApiView,
+)
 from .views import (
     AddStudentToCourseView,
     AssignmentCreateView,
     AssignmentDetailView,
     AssignmentUpdateView,
+    CalendarFeedView,
+    CompletionGridView,
+    CompletionImportView,
+    CourseCloneView,
     CourseCreateView,
     CourseDeleteView,
     CourseDetailView,
     CourseUpdateView,
+    EnrollmentImportView,
+    ForumPostDeleteView,
+    ForumView,
+    GradebookExportView,
     HomeView,
     LessonCreateView,
+    LessonSeriesCreateView,
     LessonUpdateView,
+    NotificationListView,
+    NotificationMarkAllReadView,
+    NotificationMarkReadView,
     RemoveStudentFromCourseView,
+    SearchView,
+    StudentSearchView,
+    TimetableView,
     UserLoginView,
     UserRegisterView,
     user_logout,
 )
 
+api_urlpatterns = [
+    path("courses/", CourseApiView.as_view(), name="api_course_list"),
+    path("courses/<int:pk>/", CourseApiView.as_view(), name="api_course_detail"),
+    path("lessons/", LessonApiView.as_view(), name="api_lesson_list"),
+    path("lessons/<int:pk>/", LessonApiView.as_view(), name="api_lesson_detail"),
+    path("assignments/", AssignmentApiView.as_view(), name="api_assignment_list"),
+    path("assignments/<int:pk>/", AssignmentApiView.as_view(), name="api_assignment_detail"),
+    path("completions/", CompletionApiView.as_view(), name="api_completion_list"),
+    path("notifications/", NotificationApiView.as_view(), name="api_notification_list"),
+]
+
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path(f"api/{API_VERSION}/", include(api_urlpatterns)),
     path("", HomeView.as_view(), name="home"),
     path("accounts/login/", UserLoginView.as_view(), name="login"),
     path("logout/", user_logout, name="logout"),
@@ -29,19 +64,48 @@ urlpatterns = [
     path("course/<int:pk>/delete/", CourseDeleteView.as_view(), name="course_delete"),
     path("course/add/", CourseCreateView.as_view(), name="course_create"),
     path("course/<int:pk>/edit/", CourseUpdateView.as_view(), name="course_update"),
+    path("course/<int:pk>/clone/", CourseCloneView.as_view(), name="course_clone"),
     path("course/<int:course_pk>/assignment/add/", AssignmentCreateView.as_view(), name="assignment_create"),
     path("course/<int:course_pk>/lesson/add/", LessonCreateView.as_view(), name="lesson_create"),
+    path(
+        "course/<int:course_pk>/lesson/series/",
+        LessonSeriesCreateView.as_view(),
+        name="lesson_series_create",
+    ),
     path(
         "course/<int:course_pk>/student/add/",
         AddStudentToCourseView.as_view(),
         name="add_student_to_course",
     ),
+    path(
+        "course/<int:course_pk>/student/import/",
+        EnrollmentImportView.as_view(),
+        name="enrollment_import",
+    ),
+    path(
+        "course/<int:course_pk>/student/search/",
+        StudentSearchView.as_view(),
+        name="student_search",
+    ),
     path(
         "course/<int:course_pk>/student/<int:student_pk>/remove/",
         RemoveStudentFromCourseView.as_view(),
         name="remove_student_from_course",
     ),
+    path("course/<int:course_pk>/completion/", CompletionGridView.as_view(), name="completion_grid"),
+    path(
+        "course/<int:course_pk>/completion/import/", CompletionImportView.as_view(), name="completion_import"
+    ),
+    path("course/<int:course_pk>/gradebook.csv", GradebookExportView.as_view(), name="gradebook_export"),
+    path("course/<int:course_pk>/forum/", ForumView.as_view(), name="forum_detail"),
+    path("forum/post/<int:pk>/delete/", ForumPostDeleteView.as_view(), name="forum_post_delete"),
     path("assignment/<int:pk>/", AssignmentDetailView.as_view(), name="assignment_detail"),
     path("assignment/<int:pk>/edit/", AssignmentUpdateView.as_view(), name="assignment_update"),
     path("lessons/<int:pk>/edit/", LessonUpdateView.as_view(), name="lesson_update"),
+    path("calendar/<str:token>.ics", CalendarFeedView.as_view(), name="calendar_feed"),
+    path("timetable/", TimetableView.as_view(), name="timetable"),
+    path("search/", SearchView.as_view(), name="search"),
+    path("notifications/", NotificationListView.as_view(), name="notification_list"),
+    path("notifications/read/", NotificationMarkAllReadView.as_view(), name="notification_mark_all_read"),
+    path("notifications/<int:pk>/read/", NotificationMarkReadView.as_view(), name="notification_mark_read"),
 ]
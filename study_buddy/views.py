@@ -1,22 +1,115 @@
+import io
+from datetime import timedelta
+
 from django.contrib import messages
 from django.contrib.auth import logout
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.views import LoginView
-from django.http import HttpResponseForbidden, HttpResponseRedirect
+from django.core.exceptions import ValidationError
+from django.db.models import Exists, OuterRef, Q
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseForbidden,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+from django.utils.decorators import method_decorator
 from django.views import View
+from django.views.decorators.http import condition
 from django.views.generic import (
     CreateView,
     DeleteView,
     DetailView,
+    FormView,
     TemplateView,
     UpdateView,
 )
 
-from .forms import AssignmentForm, UserLoginForm, UserProfileForm
-from .models import Assignment, Course, Lesson, UserProfile
+from .access import can_view_course
+from .archive import can_view_archived_course
+from .cloning import clone_course
+from .completion import import_completions, set_completions
+from .conditional import (
+    calendar_etag,
+    calendar_last_modified,
+    calendar_validators,
+    course_etag,
+    course_last_modified,
+    dashboard_etag,
+    dashboard_last_modified,
+)
+from .db import retry_on_lock
+from .deletion import delete_course
+from .enrollment import import_enrollments
+from .forms import (
+    AssignmentForm,
+    CompletionImportForm,
+    CourseCloneForm,
+    EnrollmentImportForm,
+    ForumPostForm,
+    LessonForm,
+    LessonSeriesForm,
+    UserLoginForm,
+    UserProfileForm,
+)
+from .gradebook import gradebook_assignments, gradebook_csv
+from .ical import (
+    cached_calendar,
+    calendar_token,
+    profile_id_from_token,
+    stream_calendar,
+)
+from .models import (
+    ArchivedCourse,
+    ArchivedForum,
+    Assignment,
+    Course,
+    Forum,
+    ForumPost,
+    Lesson,
+    UserProfile,
+)
+from .notifications import (
+    inbox_page,
+    mark_all_read,
+    mark_read,
+    notify_assignment_saved,
+    notify_lesson_saved,
+)
+from .pagination import keyset_page
+from .recurrence import create_series, update_following, validate_occurrences
+from .search import search
+from .timetable import (
+    PERIODS,
+    group_by_day,
+    parse_day,
+    period_start,
+    shift_period,
+    timetable,
+)
+
+
+class CourseTeacherRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
+    """
+    Доступ только у преподавателя курса из URL (аргумент ``course_url_kwarg``); курс загружается
+    в ``self.course``. Анонимный пользователь отправляется на страницу входа, остальные получают 403.
+    """
+
+    course_url_kwarg = "course_pk"
+
+    def dispatch(self, request, *args, **kwargs):
+        self.course = get_object_or_404(Course, pk=self.kwargs[self.course_url_kwarg])
+        return super().dispatch(request, *args, **kwargs)
+
+    def test_func(self):
+        profile = getattr(self.request.user, "userprofile", None)
+        return profile is not None and self.course.teacher_id == profile.pk
 
 
 class UserLoginView(LoginView):
@@ -57,52 +150,143 @@ class UserRegisterView(CreateView):
         return response
 
 
+@method_decorator(condition(etag_func=dashboard_etag, last_modified_func=dashboard_last_modified), "dispatch")
 class HomeView(LoginRequiredMixin, TemplateView):
     """
     Представление для главной страницы приложения.
+    Если страница у клиента актуальна, возвращается ответ 304 без обращения к шаблону.
     """
 
     template_name = "home.html"
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Получаем профиль пользователя
-        user_profile = UserProfile.objects.filter(user=self.request.user).first()
+        # Получаем профиль пользователя (он же затем используется в шаблоне как user.userprofile)
+        try:
+            user_profile = self.request.user.userprofile
+        except UserProfile.DoesNotExist:
+            user_profile = None
         # Если профиль существует, добавляем список курсов в контекст
         if user_profile:
-            if user_profile.role == "student":
-                courses = user_profile.courses_enrolled.all()
-            else:
-                courses = user_profile.courses_taught.all()
-            context["courses"] = courses
+            context["courses"] = Course.objects.for_dashboard(user_profile).with_post_count()
+            context["calendar_url"] = self.request.build_absolute_uri(
+                reverse("calendar_feed", kwargs={"token": calendar_token(user_profile)})
+            )
         else:
             context["courses"] = []
 
         return context
 
 
+class TimetableView(LoginRequiredMixin, TemplateView):
+    """
+    Расписание пользователя на неделю или месяц: занятия и сроки сдачи заданий всех его курсов.
+    Период задаётся параметрами ``period`` (``week`` или ``month``) и ``date``.
+    """
+
+    template_name = "timetable.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        period = self.request.GET.get("period")
+        if period not in PERIODS:
+            period = "week"
+        day = parse_day(self.request.GET.get("date", "")) or timezone.localdate()
+        start = period_start(period, day)
+        end = shift_period(period, start, 1)
+        events = timetable(self.request.user.userprofile.pk, period, day)
+        context.update(
+            period=period,
+            start=start,
+            last_day=end - timedelta(days=1),
+            previous_start=shift_period(period, start, -1),
+            next_start=end,
+            days=group_by_day(events, start, end, include_empty=period == "week"),
+        )
+        return context
+
+
 class CourseDetailView(LoginRequiredMixin, DetailView):
     """
     Представление для отображения детальной информации о курсе.
+    Если страница у клиента актуальна, возвращается ответ 304 без обращения к шаблону.
     """
 
     model = Course
     template_name = "course_detail.html"
 
+    def get_queryset(self):
+        return Course.objects.with_post_count()
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["all_students"] = UserProfile.objects.filter(role="student").exclude(
-            courses_enrolled=self.object.id
-        )
+        # Выборки ленивые: при попадании в кэш фрагментов запросы не выполняются
+        context["students"] = self.object.students.select_related("user")
+        context["lessons"] = self.object.lessons.all()
+        context["assignments"] = self.object.assignments.with_progress()
         return context
 
     def dispatch(self, request, *args, **kwargs):
-        user = request.user
-        course = self.get_object()
-        if user.userprofile.role == "student" and user.userprofile not in course.students.all():
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        # Доступ проверяется по закэшированным id курсов; сам курс загружается один раз в get()
+        if not can_view_course(request, self.kwargs["pk"]):
+            # Курса нет среди действующих: он перенесён в архив или не существует, и тогда архивная
+            # страница ответит 404. Отказ в доступе — только для существующего курса
+            if not Course.objects.filter(pk=self.kwargs["pk"]).exists():
+                return archived_course_view(request, *args, **kwargs)
             return HttpResponseForbidden()
+        # Условный запрос обрабатывается только после проверки доступа, иначе ответ 304 и валидаторы
+        # страницы получал бы и пользователь без доступа к курсу
+        return self.conditional_dispatch(request, *args, **kwargs)
+
+    @method_decorator(condition(etag_func=course_etag, last_modified_func=course_last_modified))
+    def conditional_dispatch(self, request, *args, **kwargs):
         return super().dispatch(request, *args, **kwargs)
 
+    def get(self, request, *args, **kwargs):
+        try:
+            return super().get(request, *args, **kwargs)
+        except Http404:
+            return archived_course_view(request, *args, **kwargs)
+
+
+class ArchivedCourseDetailView(LoginRequiredMixin, DetailView):
+    """
+    Страница курса, перенесённого в архив, только для просмотра. Открывается по адресу
+    ``CourseDetailView``, когда курса нет в рабочих таблицах.
+    """
+
+    model = ArchivedCourse
+    template_name = "archived_course_detail.html"
+    context_object_name = "course"
+
+    def get_queryset(self):
+        return ArchivedCourse.objects.select_related("teacher__user")
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        course = self.object
+        if self.request.user.userprofile.role == "teacher":
+            context["students"] = UserProfile.objects.filter(
+                archived_enrollments__course=course
+            ).select_related("user")
+        context["lessons"] = course.lessons.all()
+        context["assignments"] = course.assignments.all()
+        forum = ArchivedForum.objects.filter(course=course).first()
+        context["posts"] = forum.posts.select_related("author__user") if forum else []
+        return context
+
+    def get(self, request, *args, **kwargs):
+        # Сначала курс, чтобы на отсутствующий курс отвечать 404, а не 403
+        self.object = self.get_object()
+        if not can_view_archived_course(request.user.userprofile, self.object.pk):
+            return HttpResponseForbidden()
+        return self.render_to_response(self.get_context_data(object=self.object))
+
+
+archived_course_view = ArchivedCourseDetailView.as_view()
+
 
 class CourseCreateView(UserPassesTestMixin, LoginRequiredMixin, CreateView):
     """
@@ -124,6 +308,31 @@ class CourseCreateView(UserPassesTestMixin, LoginRequiredMixin, CreateView):
         return reverse_lazy("course_detail", args=[str(self.object.id)])
 
 
+class CourseCloneView(CourseTeacherRequiredMixin, FormView):
+    """
+    Представление для копирования курса с занятиями и заданиями на новый семестр.
+    Копировать курс может только его преподаватель.
+    """
+
+    course_url_kwarg = "pk"
+    form_class = CourseCloneForm
+    template_name = "course_clone.html"
+
+    def get_initial(self):
+        # Через полгода, чтобы занятия пришлись на те же дни недели
+        return {"title": self.course.title, "start_date": self.course.start_date + timedelta(weeks=26)}
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["course"] = self.course
+        return context
+
+    def form_valid(self, form):
+        clone = clone_course(self.course, self.request.user.userprofile, **form.cleaned_data)
+        messages.success(self.request, f"Создана копия курса «{self.course.title}».")
+        return HttpResponseRedirect(reverse("course_detail", args=[clone.pk]))
+
+
 class CourseUpdateView(UserPassesTestMixin, LoginRequiredMixin, UpdateView):
     """
     Представление для редактирования курса.
@@ -150,7 +359,13 @@ class CourseDeleteView(DeleteView):
             return HttpResponseForbidden()
         return super().dispatch(request, *args, **kwargs)
 
+    def form_valid(self, form):
+        # Курс скрывается сразу, а строки удаляются обработчиком очереди порциями
+        delete_course(self.object)
+        return HttpResponseRedirect(self.get_success_url())
+
 
+@method_decorator(retry_on_lock, "post")
 class AssignmentDetailView(DetailView):
     """
     Представление для детального просмотра домашнего задания.
@@ -160,15 +375,22 @@ class AssignmentDetailView(DetailView):
     template_name = "assignment_detail.html"
     context_object_name = "assignment"
 
+    def get_queryset(self):
+        return Assignment.objects.select_related("course")
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        profile = getattr(self.request.user, "userprofile", None)
+        context["is_completed"] = (
+            profile is not None and self.object.students_completed.filter(pk=profile.pk).exists()
+        )
         return context
 
     def post(self, request, *args, **kwargs):
         obj = self.get_object()
         if request.user.userprofile.role == "student":
+            # Счётчик completed_count обновляется сигналом в той же транзакции, что и add()
             obj.students_completed.add(request.user.userprofile)
-            obj.save()
             return HttpResponseRedirect(reverse("assignment_detail", kwargs={"pk": obj.pk}))
         return HttpResponseRedirect(reverse("assignment_detail", kwargs={"pk": obj.pk}))
 
@@ -190,7 +412,9 @@ class AssignmentCreateView(CreateView):
     def form_valid(self, form):
         form.instance.teacher = self.request.user.userprofile
         form.instance.course = get_object_or_404(Course, pk=self.kwargs["course_pk"])
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        notify_assignment_saved(self.object, created=True)
+        return response
 
     def get_success_url(self):
         return reverse_lazy("course_detail", args=[str(self.object.course.id)])
@@ -205,6 +429,11 @@ class AssignmentUpdateView(UpdateView):
     form_class = AssignmentForm
     template_name = "assignment_form.html"
 
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        notify_assignment_saved(self.object, created=False)
+        return response
+
     def get_success_url(self):
         return reverse_lazy("course_detail", args=[str(self.object.course.id)])
 
@@ -215,13 +444,15 @@ class LessonCreateView(CreateView):
     """
 
     model = Lesson
+    form_class = LessonForm
     template_name = "lesson_form.html"
-    fields = ["title", "description", "date_time"]
 
     def form_valid(self, form):
         course = Course.objects.get(pk=self.kwargs["course_pk"])
         form.instance.course = course
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        notify_lesson_saved(self.object, created=True)
+        return response
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -234,22 +465,70 @@ class LessonCreateView(CreateView):
 
 class LessonUpdateView(UpdateView):
     """
-    Представление для обновления урока.
+    Представление для обновления урока. У урока из серии можно изменить и все следующие уроки серии.
     """
 
     model = Lesson
+    form_class = LessonForm
     template_name = "lesson_form.html"
-    fields = ["title", "description", "date_time"]
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["course"] = self.object.course
         return context
 
+    def form_valid(self, form):
+        if form.cleaned_data.get("scope") == "following":
+            data = form.cleaned_data
+            try:
+                count = update_following(self.object, data["title"], data["description"], data["date_time"])
+            except ValidationError as error:
+                form.add_error(None, error)
+                return self.form_invalid(form)
+            messages.success(self.request, f"Изменено занятий серии: {count}.")
+            return HttpResponseRedirect(self.get_success_url())
+        response = super().form_valid(form)
+        notify_lesson_saved(self.object, created=False)
+        return response
+
     def get_success_url(self):
         return reverse_lazy("course_detail", kwargs={"pk": self.object.course.pk})
 
 
+class LessonSeriesCreateView(CourseTeacherRequiredMixin, FormView):
+    """
+    Представление для создания расписания курса: занятия по правилу повторения создаются разом.
+    Кнопка «Показать даты» выводит получившиеся даты, ничего не сохраняя.
+    """
+
+    form_class = LessonSeriesForm
+    template_name = "lesson_series_form.html"
+
+    def get_initial(self):
+        return {"start_date": max(self.course.start_date, timezone.localdate())}
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["course"] = self.course
+        return context
+
+    def form_valid(self, form):
+        data = form.cleaned_data
+        rule = form.rule()
+        try:
+            if "preview" in self.request.POST:
+                occurrences = rule.occurrences()
+                validate_occurrences(self.course, occurrences)
+                return self.render_to_response(self.get_context_data(form=form, occurrences=occurrences))
+            lessons = create_series(self.course, rule, data["title"], data["description"])
+        except ValidationError as error:
+            form.add_error(None, error)
+            return self.form_invalid(form)
+        messages.success(self.request, f"Создано занятий: {len(lessons)}.")
+        return HttpResponseRedirect(reverse("course_detail", args=[self.course.pk]))
+
+
+@method_decorator(retry_on_lock, "post")
 class AddStudentToCourseView(View):
     """
     Представление для добавления студента в курс.
@@ -263,6 +542,26 @@ class AddStudentToCourseView(View):
         return HttpResponseRedirect(reverse_lazy("course_detail", kwargs={"pk": self.kwargs["course_pk"]}))
 
 
+class EnrollmentImportView(CourseTeacherRequiredMixin, FormView):
+    """
+    Представление для массовой записи студентов на курс из CSV-файла.
+    """
+
+    form_class = EnrollmentImportForm
+    template_name = "enrollment_import.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["course"] = self.course
+        return context
+
+    def form_valid(self, form):
+        lines = io.TextIOWrapper(form.cleaned_data["file"].file, encoding="utf-8-sig", newline="")
+        report = import_enrollments(self.course, lines)
+        return self.render_to_response(self.get_context_data(form=form, report=report))
+
+
+@method_decorator(retry_on_lock, "post")
 class RemoveStudentFromCourseView(View):
     """
     Представление для исключения студента из курса.
@@ -273,3 +572,281 @@ class RemoveStudentFromCourseView(View):
         student = UserProfile.objects.get(pk=self.kwargs["student_pk"])
         course.students.remove(student)
         return HttpResponseRedirect(reverse_lazy("course_detail", kwargs={"pk": self.kwargs["course_pk"]}))
+
+
+class StudentSearchView(LoginRequiredMixin, View):
+    """
+    Поиск студентов, ещё не записанных на курс, для окна добавления студента.
+
+    Ищет по началу логина, имени или фамилии и отдаёт результаты страницами в JSON.
+    Пагинация курсорная: следующая страница запрашивается с параметром ``after``,
+    равным логину последнего студента на предыдущей странице.
+    """
+
+    page_size = 20
+
+    def get(self, request, *args, **kwargs):
+        if request.user.userprofile.role != "teacher":
+            return HttpResponseForbidden()
+        course = get_object_or_404(Course, pk=self.kwargs["course_pk"])
+        query = request.GET.get("q", "").strip()
+        after = request.GET.get("after", "")
+
+        enrolled = Course.students.through.objects.filter(course_id=course.pk, userprofile_id=OuterRef("pk"))
+        students = UserProfile.objects.filter(~Exists(enrolled), role="student")
+        if query:
+            students = students.filter(
+                Q(user__username__istartswith=query)
+                | Q(user__first_name__istartswith=query)
+                | Q(user__last_name__istartswith=query)
+            )
+        if after:
+            students = students.filter(user__username__gt=after)
+        page = list(
+            students.order_by("user__username").values(
+                "pk", "user__username", "user__first_name", "user__last_name"
+            )[: self.page_size + 1]
+        )
+
+        has_next = len(page) > self.page_size
+        page = page[: self.page_size]
+        return JsonResponse(
+            {
+                "results": [
+                    {
+                        "id": student["pk"],
+                        "username": student["user__username"],
+                        "first_name": student["user__first_name"],
+                        "last_name": student["user__last_name"],
+                    }
+                    for student in page
+                ],
+                "next": page[-1]["user__username"] if has_next else None,
+            }
+        )
+
+
+class NotificationListView(LoginRequiredMixin, TemplateView):
+    """
+    Представление для ленты уведомлений пользователя.
+    """
+
+    template_name = "notification_list.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        unread_only = self.request.GET.get("unread") == "1"
+        notifications, next_cursor = inbox_page(
+            self.request.user.userprofile.pk,
+            cursor=self.request.GET.get("before"),
+            unread_only=unread_only,
+        )
+        context.update(notifications=notifications, next_cursor=next_cursor, unread_only=unread_only)
+        return context
+
+
+@method_decorator(retry_on_lock, "post")
+class NotificationMarkReadView(LoginRequiredMixin, View):
+    """
+    Представление для отметки одного уведомления прочитанным.
+    """
+
+    def post(self, request, *args, **kwargs):
+        mark_read(request.user.userprofile.pk, self.kwargs["pk"])
+        return HttpResponseRedirect(reverse("notification_list"))
+
+
+@method_decorator(retry_on_lock, "post")
+class NotificationMarkAllReadView(LoginRequiredMixin, View):
+    """
+    Представление для отметки всех уведомлений прочитанными.
+    """
+
+    def post(self, request, *args, **kwargs):
+        mark_all_read(request.user.userprofile.pk)
+        messages.success(request, "Все уведомления отмечены как прочитанные")
+        return HttpResponseRedirect(reverse("notification_list"))
+
+
+class ForumView(LoginRequiredMixin, FormView):
+    """
+    Представление для форума курса: лента сообщений и форма нового сообщения.
+    """
+
+    form_class = ForumPostForm
+    template_name = "forum_detail.html"
+    page_size = 20
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        self.course = get_object_or_404(Course, pk=self.kwargs["course_pk"])
+        if not can_view_course(request, self.course.pk):
+            return HttpResponseForbidden()
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        forum = Forum.objects.filter(course=self.course).first()
+        posts, next_cursor = [], None
+        if forum:
+            posts, next_cursor = keyset_page(
+                ForumPost.objects.filter(forum=forum).select_related("author__user"),
+                self.request.GET.get("before"),
+                self.page_size,
+            )
+        context.update(course=self.course, forum=forum, posts=posts, next_cursor=next_cursor)
+        return context
+
+    def form_valid(self, form):
+        forum, _ = Forum.objects.get_or_create(
+            course=self.course, defaults={"title": f"Форум курса «{self.course.title}»"}
+        )
+        form.instance.forum = forum
+        form.instance.author = self.request.user.userprofile
+        form.save()
+        return HttpResponseRedirect(reverse("forum_detail", kwargs={"course_pk": self.course.pk}))
+
+
+@method_decorator(retry_on_lock, "post")
+class ForumPostDeleteView(LoginRequiredMixin, View):
+    """
+    Представление для удаления сообщения на форуме его автором.
+    """
+
+    def post(self, request, *args, **kwargs):
+        post = get_object_or_404(ForumPost.objects.select_related("forum"), pk=self.kwargs["pk"])
+        if post.author_id != request.user.userprofile.pk:
+            return HttpResponseForbidden()
+        post.delete()
+        return HttpResponseRedirect(reverse("forum_detail", kwargs={"course_pk": post.forum.course_id}))
+
+
+class SearchView(LoginRequiredMixin, TemplateView):
+    """
+    Представление для поиска по занятиям, заданиям и форумам доступных пользователю курсов.
+    """
+
+    template_name = "search.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get("q", "").strip()
+        try:
+            page = max(int(self.request.GET.get("page", 1)), 1)
+        except ValueError:
+            page = 1
+        results, has_next = search(self.request.user.userprofile, query, page)
+        context.update(query=query, results=results, page=page, has_next=has_next)
+        return context
+
+
+@method_decorator(condition(etag_func=calendar_etag, last_modified_func=calendar_last_modified), "dispatch")
+class CalendarFeedView(View):
+    """
+    Представление для календаря занятий и сроков сдачи заданий в формате iCalendar.
+    Доступно по ссылке с токеном без входа в систему, чтобы её могли опрашивать календарные приложения.
+    """
+
+    content_type = "text/calendar; charset=utf-8"
+
+    def get(self, request, *args, **kwargs):
+        profile_id = profile_id_from_token(self.kwargs["token"])
+        if profile_id is None:
+            raise Http404
+        etag, _ = calendar_validators(profile_id)
+        body = cached_calendar(profile_id, etag)
+        if body is not None:
+            response = HttpResponse(body, content_type=self.content_type)
+        else:
+            response = StreamingHttpResponse(
+                stream_calendar(profile_id, etag), content_type=self.content_type
+            )
+        response["Content-Disposition"] = 'inline; filename="study-buddy.ics"'
+        return response
+
+
+class GradebookExportView(CourseTeacherRequiredMixin, View):
+    """
+    Представление для выгрузки ведомости выполнения заданий курса в CSV.
+    Файл отдаётся потоком, поэтому память не растёт с размером курса.
+    """
+
+    def get(self, request, *args, **kwargs):
+        course = self.course
+        response = StreamingHttpResponse(gradebook_csv(course), content_type="text/csv; charset=utf-8")
+        response["Content-Disposition"] = f'attachment; filename="gradebook_{course.pk}.csv"'
+        return response
+
+
+@method_decorator(retry_on_lock, "post")
+class CompletionGridView(CourseTeacherRequiredMixin, TemplateView):
+    """
+    Представление для таблицы «студенты × задания», в которой преподаватель отмечает выполнение заданий.
+    Студенты выводятся страницами по id, сохраняется только разница с текущими отметками.
+    """
+
+    template_name = "completion_grid.html"
+    page_size = 50
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        after = self.request.GET.get("after", "")
+        students = self.course.students.select_related("user").order_by("pk")
+        if after.isdigit():
+            students = students.filter(pk__gt=int(after))
+        students = list(students[: self.page_size + 1])
+        has_next = len(students) > self.page_size
+        students = students[: self.page_size]
+        assignments = gradebook_assignments(self.course)
+        completed = set(
+            Assignment.students_completed.through.objects.filter(
+                assignment__course=self.course, userprofile_id__in=[student.pk for student in students]
+            ).values_list("userprofile_id", "assignment_id")
+        )
+        context.update(
+            course=self.course,
+            after=after,
+            assignments=assignments,
+            rows=[
+                (student, [(pk, (student.pk, pk) in completed) for pk, _ in assignments])
+                for student in students
+            ],
+            next_after=students[-1].pk if has_next else None,
+            import_form=CompletionImportForm(),
+        )
+        return context
+
+    def post(self, request, *args, **kwargs):
+        assignment_ids = [pk for pk, _ in gradebook_assignments(self.course)]
+        done = set(request.POST.getlist("done"))
+        marks = (
+            (int(student_id), assignment_id, f"{student_id}:{assignment_id}" in done)
+            for student_id in request.POST.getlist("students")
+            if student_id.isdigit()
+            for assignment_id in assignment_ids
+        )
+        report = set_completions(self.course, marks)
+        messages.success(request, f"Отмечено выполненными: {report.added}, снято отметок: {report.removed}")
+        url = reverse("completion_grid", kwargs={"course_pk": self.course.pk})
+        after = request.POST.get("after", "")
+        return HttpResponseRedirect(f"{url}?after={after}" if after.isdigit() else url)
+
+
+class CompletionImportView(CourseTeacherRequiredMixin, FormView):
+    """
+    Представление для загрузки отметок о выполнении заданий из ведомости в формате выгрузки.
+    """
+
+    form_class = CompletionImportForm
+    template_name = "completion_import.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["course"] = self.course
+        return context
+
+    def form_valid(self, form):
+        lines = io.TextIOWrapper(form.cleaned_data["file"].file, encoding="utf-8-sig", newline="")
+        report = import_completions(self.course, lines)
+        return self.render_to_response(self.get_context_data(form=form, report=report))